@@ -4,17 +4,19 @@ from .settings import (adsorbate_elements,
                        site_heights,
                        adsorbate_formulas)
 from .adsorption_sites import (ClusterAdsorptionSites, 
-                               SlabAdsorptionSites)
+                               SlabAdsorptionSites,
+                               _imap_images)
 from .utilities import (neighbor_shell_list, 
                         get_adj_matrix,
-                        get_mic)
+                        get_mic,
+                        SiteList)
+from .profiling import profiled
 from ase.data import atomic_numbers
 from ase.geometry import find_mic
 from ase.formula import Formula
 from collections import defaultdict, Counter
 from operator import attrgetter
 from copy import deepcopy
-import networkx as nx
 import numpy as np
 import random
 
@@ -83,6 +85,14 @@ class ClusterAdsorbateCoverage(object):
         The maximum bond length (in Angstrom) between an atom and its
         nearest site to be considered as the atom being bound to the site.    
 
+    neighbor_list : acat.utilities.VerletNeighborList object, default None
+        A neighbor list with a skin distance that is kept across the 
+        coverage analyses of a series of structures, e.g. the frames of 
+        a relaxation trajectory. The neighbor searches of the adsorbates
+        and the atom-wise graph are then only repeated when an atom 
+        moved by more than half the skin. Must be created with mic=False,
+        and cannot be shared with the adsorption sites.
+
     Example
     -------
     The following example illustrates the most important use of a
@@ -123,11 +133,13 @@ class ClusterAdsorbateCoverage(object):
 
     """
 
+    @profiled
     def __init__(self, atoms, 
                  adsorption_sites=None, 
                  subtract_heights=None,
                  label_occupied_sites=False,
-                 dmax=2.5, **kwargs):
+                 dmax=2.5, 
+                 neighbor_list=None, **kwargs):
 
         atoms = atoms.copy()
         for dim in range(3):
@@ -153,6 +165,7 @@ class ClusterAdsorbateCoverage(object):
                 self.subtract_heights[k] = v      
         self.label_occupied_sites = label_occupied_sites
         self.dmax = dmax
+        self.neighbor_list = neighbor_list
         self.kwargs = {'allow_6fold': False, 'composition_effect': False,
                        'ignore_bridge_sites': False, 'label_sites': False} 
         self.kwargs.update(kwargs)
@@ -174,6 +187,7 @@ class ClusterAdsorbateCoverage(object):
         self.slab_ids = cas.indices
         self.metals = cas.metals
         self.surf_ids = cas.surf_ids
+        self.label_registry = cas.label_registry
         self.label_dict = cas.label_dict 
         self.hetero_site_list = deepcopy(cas.site_list)
 
@@ -185,23 +199,26 @@ class ClusterAdsorbateCoverage(object):
         else:
             self.labels = []
 
+    @profiled
     def identify_adsorbates(self):
 
+        from scipy.sparse import lil_matrix
+        import networkx as nx
         G = nx.Graph()
-        adscm = self.ads_adj_matrix
+        adscm = lil_matrix(self.ads_adj_matrix)
 
         # Cut all intermolecular H-H bonds except intramolecular               
         # H-H bonds in e.g. H2
         hids = [a.index for a in self.ads_atoms if a.symbol == 'H']
         for hi in hids:
-            conns = np.where(adscm[hi] == 1)[0]
+            conns = adscm.rows[hi]
             hconns = [i for i in conns if self.ads_atoms.symbols[i] == 'H']
             if hconns and len(conns) > 1:
                 adscm[hi,hconns] = 0
       
-        if adscm.size != 0:
-            np.fill_diagonal(adscm, 1)
-            rows, cols = np.where(adscm == 1)
+        if adscm.shape[0] != 0:
+            adscm.setdiag(1)
+            rows, cols = adscm.nonzero()
 
             edges = zip([self.ads_ids[row] for row in rows.tolist()], 
                         [self.ads_ids[col] for col in cols.tolist()])
@@ -215,18 +232,36 @@ class ClusterAdsorbateCoverage(object):
         else:
             adsorbates = [self.ads_ids]
 
+        self.ads_adj_matrix = adscm.tocsr()
         self.ads_list = adsorbates
 
-    def get_hetero_connectivity(self):
-        """Get the adjacency matrix of slab + adsorbates."""
+    def get_hetero_connectivity(self, sparse=True):
+        """Get the adjacency matrix of slab + adsorbates.
 
-        nbslist = neighbor_shell_list(self.atoms, 0.3, neighbor_number=1)
-        return get_adj_matrix(nbslist)                          
+        Parameters
+        ----------
+        sparse : bool, default True
+            Whether to return a scipy.sparse.csr_matrix. Set to False to
+            get a dense numpy.ndarray.
 
-    def get_ads_connectivity(self):
-        """Get the adjacency matrix for adsorbate atoms."""
+        """
 
-        return get_adj_matrix(self.ads_nblist) 
+        nbslist = neighbor_shell_list(self.atoms, 0.3, neighbor_number=1,
+                                      neighbor_list=self.neighbor_list)
+        return get_adj_matrix(nbslist, sparse=sparse)
+
+    def get_ads_connectivity(self, sparse=True):
+        """Get the adjacency matrix for adsorbate atoms.
+
+        Parameters
+        ----------
+        sparse : bool, default True
+            Whether to return a scipy.sparse.csr_matrix. Set to False to
+            get a dense numpy.ndarray.
+
+        """
+
+        return get_adj_matrix(self.ads_nblist, sparse=sparse) 
 
     def get_site_connectivity(self):
         """Get the adjacency matrix for adsorption sites."""
@@ -256,6 +291,7 @@ class ClusterAdsorbateCoverage(object):
 
         return np.asarray(conn_mat) 
 
+    @profiled
     def populate_hetero_site_list(self):
         """Find all the occupied sites, identify the adsorbate coverage
         of those sites and collect in a heterogeneous site list."""
@@ -352,8 +388,8 @@ class ClusterAdsorbateCoverage(object):
                 if st['dentate'] > 1:
                     bondid = st['bonding_index']
                     bondsym = self.symbols[bondid]
-                    conns = [self.ads_ids[k] for k in np.where(self.ads_adj_matrix[
-                             self.ads_ids.index(bondid)] == 1)[0].tolist()]
+                    conns = [self.ads_ids[k] for k in self.ads_adj_matrix[
+                             self.ads_ids.index(bondid)].indices.tolist()]
                     hnnlen = len([i for i in conns if self.atoms[i].symbol == 'H'])
                     fsym = self.atoms[bondid].symbol
                     if hnnlen == 1:
@@ -409,8 +445,11 @@ class ClusterAdsorbateCoverage(object):
         else:
             indices = indices if is_list_or_tuple(indices) else [indices]
             indices = tuple(sorted(indices))
-            st = next((s for s in self.hetero_site_list if 
-                       s['indices'] == indices), None)
+            if isinstance(self.hetero_site_list, SiteList):
+                st = self.hetero_site_list.find(indices)
+            else:
+                st = next((s for s in self.hetero_site_list if 
+                           s['indices'] == indices), None)
         return st
 
     def get_sites(self, occupied_only=False):
@@ -472,8 +511,18 @@ class ClusterAdsorbateCoverage(object):
         return sorted(fragments, key=lambda x: x[1])        
 
     def make_ads_neighbor_list(self, dx=.2, neighbor_number=1):
-        self.ads_nblist = neighbor_shell_list(self.ads_atoms, dx, 
-                                              neighbor_number, mic=False)
+        if self.neighbor_list is None:
+            self.ads_nblist = neighbor_shell_list(self.ads_atoms, dx, 
+                                                  neighbor_number, mic=False)
+        else:
+            # Take the adsorbate pairs from the neighbor list of all atoms
+            nblist = neighbor_shell_list(self.atoms, dx, neighbor_number, 
+                                         mic=False, 
+                                         neighbor_list=self.neighbor_list)
+            ads_index = {i: k for k, i in enumerate(self.ads_ids)}
+            self.ads_nblist = {k: [ads_index[j] for j in nblist[i] 
+                                   if j in ads_index] 
+                               for k, i in enumerate(self.ads_ids)}
 
     def get_occupied_labels(self, fragmentation=True):
         """Get a list of labels of all occupied sites. The label consists
@@ -503,13 +552,15 @@ class ClusterAdsorbateCoverage(object):
 
         return sorted(labs)
 
+    @profiled
     def get_graph(self, atom_wise=False,
                   fragmentation=True, 
                   subsurf_effect=False, 
                   full_effect=False,
                   return_adj_matrix=False,
                   connect_dentates=True,
-                  dx=0.5):                                         
+                  dx=0.5,
+                  sparse=True):                                         
         """Get the graph representation of the nanoparticle with adsorbates.
 
         Parameters
@@ -540,12 +591,19 @@ class ClusterAdsorbateCoverage(object):
             Buffer to calculate nearest neighbor pairs. Only relevent when
             atom_wise=True.
 
+        sparse : bool, default True
+            Whether to return the adjacency matrix as a scipy.sparse.csr_matrix.
+            Only relevant when return_adj_matrix=True.
+
         """
 
+        from scipy.sparse import csr_matrix, lil_matrix
+        import scipy.sparse as sp
+        import networkx as nx
         # Molecule-wise
         if not atom_wise:
             hsl = self.hetero_site_list
-            hcm = self.cas.get_connectivity().copy()
+            hcm = self.cas.get_connectivity()
             if full_effect:
                 surf_ids = self.slab_ids
             else:
@@ -566,16 +624,14 @@ class ClusterAdsorbateCoverage(object):
                     if st['bonding_index'] != adsi[0]:
                         continue
                 si = st['indices']
-                newrow = np.zeros(ncols)
-                newrow[list(si)] = 1
-                newrows.append(newrow)
+                newrows.append(sorted(set(si)))
  
                 if fragmentation:                
                     frag_list.append(st['fragment'])
                     if st['dentate'] > 1 and connect_dentates:
                         bondid = st['bonding_index']
-                        all_conns = [self.ads_ids[j] for j in np.where(self.ads_adj_matrix[
-                                     self.ads_ids.index(bondid)] == 1)[0].tolist()]
+                        all_conns = [self.ads_ids[j] for j in self.ads_adj_matrix[
+                                     self.ads_ids.index(bondid)].indices.tolist()]
                         conns = [c for c in all_conns if c not in st['fragment_indices']]
                         i = len(newrows) - 1
                         if i not in multi_conns:
@@ -588,7 +644,12 @@ class ClusterAdsorbateCoverage(object):
  
             links = []
             if newrows:
-                surfhcm = np.vstack((surfhcm, np.asarray(newrows)))
+                newcols = [j for si in newrows for j in si]
+                newcm = csr_matrix((np.ones(len(newcols), dtype=int), 
+                                   (np.repeat(np.arange(len(newrows)), 
+                                    [len(si) for si in newrows]), newcols)),
+                                   shape=(len(newrows), ncols))
+                surfhcm = sp.vstack((surfhcm, newcm), format='csr')
                 if multi_conns:
                     links = [sorted(c) for cs in multi_conns.values() for c in cs if len(c) > 1]
  
@@ -596,14 +657,14 @@ class ClusterAdsorbateCoverage(object):
             if return_adj_matrix:
                 if newrows:
                     dd = len(newrows)
-                    small_mat = np.zeros((dd, dd))
+                    small_mat = lil_matrix((dd, dd), dtype=int)
                     if links:
                         for (i, j) in links:
                             small_mat[i,j] = 1
                             small_mat[j,i] = 1
-                    return np.hstack((shcm, np.vstack((shcm[-dd:].T, small_mat))))
-                else:
-                    return shcm
+                    shcm = sp.hstack((shcm, sp.vstack((shcm[-dd:].T, 
+                                      small_mat))), format='csr')
+                return shcm if sparse else shcm.toarray()
  
             G = nx.Graph()               
             # Add nodes from fragment list
@@ -613,8 +674,8 @@ class ClusterAdsorbateCoverage(object):
                                for j in range(len(frag_list))])
  
             # Add edges from surface adjacency matrix
-            shcm = shcm * np.tri(*shcm.shape, k=-1)
-            rows, cols = np.where(shcm == 1)
+            shcm = sp.tril(shcm, k=-1, format='csr')
+            rows, cols = shcm.nonzero()
             edges = zip(rows.tolist(), cols.tolist())
             G.add_edges_from(edges)
             if links:
@@ -623,8 +684,9 @@ class ClusterAdsorbateCoverage(object):
         # Atom-wise
         else:
             nblist = neighbor_shell_list(self.atoms, dx=dx, 
-                                         neighbor_number=1, mic=False)
-            cm = get_adj_matrix(nblist)
+                                         neighbor_number=1, mic=False,
+                                         neighbor_list=self.neighbor_list)
+            cm = get_adj_matrix(nblist, sparse=True)
             if full_effect:
                 surf_ids = self.slab_ids
             else:
@@ -636,12 +698,12 @@ class ClusterAdsorbateCoverage(object):
             shcm = cm[surf_ads_ids]
             symbols = self.symbols[surf_ads_ids]
             if return_adj_matrix:
-                return shcm
+                return shcm if sparse else shcm.toarray()
  
             G = nx.Graph()                                                  
             G.add_nodes_from([(i, {'symbol': symbols[i]}) 
                               for i in range(len(symbols))])
-            rows, cols = np.where(shcm == 1)
+            rows, cols = shcm.nonzero()
             edges = zip(rows.tolist(), cols.tolist())
             G.add_edges_from(edges)
 
@@ -724,6 +786,14 @@ class SlabAdsorbateCoverage(object):
         The maximum bond length (in Angstrom) between an atom and its
         nearest site to be considered as the atom being bound to the site.
 
+    neighbor_list : acat.utilities.VerletNeighborList object, default None
+        A neighbor list with a skin distance that is kept across the 
+        coverage analyses of a series of structures, e.g. the frames of 
+        a relaxation trajectory. The neighbor searches of the adsorbates
+        and the atom-wise graph are then only repeated when an atom 
+        moved by more than half the skin. Must be created with mic=True,
+        and cannot be shared with the adsorption sites.
+
     Example
     -------
     The following example illustrates the most important use of a
@@ -767,11 +837,13 @@ class SlabAdsorbateCoverage(object):
 
     """
 
+    @profiled
     def __init__(self, atoms, 
                  adsorption_sites=None, 
                  subtract_heights=None,
                  label_occupied_sites=False,
-                 dmax=2.5, **kwargs):
+                 dmax=2.5, 
+                 neighbor_list=None, **kwargs):
 
         atoms = atoms.copy()
         ptp = np.ptp(atoms.positions[:, 2]) 
@@ -797,6 +869,7 @@ class SlabAdsorbateCoverage(object):
                 self.subtract_heights[k] = v      
         self.label_occupied_sites = label_occupied_sites
         self.dmax = dmax
+        self.neighbor_list = neighbor_list
         self.kwargs = {'allow_6fold': False, 'composition_effect': False,
                        'ignore_bridge_sites': False, 'label_sites': False} 
         self.kwargs.update(kwargs)
@@ -820,6 +893,7 @@ class SlabAdsorbateCoverage(object):
         self.surf_ids = sas.surf_ids
         self.subsurf_ids = sas.subsurf_ids
         self.adj_matrix = sas.adj_matrix
+        self.label_registry = sas.label_registry
         self.label_dict = sas.label_dict 
         self.hetero_site_list = deepcopy(sas.site_list)
 
@@ -831,23 +905,26 @@ class SlabAdsorbateCoverage(object):
         else:
             self.labels = []
 
+    @profiled
     def identify_adsorbates(self):
 
+        from scipy.sparse import lil_matrix
+        import networkx as nx
         G = nx.Graph()
-        adscm = self.ads_adj_matrix
+        adscm = lil_matrix(self.ads_adj_matrix)
 
         # Cut all intermolecular H-H bonds except intramolecular        
         # H-H bonds in e.g. H2
         hids = [a.index for a in self.ads_atoms if a.symbol == 'H']
         for hi in hids:
-            conns = np.where(adscm[hi] == 1)[0]
+            conns = adscm.rows[hi]
             hconns = [i for i in conns if self.ads_atoms.symbols[i] == 'H']
             if hconns and len(conns) > 1:
                 adscm[hi,hconns] = 0
 
-        if adscm.size != 0:
-            np.fill_diagonal(adscm, 1)
-            rows, cols = np.where(adscm == 1)
+        if adscm.shape[0] != 0:
+            adscm.setdiag(1)
+            rows, cols = adscm.nonzero()
 
             edges = zip([self.ads_ids[row] for row in rows.tolist()], 
                         [self.ads_ids[col] for col in cols.tolist()])
@@ -861,18 +938,35 @@ class SlabAdsorbateCoverage(object):
         else:
             adsorbates = [self.ads_ids]
 
+        self.ads_adj_matrix = adscm.tocsr()
         self.ads_list = adsorbates
 
-    def get_hetero_connectivity(self):
-        """Get the adjacency matrix of slab + adsorbates."""
+    def get_hetero_connectivity(self, sparse=True):
+        """Get the adjacency matrix of slab + adsorbates.
+
+        Parameters
+        ----------
+        sparse : bool, default True
+            Whether to return a scipy.sparse.csr_matrix. Set to False to
+            get a dense numpy.ndarray.
+
+        """
 
         nbslist = neighbor_shell_list(self.atoms, 0.3, neighbor_number=1)
-        return get_adj_matrix(nbslist)                           
+        return get_adj_matrix(nbslist, sparse=sparse)
+
+    def get_ads_connectivity(self, sparse=True):
+        """Get the adjacency matrix for adsorbate atoms.
+
+        Parameters
+        ----------
+        sparse : bool, default True
+            Whether to return a scipy.sparse.csr_matrix. Set to False to
+            get a dense numpy.ndarray.
 
-    def get_ads_connectivity(self):
-        """Get the adjacency matrix for adsorbate atoms."""
+        """
 
-        return get_adj_matrix(self.ads_nblist) 
+        return get_adj_matrix(self.ads_nblist, sparse=sparse) 
 
     def get_site_connectivity(self):
         """Get the adjacency matrix for adsorption sites."""
@@ -902,6 +996,7 @@ class SlabAdsorbateCoverage(object):
 
         return np.asarray(conn_mat) 
 
+    @profiled
     def populate_hetero_site_list(self):
         """Find all the occupied sites, identify the adsorbate coverage
         of those sites and collect in a heterogeneous site list."""
@@ -999,8 +1094,8 @@ class SlabAdsorbateCoverage(object):
                 if st['dentate'] > 1:
                     bondid = st['bonding_index']
                     bondsym = self.symbols[bondid] 
-                    conns = [self.ads_ids[k] for k in np.where(self.ads_adj_matrix[
-                             self.ads_ids.index(bondid)] == 1)[0].tolist()]
+                    conns = [self.ads_ids[k] for k in self.ads_adj_matrix[
+                             self.ads_ids.index(bondid)].indices.tolist()]
                     hnnlen = len([i for i in conns if self.atoms[i].symbol == 'H'])
                     fsym = self.atoms[bondid].symbol
                     if hnnlen == 1:
@@ -1056,8 +1151,11 @@ class SlabAdsorbateCoverage(object):
         else:
             indices = indices if is_list_or_tuple(indices) else [indices]
             indices = tuple(sorted(indices))
-            st = next((s for s in self.hetero_site_list if 
-                       s['indices'] == indices), None)
+            if isinstance(self.hetero_site_list, SiteList):
+                st = self.hetero_site_list.find(indices)
+            else:
+                st = next((s for s in self.hetero_site_list if 
+                           s['indices'] == indices), None)
         return st
 
     def get_sites(self, occupied_only=False):
@@ -1119,8 +1217,18 @@ class SlabAdsorbateCoverage(object):
         return sorted(fragments, key=lambda x: x[1])        
 
     def make_ads_neighbor_list(self, dx=.2, neighbor_number=1):
-        self.ads_nblist = neighbor_shell_list(self.ads_atoms, dx, 
-                                              neighbor_number, mic=True)
+        if self.neighbor_list is None:
+            self.ads_nblist = neighbor_shell_list(self.ads_atoms, dx, 
+                                                  neighbor_number, mic=True)
+        else:
+            # Take the adsorbate pairs from the neighbor list of all atoms
+            nblist = neighbor_shell_list(self.atoms, dx, neighbor_number, 
+                                         mic=True, 
+                                         neighbor_list=self.neighbor_list)
+            ads_index = {i: k for k, i in enumerate(self.ads_ids)}
+            self.ads_nblist = {k: [ads_index[j] for j in nblist[i] 
+                                   if j in ads_index] 
+                               for k, i in enumerate(self.ads_ids)}
 
     def get_occupied_labels(self, fragmentation=True):
         """Get a list of labels of all occupied sites. The label consists
@@ -1150,13 +1258,15 @@ class SlabAdsorbateCoverage(object):
 
         return sorted(labs)
 
+    @profiled
     def get_graph(self, atom_wise=False,
                   fragmentation=True, 
                   subsurf_effect=False,
                   full_effect=False,
                   return_adj_matrix=False,
                   connect_dentates=True,
-                  dx=0.5):                                         
+                  dx=0.5,
+                  sparse=True):                                         
         """Get the graph representation of the nanoparticle with adsorbates.
 
         Parameters
@@ -1187,12 +1297,19 @@ class SlabAdsorbateCoverage(object):
             Buffer to calculate nearest neighbor pairs. Only relevent when
             atom_wise=True.
 
+        sparse : bool, default True
+            Whether to return the adjacency matrix as a scipy.sparse.csr_matrix.
+            Only relevant when return_adj_matrix=True.
+
         """
 
+        from scipy.sparse import csr_matrix, lil_matrix
+        import scipy.sparse as sp
+        import networkx as nx
         # Molecule-wise
         if not atom_wise:
             hsl = self.hetero_site_list
-            hcm = self.adj_matrix.copy()
+            hcm = csr_matrix(self.adj_matrix)
             if full_effect:
                 surf_ids = self.slab_ids
             else:
@@ -1213,16 +1330,14 @@ class SlabAdsorbateCoverage(object):
                     if st['bonding_index'] != adsi[0]:
                         continue
                 si = st['indices']
-                newrow = np.zeros(ncols)
-                newrow[list(si)] = 1
-                newrows.append(newrow)
+                newrows.append(sorted(set(si)))
  
                 if fragmentation:                
                     frag_list.append(st['fragment'])
                     if st['dentate'] > 1 and connect_dentates:
                         bondid = st['bonding_index']
-                        all_conns = [self.ads_ids[j] for j in np.where(self.ads_adj_matrix[
-                                     self.ads_ids.index(bondid)] == 1)[0].tolist()]
+                        all_conns = [self.ads_ids[j] for j in self.ads_adj_matrix[
+                                     self.ads_ids.index(bondid)].indices.tolist()]
                         conns = [c for c in all_conns if c not in st['fragment_indices']]
                         i = len(newrows) - 1
                         if i not in multi_conns:
@@ -1235,7 +1350,12 @@ class SlabAdsorbateCoverage(object):
  
             links = []
             if newrows:
-                surfhcm = np.vstack((surfhcm, np.asarray(newrows)))
+                newcols = [j for si in newrows for j in si]
+                newcm = csr_matrix((np.ones(len(newcols), dtype=int), 
+                                   (np.repeat(np.arange(len(newrows)), 
+                                    [len(si) for si in newrows]), newcols)),
+                                   shape=(len(newrows), ncols))
+                surfhcm = sp.vstack((surfhcm, newcm), format='csr')
                 if multi_conns:
                     links = [sorted(c) for cs in multi_conns.values() for c in cs if len(c) > 1]
  
@@ -1243,14 +1363,14 @@ class SlabAdsorbateCoverage(object):
             if return_adj_matrix:
                 if newrows:
                     dd = len(newrows)
-                    small_mat = np.zeros((dd, dd))
+                    small_mat = lil_matrix((dd, dd), dtype=int)
                     if links:
                         for (i, j) in links:
                             small_mat[i,j] = 1
                             small_mat[j,i] = 1
-                    return np.hstack((shcm, np.vstack((shcm[-dd:].T, small_mat))))
-                else:
-                    return shcm
+                    shcm = sp.hstack((shcm, sp.vstack((shcm[-dd:].T, 
+                                      small_mat))), format='csr')
+                return shcm if sparse else shcm.toarray()
  
             G = nx.Graph()               
             # Add nodes from fragment list
@@ -1260,8 +1380,8 @@ class SlabAdsorbateCoverage(object):
                                for j in range(len(frag_list))])
  
             # Add edges from surface adjacency matrix
-            shcm = shcm * np.tri(*shcm.shape, k=-1)
-            rows, cols = np.where(shcm == 1)
+            shcm = sp.tril(shcm, k=-1, format='csr')
+            rows, cols = shcm.nonzero()
             edges = zip(rows.tolist(), cols.tolist())
             G.add_edges_from(edges)
             if links:
@@ -1270,8 +1390,9 @@ class SlabAdsorbateCoverage(object):
         # Atom-wise
         else:
             nblist = neighbor_shell_list(self.atoms, dx=dx, 
-                                         neighbor_number=1, mic=True)
-            cm = get_adj_matrix(nblist)
+                                         neighbor_number=1, mic=True,
+                                         neighbor_list=self.neighbor_list)
+            cm = get_adj_matrix(nblist, sparse=True)
             if full_effect:
                 surf_ids = self.slab_ids
             else:
@@ -1283,12 +1404,12 @@ class SlabAdsorbateCoverage(object):
             shcm = cm[surf_ads_ids]
             symbols = self.symbols[surf_ads_ids]
             if return_adj_matrix:
-                return shcm
+                return shcm if sparse else shcm.toarray()
  
             G = nx.Graph()                                                  
             G.add_nodes_from([(i, {'symbol': symbols[i]}) 
                               for i in range(len(symbols))])
-            rows, cols = np.where(shcm == 1)
+            rows, cols = shcm.nonzero()
             edges = zip(rows.tolist(), cols.tolist())
             G.add_edges_from(edges)
 
@@ -1437,3 +1558,78 @@ def enumerate_occupied_sites(atoms, adsorption_sites=None,
         occupied_sites = [s for s in all_sites if s['occupied']]
 
     return occupied_sites
+
+
+def _get_batch_occupied_sites(atoms, adsorption_sites, surface, 
+                              subtract_heights, label_occupied_sites, 
+                              dmax, kwargs):
+    sites = enumerate_occupied_sites(atoms, adsorption_sites, surface,
+                                     subtract_heights, label_occupied_sites,
+                                     dmax, **kwargs)
+
+    return SiteList.from_sites(sites)
+
+
+def enumerate_occupied_sites_batch(images, adsorption_sites=None,
+                                   surface=None, 
+                                   subtract_heights=None,
+                                   label_occupied_sites=False,
+                                   dmax=2.5, n_jobs=None, 
+                                   chunksize=1, **kwargs):
+    """A generator that enumerates all occupied adsorption sites of 
+    many structures in parallel. The structures are distributed over 
+    a process pool, and the occupied sites of each structure are 
+    yielded in the order of the input structures as soon as they are 
+    identified. The sites of each structure are returned as a SiteList 
+    of views of one compact SiteTable (available as its table 
+    attribute). Accepts the same arguments as enumerate_occupied_sites.
+
+    Parameters
+    ----------
+    images : list of ase.Atoms objects or str
+        The structures, or the name of a trajectory file.
+
+    adsorption_sites : acat.adsorption_sites.ClusterAdsorptionSites \
+        object or acat.adsorption_sites.SlabAdsorptionSites object, \
+        default None
+        The built-in adsorption sites class shared by all structures. 
+        It is sent to each worker only once. Make sure all the 
+        structures have the same atom indexing. If this is not 
+        provided, the arguments for identifying adsorption sites can 
+        still be passed in by **kwargs.
+
+    surface : str, default None
+        The surface type (crystal structure + Miller indices)
+        If the structures are periodic surface slabs, this is required.
+        If the structures are nanoparticles, the function enumerates
+        only the sites on the specified surface.
+
+    subtract_heights : dict, default None
+        A dictionary that contains the height to be subtracted from the 
+        bond length when allocating a type of site to an adsorbate. 
+        Default is to allocate the site that is closest to the adsorbate's 
+        binding atom without subtracting height. 
+
+    label_occupied_sites : bool, default False
+        Whether to assign a label to the occupied each site. The string 
+        of the occupying adsorbate is concatentated to the numerical 
+        label that represents the occupied site.
+
+    dmax : float, default 2.5
+        The maximum bond length (in Angstrom) between an atom and its
+        nearest site to be considered as the atom being bound to the site.
+
+    n_jobs : int, default None
+        The number of worker processes. Use all CPUs if not specified.
+        Set n_jobs=1 to enumerate the sites in the current process.
+
+    chunksize : int, default 1
+        The number of structures sent to a worker at a time.
+
+    """
+
+    for sites in _imap_images(_get_batch_occupied_sites, images, 
+                              (adsorption_sites, surface, subtract_heights,
+                               label_occupied_sites, dmax, kwargs), 
+                              n_jobs, chunksize):
+        yield sites
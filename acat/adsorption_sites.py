@@ -3,37 +3,787 @@
 from .settings import adsorbate_elements
 from .utilities import (expand_cell, 
                         get_mic, 
+                        get_mic_batch,
                         custom_warning,
                         is_list_or_tuple, 
                         cart_to_frac, 
                         hash_composition, 
                         neighbor_shell_list, 
-                        get_adj_matrix)
-from .labels import (get_monometallic_cluster_labels, 
-                     get_monometallic_slab_labels,
-                     get_bimetallic_cluster_labels, 
-                     get_bimetallic_slab_labels,
-                     get_multimetallic_cluster_labels, 
-                     get_multimetallic_slab_labels)
-from ase.data import reference_states
-from ase.constraints import ExpCellFilter
+                        get_neighbor_pairs,
+                        get_query_neighbor_pairs,
+                        get_adj_matrix,
+                        VerletNeighborList,
+                        SiteTable,
+                        SiteRow,
+                        SiteList)
+from .labels import get_label_registry
+from .profiling import profiled, stage
+from ase.data import reference_states, covalent_radii
 from ase.geometry import find_mic, wrap_positions
-from ase.optimize import BFGS, FIRE
 from ase import Atoms
-from scipy.spatial.distance import pdist, squareform
-from collections import defaultdict, Counter
-from itertools import combinations, groupby
-from copy import deepcopy
-import networkx as nx
+from collections import defaultdict, Counter, OrderedDict
+from itertools import groupby
+from copy import copy
 import numpy as np
 import warnings
+import tempfile
+import zipfile
+import hashlib
 import random
 import scipy
 import math
+import os
 import re
 warnings.formatwarning = custom_warning
 
 
+# Geometric site skeletons cached by the site objects created with
+# reuse_geometry=True, least recently used first
+_skeletons = OrderedDict()
+_max_skeletons = 16
+
+# Surrogate reference slabs relaxed by SlabAdsorptionSites.mapping,
+# least recently used first
+_reference_slabs = OrderedDict()
+_max_reference_slabs = 16
+
+# Site templates of the surface unit cells of ideal slabs and of the 
+# smallest repeating cells of periodic slabs, least recently used first
+_slab_templates = OrderedDict()
+_max_slab_templates = 16
+
+# Number of repetitions of the unit cell along each lateral direction 
+# that the site templates are obtained from
+_template_repeats = 3
+
+# For each surface whose ideal slabs are tiled from a site template: 
+# the ase.build function, the lattice, the size of the surface unit 
+# cell and whether the slab can also be built with an orthogonal cell
+_template_surfaces = {'fcc100': ('fcc100', 'fcc', (1, 1), False),
+                      'fcc111': ('fcc111', 'fcc', (1, 1), True),
+                      'fcc211': ('fcc211', 'fcc', (3, 1), False),
+                      'bcc100': ('bcc100', 'bcc', (1, 1), False),
+                      'bcc110': ('bcc110', 'bcc', (1, 1), True),
+                      'hcp0001': ('hcp0001', 'hcp', (1, 1), True)}
+
+# Attributes of the site objects that depend on the chemical symbols
+_symbol_attributes = frozenset(['atoms', 'positions', 'symbols', 'numbers',
+                                'metals', 'label_registry', 'label_dict', 
+                                'site_list'])
+
+
+class _SiteSkeleton(object):
+    """The composition-independent part of an adsorption site object,
+    i.e. the state after the geometric analysis (geometry) and after 
+    the site identification (final), the site list of the first 
+    structure, and the compositions of each site seen so far for the
+    symbols of the atoms that define the site."""
+
+    def __init__(self, geometry, final, site_list):
+        self.geometry = geometry
+        self.final = final
+        self.site_list = site_list
+        self.compositions = {}
+
+    def __getstate__(self):
+        # The neighbor lists are not pickled and are rebuilt on first 
+        # use by the site objects
+        state = self.__dict__.copy()
+        for k in ['geometry', 'final']:
+            state[k] = {a: v for a, v in state[k].items() if a != 'nblist'}
+
+        return state
+
+
+def _get_geometry_key(atoms, settings, surrogate_metal):
+    # The surrogate metal is chosen from the most common metal if not
+    # given, which must then be part of the key as well
+    if surrogate_metal is None:
+        common_metal = Counter(atoms.symbols).most_common(1)[0][0]
+        if common_metal in ['Ni', 'Cu', 'Pd', 'Ag', 'Pt', 'Au']:
+            surrogate_metal = common_metal
+    h = hashlib.sha1()
+    for a in [atoms.positions, atoms.cell.array]:
+        h.update((np.round(a, 5) + 0.).tobytes())
+    h.update(np.asarray(atoms.pbc, dtype=bool).tobytes())
+    h.update(repr((settings, surrogate_metal)).encode())
+
+    return h.hexdigest()
+
+
+def _copy_state(state):
+    # The lists of atom indices are extended in place by some methods
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in 
+            state.items()}
+
+
+def _get_state(sas):
+    # The neighbor list given by the caller belongs to the site object
+    return _copy_state({k: v for k, v in sas.__dict__.items() 
+                        if k not in _symbol_attributes and 
+                        k != 'neighbor_list'})
+
+
+def _store_skeleton(key, skeleton):
+    _skeletons[key] = skeleton
+    _skeletons.move_to_end(key)
+    while len(_skeletons) > _max_skeletons:
+        _skeletons.popitem(last=False)
+
+
+def _get_reference_key(atoms, surface, ref_symbol, optimize_surrogate_cell):
+    # The relaxed reference slab only depends on the geometry, not on 
+    # the elements, which are all replaced by the surrogate metal
+    h = hashlib.sha1()
+    for a in [atoms.cell.array, atoms.get_scaled_positions(wrap=False)]:
+        h.update((np.round(a, 8) + 0.).tobytes())
+    h.update(np.asarray(atoms.pbc, dtype=bool).tobytes())
+    h.update(repr((surface, ref_symbol, optimize_surrogate_cell)).encode())
+
+    return h.hexdigest()
+
+
+def _get_site_atoms(site_list):
+    # The table and the rows of the sites, the indices of the atoms 
+    # that contribute to each site padded with 0, and the mask of the 
+    # valid indices
+    table = site_list.table
+    rows = np.asarray([st.row for st in site_list], dtype=int)
+    indices = table.indices[rows]
+    mask = np.arange(indices.shape[1]) < table.n_indices[rows,None]
+
+    return table, rows, np.where(mask, indices, 0), mask
+
+
+def _get_composition_keys(site_list, numbers):
+    # Key each site by its row and the atomic numbers of the atoms
+    # that contribute to the site and of the subsurface atom
+    table, rows, indices, mask = _get_site_atoms(site_list)
+    local = np.where(mask, numbers[indices], -1)
+    subsurf = table.subsurf_indices[rows]
+    local = np.column_stack([local, np.where(subsurf < 0, -1, 
+                             numbers[np.maximum(subsurf, 0)])])
+
+    return [(i, l.tobytes()) for i, l in enumerate(local)]
+
+
+def _record_compositions(sas, skeleton):
+    """Store the compositions of the sites of a site object built with
+    the geometry of a skeleton. Returns False if the sites do not match 
+    the skeleton."""
+
+    sl, ref = sas.site_list, skeleton.site_list
+    if len(sl) != len(ref) or any(s['indices'] != r['indices'] or 
+    s['site'] != r['site'] for s, r in zip(sl, ref)):
+        return False
+    compositions = skeleton.compositions.setdefault(tuple(sas.metals), {})
+    for k, st in zip(_get_composition_keys(sl, sas.numbers), sl):
+        compositions[k] = (st['composition'], st['subsurf_element'])
+
+    return True
+
+
+def _relabel_from_skeleton(sas, skeleton):
+    """Get the site list of the skeleton with the compositions, the 
+    subsurface elements and the labels of the current symbols. Returns
+    None if the composition of any site has not been seen before."""
+
+    sl = SiteList.from_sites(skeleton.site_list)
+    if not sas.composition_effect:
+        return sl
+    compositions = skeleton.compositions.get(tuple(sas.metals))
+    if compositions is None:
+        return None
+    values = [compositions.get(k) for k in 
+              _get_composition_keys(skeleton.site_list, sas.numbers)]
+    if any(v is None for v in values):
+        return None
+    for st, (composition, subsurf_element) in zip(sl, values):
+        st['composition'] = composition
+        st['subsurf_element'] = subsurf_element
+    if sas.label_sites:
+        sas.site_list = sl
+        sas.get_labels()
+
+    return sl
+
+
+def _update_compositions(sas, atoms, changed):
+    """Update the compositions, the subsurface elements and the labels 
+    of the sites that involve the atoms with changed elements. The 
+    compositions are taken from a memo keyed by the atomic numbers of
+    the atoms that define each site, or else from a site search on 
+    the current geometry with the new elements."""
+
+    sl = sas.site_list
+    table, rows, indices, mask = _get_site_atoms(sl)
+    subsurf = table.subsurf_indices[rows]
+    metals = sorted(list(set(atoms.symbols)))
+    if len(metals) == 1:
+        metals *= 2
+    # The format of the compositions depends on the number of metals
+    if metals != sas.metals:
+        affected = np.arange(len(sl))
+    else:
+        affected = np.flatnonzero(np.any(mask & changed[indices], 1) | 
+                                  ((subsurf >= 0) & changed[np.maximum(subsurf, 0)]))
+    if not len(affected):
+        return
+
+    memo = sas.__dict__.setdefault('_composition_memo', {})
+    old = memo.setdefault(tuple(sas.metals), {})
+    keys = _get_composition_keys(sl, sas.numbers)
+    for i in affected:
+        old[keys[i]] = (sl[i]['composition'], sl[i]['subsurf_element'])
+    if metals != sas.metals:
+        sas.metals = metals
+        sas.label_registry = get_label_registry(getattr(sas, 'surface', None),
+                                                metals, sas.composition_effect)
+        sas.label_dict = sas.label_registry.label_dict
+
+    new = memo.setdefault(tuple(metals), {})
+    keys = _get_composition_keys(sl, atoms.numbers)
+    values = [new.get(keys[i]) for i in affected]
+    if any(v is None for v in values):
+        ref_atoms = Atoms(atoms.numbers, positions=sas.positions,
+                          cell=sas.cell, pbc=sas.pbc)
+        nsas = sas._rebuild(ref_atoms, reuse_geometry=True)
+        found = {(st['site'], st['indices']): (st['composition'], 
+                 st['subsurf_element']) for st in nsas.site_list}
+        for k, st in zip(keys, sl):
+            v = found.get((st['site'], st['indices']))
+            if v is not None:
+                new[k] = v
+        values = [new.get(keys[i]) for i in affected]
+    for i, v in zip(affected, values):
+        if v is None:
+            warnings.warn('Cannot update the composition of site {}'.format(
+                          sl[i]['indices']))
+            continue
+        sl[i]['composition'], sl[i]['subsurf_element'] = v
+    if sas.label_sites:
+        sas.get_labels()
+
+
+def _update_sites(sas, atoms, dvecs, get_neighbors, update_composition=False,
+                  normal_tol=.05):
+    """Update a site object in place given an updated atoms object with
+    the same indexing and the displacement of each atom. The sites are 
+    shifted by the average displacement of their atoms, and the normal 
+    vectors of the sites with an atom that moved more than normal_tol 
+    are rotated by the rotation that best maps the bonds around the 
+    atoms of the site before the update onto those after the update.
+    The rotated normal vectors only approximate those of the site 
+    search."""
+
+    assert len(atoms) == len(sas.atoms), 'the indexing must be preserved'
+    sas.__dict__.pop('_neighbor_site_lists', None)
+    if not isinstance(sas.site_list, SiteList) or sas.site_list.table is None:
+        sas.site_list = SiteList.from_sites(sas.site_list)
+    sl = sas.site_list
+    if update_composition:
+        changed = atoms.numbers != sas.numbers
+        if sas.composition_effect and changed.any():
+            _update_compositions(sas, atoms, changed)
+        elif changed.any():
+            sas.metals = sorted(list(set(atoms.symbols)))
+    else:
+        # Keep the elements that the compositions refer to
+        atoms.numbers = sas.numbers
+    if not len(sl):
+        sas.atoms, sas.positions = atoms, atoms.positions
+        sas.symbols, sas.numbers = atoms.symbols, atoms.numbers
+        return
+
+    table, rows, indices, mask = _get_site_atoms(sl)
+    shifts = np.sum(dvecs[indices] * mask[...,None], 1) / mask.sum(1)[:,None]
+    table.positions[rows] = np.round(table.positions[rows] + shifts, 8)
+
+    disp = np.linalg.norm(dvecs, axis=1)
+    moved = np.flatnonzero(np.any(mask & (disp[indices] > normal_tol), 1))
+    nonormal = set(table.extra.get('normal', ()))
+    moved = np.asarray([i for i in moved if rows[i] not in nonormal], dtype=int)
+    if len(moved):
+        a, b = [], []
+        for i in np.unique(indices[moved][mask[moved]]):
+            nbs = get_neighbors(i)
+            a += [i] * len(nbs)
+            b += list(nbs)
+        a, b = np.asarray(a, dtype=int), np.asarray(b, dtype=int)
+        v0, _ = find_mic(sas.positions[b] - sas.positions[a], sas.cell, sas.pbc)
+        v1 = v0 + dvecs[b] - dvecs[a]
+        # Kabsch algorithm on the sum of the covariance matrices of the
+        # bonds of each atom in the site
+        H = np.zeros((len(atoms), 3, 3))
+        np.add.at(H, a, v0[:,:,None] * v1[:,None,:])
+        H = np.sum(H[indices[moved]] * mask[moved][...,None,None], 1)
+        u, _, vt = np.linalg.svd(H)
+        u[:,:,2] *= np.where(np.linalg.det(u @ vt) < 0, -1., 1.)[:,None]
+        normals = np.einsum('ij,ijk->ik', table.normals[rows[moved]], u @ vt)
+        normals /= np.linalg.norm(normals, axis=1)[:,None]
+        table.normals[rows[moved]] = np.round(normals, 8)
+
+    sas.atoms, sas.positions = atoms, atoms.positions
+    sas.symbols, sas.numbers = atoms.symbols, atoms.numbers
+
+
+def _get_neighbor_shells(statoms, dx, neighbor_number, span, mic):
+    """Get the neighbor shells of each atom, where the distances from 
+    an atom sorted in ascending order are split into shells wherever 
+    two consecutive distances differ by more than dx, and the 0th 
+    shell contains the atom itself. Only the distances within a cutoff
+    are computed, and the cutoff is doubled for the atoms whose 
+    neighbor_number-th shell is not closed within the cutoff."""
+
+    n = len(statoms)
+    nbslist = {}
+    pending = np.arange(n)
+    cutoff = 2.5 * neighbor_number + dx
+    while len(pending):
+        i, j, d = get_neighbor_pairs(statoms, cutoff, mic=mic)
+        complete = len(i) == n * (n - 1)
+        keep = np.isin(i, pending)
+        # Add each atom itself at distance 0 and sort by distance
+        i = np.concatenate([i[keep], pending])
+        j = np.concatenate([j[keep], pending])
+        d = np.concatenate([d[keep], np.zeros(len(pending))])
+        order = np.lexsort((d, i))
+        i, j, d = i[order], j[order], d[order]
+        starts = np.searchsorted(i, pending)
+        gaps = np.zeros(len(i), dtype=int)
+        gaps[1:] = np.diff(d) > dx
+        gaps[starts] = 0
+        shells = np.cumsum(gaps)
+        shells -= shells[starts][np.searchsorted(pending, i)]
+
+        # A shell is closed if the next distance, which is at least 
+        # the cutoff, would be further than dx away
+        last = np.full(len(pending), -np.inf)
+        np.maximum.at(last, np.searchsorted(pending, i[shells == 
+                      neighbor_number]), d[shells == neighbor_number])
+        closed = complete | (np.isfinite(last) & (last + dx < cutoff))
+        if span:
+            select = (shells >= 1) & (shells <= neighbor_number)
+        else:
+            select = shells == neighbor_number
+        select &= closed[np.searchsorted(pending, i)]
+        i, j = i[select], j[select]
+        order = np.lexsort((j, i))
+        i, j = i[order], j[order]
+        bounds = np.searchsorted(i, pending[closed])
+        for k, js in zip(pending[closed], np.split(j, bounds[1:])):
+            nbslist[k] = js.tolist()
+        pending = pending[~closed]
+        cutoff *= 2
+
+    return {k: nbslist[k] for k in range(n)}
+
+
+def _get_neighbor_site_list(sas, mic, dx, neighbor_number, radius, span, 
+                            unique, unique_composition, unique_subsurf):
+    # Memoize the neighbor lists of the current site list. Only a site
+    # list of one site table can tell that it has been changed in 
+    # place: by its version, the version of the table and the positions,
+    # which can also be changed through the views of the rows
+    sl = sas.site_list
+    table = sl.table if isinstance(sl, SiteList) else None
+    if table is not None:
+        poss = sl.get_positions()
+        versions = (sl._version, table._version)
+        cache = sas.__dict__.get('_neighbor_site_lists')
+        if cache is None or cache[0] is not sl or cache[1] is not table or (
+        cache[2] != versions) or not np.array_equal(cache[3], poss):
+            cache = sas._neighbor_site_lists = (sl, table, versions, poss, {})
+        key = (dx, neighbor_number, radius, span, unique, 
+               unique_composition, unique_subsurf)
+        nbslist = cache[4].get(key)
+        if nbslist is not None:
+            return {k: list(v) for k, v in nbslist.items()}
+    else:
+        cache = None
+        poss = np.asarray([s['position'] for s in sl]).reshape(-1, 3)
+    statoms = Atoms('X{}'.format(len(sl)), positions=poss,
+                    cell=sas.cell, pbc=sas.pbc)
+    if radius is not None:                                                           
+        nbslist = neighbor_shell_list(statoms, dx, neighbor_number=1,
+                                      mic=mic, radius=radius, span=span)
+    else:
+        nbslist = _get_neighbor_shells(statoms, dx, neighbor_number, 
+                                       span, mic)
+    if unique:
+        for i in range(len(nbslist)):
+            nbsids = nbslist[i]
+            tmpids = sas.get_unique_sites(unique_composition, unique_subsurf,
+                                          return_site_indices=True,
+                                          site_list=[sl[ni] for ni in nbsids])
+            nbsids = [nbsids[j] for j in tmpids]
+            nbslist[i] = nbsids
+    if cache is not None:
+        cache[4][key] = nbslist
+
+    return {k: list(v) for k, v in nbslist.items()}
+
+
+def _union_find(n, pairs):
+    """Get the root of each of n nodes after joining each pair of nodes,
+    where the root of a connected set of nodes is its smallest node.
+    The roots are hooked onto the smaller root of each pair and
+    compressed by pointer jumping until all pairs share a root."""
+
+    parent = np.arange(n)
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    while True:
+        roots = parent[pairs]
+        if (roots[:,0] == roots[:,1]).all():
+            return parent
+        lo = roots.min(1)
+        np.minimum.at(parent, roots[:,0], lo)
+        np.minimum.at(parent, roots[:,1], lo)
+        while True:
+            grand = parent[parent]
+            if (grand == parent).all():
+                break
+            parent = grand
+
+
+def _get_facet_paths(sites, ve_mask):
+    # The indices of each site that are not vertex or edge atoms, and
+    # the pairs of consecutive indices that connect each facet
+    reduced = [[i for i in s['indices'] if not ve_mask[i]] for s in sites]
+    pairs = [(p[k], p[k+1]) for p in reduced for k in range(len(p) - 1)]
+
+    return reduced, pairs
+
+
+def _group_by_facet_ids(sites, facet_ids):
+    # Groups are ordered by the first site on each facet. The sites
+    # without a facet atom belong to every group
+    order = {}
+    for fid in facet_ids:
+        if fid >= 0 and fid not in order:
+            order[fid] = len(order)
+    grouped_sites = defaultdict(list)
+    for site, fid in zip(sites, facet_ids):
+        if fid >= 0:
+            grouped_sites[order[fid]].append(site)
+        else:
+            for g in order.values():
+                grouped_sites[g].append(site)
+
+    return grouped_sites
+
+
+def _get_point_group(positions, labels, tol=.05, ref_positions=None):
+    """Get the point group of a nanoparticle as the proper and improper
+    rotations about its geometric center that map each atom within tol
+    (in Angstrom) of an atom with the same label, and the permutation
+    of the atoms by each rotation. The candidate rotations map two atoms
+    of the smallest shell of atoms with the same label and distance from
+    the center onto each pair of atoms of the shell. Only the candidates
+    that are not products of the operations found so far are checked 
+    against all atoms. If ref_positions is given, the rotations must 
+    permute these positions in the same way. Returns the rotations and
+    the permutations with the identity first, where atom i is mapped 
+    onto atom permutations[g,i]."""
+
+    from scipy.spatial import cKDTree
+    labels = np.asarray(labels)
+    natoms = len(positions)
+    rotations, permutations = [np.eye(3)], [np.arange(natoms)]
+    coords = [positions - positions.mean(axis=0)]
+    if ref_positions is not None:
+        coords.append(ref_positions - ref_positions.mean(axis=0))
+    x = coords[0]
+    trees = [cKDTree(c) for c in coords]
+    d = np.linalg.norm(x, axis=1)
+
+    # Shells of atoms with the same label and distance from the center,
+    # with at least two atoms that are not collinear with the center
+    order = np.lexsort((d, labels))
+    breaks = (np.diff(d[order]) > tol) | (np.diff(labels[order]) != 0)
+    shells = [s for s in np.split(order, np.flatnonzero(breaks) + 1) if
+              len(s) > 1 and d[s[0]] > tol and np.linalg.norm(np.cross(
+              x[s[0]], x[s]), axis=1).max() > tol * d[s[0]]]
+    if not shells:
+        return np.asarray(rotations), np.asarray(permutations)
+    shell = min(shells, key=len)
+    ia = shell[0]
+    ib = shell[np.argmax(np.linalg.norm(np.cross(x[ia], x[shell]), axis=1))]
+    a, b = x[ia], x[ib]
+    inv = np.linalg.inv([a, b, np.cross(a, b)])
+
+    def get_permutation(R, indices=None):
+        # The permutation of the atoms by a rotation, or None if the
+        # rotation is not a symmetry operation
+        perm = None
+        for c, tree in zip(coords, trees):
+            ids = np.arange(natoms) if indices is None else indices
+            dists, p = tree.query(c[ids] @ R.T, distance_upper_bound=tol)
+            if np.isinf(dists).any() or np.any(labels[p] != labels[ids]):
+                return None
+            if perm is not None and np.any(p != perm):
+                return None
+            perm = p
+        if indices is None and np.bincount(perm).max() > 1:
+            return None
+
+        return perm
+
+    # Each operation is identified by the images of the two atoms and
+    # whether it is proper
+    seen = {(ia, ib, 1)}
+    generators = []
+    for i in shell:
+        for j in shell:
+            if i == j or abs(x[i] @ x[j] - a @ b) > 4 * tol * d[i]:
+                continue
+            for sign in [1, -1]:
+                if (i, j, sign) in seen:
+                    continue
+                R = (inv @ [x[i], x[j], sign * np.cross(x[i], x[j])]).T
+                # Take the closest orthogonal matrix
+                u, _, vt = np.linalg.svd(R)
+                R = u @ vt
+                if get_permutation(R, shell) is None:
+                    continue
+                perm = get_permutation(R)
+                if perm is None:
+                    continue
+                # Close the group under the products with the generators
+                generators.append((R, perm))
+                k = 0
+                while k < len(permutations):
+                    for Rg, pg in generators:
+                        R, perm = Rg @ rotations[k], pg[permutations[k]]
+                        key = (perm[ia], perm[ib], 
+                               int(np.sign(np.linalg.det(R))))
+                        if key not in seen:
+                            seen.add(key)
+                            rotations.append(R)
+                            permutations.append(perm)
+                    k += 1
+
+    return np.asarray(rotations), np.asarray(permutations)
+
+
+def _get_symmetric_sites(sites, positions, rotations, permutations):
+    """Generate the images of the sites of a nanoparticle under its
+    symmetry operations, given by the rotations about the geometric
+    center and the permutations of the atoms. The position of each image
+    is shifted by the average displacement of its atoms from the rotated
+    atoms, and the normal is rotated. Returns the images that are not
+    in the given sites, without duplicates."""
+
+    center = positions.mean(axis=0)
+    rotated = np.einsum('gij,nj->gni', rotations, positions - center)
+    shifts = positions[permutations] - rotated - center
+    seen = {tuple(st['indices']) for st in sites}
+    images = []
+    for st in sites:
+        indices = list(st['indices'])
+        keys = np.sort(permutations[:,indices], axis=1)
+        first = []
+        for g in np.unique(keys, axis=0, return_index=True)[1]:
+            key = tuple(keys[g].tolist())
+            if key not in seen:
+                seen.add(key)
+                first.append(g)
+        if not first:
+            continue
+        R = rotations[first]
+        positions = np.round(R @ (st['position'] - center) + center + 
+                             shifts[np.ix_(first, indices)].mean(axis=1), 8)
+        if st['normal'] is not None:
+            normals = np.round(R @ st['normal'], 8)
+        for k, g in enumerate(first):
+            image = st.copy()
+            image['indices'] = tuple(keys[g].tolist())
+            image['position'] = positions[k]
+            if st['normal'] is not None:
+                image['normal'] = normals[k]
+            if st['subsurf_index'] is not None:
+                image['subsurf_index'] = int(permutations[g,
+                                             st['subsurf_index']])
+            images.append(image)
+
+    return images
+
+
+# Version of the format of the saved site objects
+_site_format_version = 1
+
+# Constructor options that affect the sites of each site class
+_site_settings = {'ClusterAdsorptionSites': ('allow_6fold',
+                                             'composition_effect',
+                                             'ignore_bridge_sites',
+                                             'label_sites',
+                                             'surrogate_metal',
+                                             'tol'),
+                  'SlabAdsorptionSites': ('surface',
+                                          'allow_6fold',
+                                          'composition_effect',
+                                          'both_sides',
+                                          'ignore_bridge_sites',
+                                          'label_sites',
+                                          'surrogate_metal',
+                                          'optimize_surrogate_cell',
+                                          'tol',
+                                          '_allow_expand',
+                                          '_ref_atoms_key')}
+
+
+def _get_cache_key(cls, atoms, settings):
+    # Content address of the sites of a structure identified with
+    # the given settings
+    h = hashlib.sha1()
+    h.update(repr((_site_format_version, cls.__name__,
+                   sorted(settings.items()))).encode())
+    for a in [atoms.positions, atoms.cell.array]:
+        h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+    h.update(np.asarray(atoms.pbc, dtype=bool).tobytes())
+    h.update(np.asarray(atoms.numbers, dtype=np.int64).tobytes())
+
+    return h.hexdigest()
+
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError('{} is not JSON serializable'.format(type(o)))
+
+
+def _save_sites(sas, filename):
+    """Save the sites and the geometric analysis of a site object to a
+    compressed npz file. The neighbor list and the CNA signatures are 
+    not saved, and are recomputed on first use after loading."""
+
+    import json
+    from scipy.sparse import csr_matrix
+    cls = type(sas).__name__
+    sl = sas.site_list
+    if not isinstance(sl, SiteList) or sl.table is None:
+        sl = SiteList.from_sites(sl)
+    table = sl.table.take([s.row for s in sl])
+    arrays = {'site_' + k: v for k, v in table.to_arrays().items()}
+    meta = {'version': _site_format_version, 'class': cls,
+            'settings': {k: getattr(sas, k) for k in _site_settings[cls]}}
+    for name in ['atoms', 'ref_atoms']:
+        a = getattr(sas, name)
+        arrays.update({name + '_numbers': a.numbers,
+                       name + '_positions': a.positions,
+                       name + '_cell': a.cell.array,
+                       name + '_pbc': a.pbc})
+    if cls == 'ClusterAdsorptionSites':
+        meta.update({'r': sas.r, 'surf_ids': sas.surf_ids,
+                     'surf_sites': sas.surf_sites,
+                     'site_dict': sas.site_dict})
+    else:
+        adj_matrix = csr_matrix(sas.adj_matrix)
+        arrays.update({'delta_positions': sas.delta_positions,
+                       'adj_data': adj_matrix.data,
+                       'adj_indices': adj_matrix.indices,
+                       'adj_indptr': adj_matrix.indptr})
+        meta.update({'surf_ids': sas.surf_ids,
+                     'subsurf_ids': sas.subsurf_ids})
+    arrays['meta'] = np.asarray(json.dumps(meta, default=_json_default))
+
+    # Write to a temporary file first, so that other processes never
+    # read a partially written file
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmpname = tempfile.mkstemp(suffix='.npz', dir=dirname)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmpname, filename)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+
+def _load_sites(sas, filename):
+    """Restore a site object from a file written by _save_sites."""
+
+    import json
+    from scipy.sparse import csr_matrix
+    with np.load(filename, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        cls = type(sas).__name__
+        if meta.get('version') != _site_format_version:
+            raise ValueError('unsupported format version of ' + filename)
+        if meta['class'] != cls:
+            raise ValueError('{} contains the sites of a {} object'.format(
+                             filename, meta['class']))
+        atoms = {}
+        for name in ['atoms', 'ref_atoms']:
+            atoms[name] = Atoms(data[name + '_numbers'],
+                                positions=data[name + '_positions'],
+                                cell=data[name + '_cell'],
+                                pbc=data[name + '_pbc'])
+        table = SiteTable.from_arrays({k[5:]: data[k] for k in data.files
+                                       if k.startswith('site_')})
+        if cls == 'SlabAdsorptionSites':
+            n = len(atoms['atoms'])
+            sas.delta_positions = data['delta_positions']
+            sas.adj_matrix = csr_matrix((data['adj_data'], 
+                                         data['adj_indices'],
+                                         data['adj_indptr']), shape=(n, n))
+            sas.subsurf_ids = meta['subsurf_ids']
+        else:
+            sas.r = meta['r']
+            sas.site_dict = meta['site_dict']
+            sas.surf_sites = meta['surf_sites']
+            sas.fullCNA = {}
+
+    sas.__dict__.update(meta['settings'])
+    sas.atoms = atoms['atoms']
+    sas.positions = sas.atoms.positions
+    sas.symbols = sas.atoms.symbols
+    sas.numbers = sas.atoms.numbers
+    sas.indices = list(range(len(sas.atoms)))
+    sas.metals = sorted(list(set(sas.atoms.symbols)))
+    if sas.composition_effect and len(sas.metals) == 1:
+        sas.metals *= 2
+    sas.label_registry = get_label_registry(getattr(sas, 'surface', None),
+                                            sas.metals,
+                                            sas.composition_effect)
+    sas.label_dict = sas.label_registry.label_dict
+    sas.ref_atoms = atoms['ref_atoms']
+    sas.cell = sas.atoms.cell
+    sas.pbc = sas.atoms.pbc
+    sas.surf_ids = meta['surf_ids']
+    sas.site_list = SiteList(SiteRow(table, i) for i in range(len(table)))
+
+
+def _get_cache_file(sas, atoms):
+    settings = {k: getattr(sas, k) for k in _site_settings[type(sas).__name__]}
+
+    return os.path.join(sas.cache_dir, _get_cache_key(type(sas), atoms, 
+                        settings) + '.npz')
+
+
+def _load_cache_file(sas, cache_file):
+    """Restore a site object from the cache. Returns False if the sites
+    are not cached or the cache file cannot be read."""
+
+    if not os.path.isfile(cache_file):
+        return False
+    try:
+        _load_sites(sas, cache_file)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        warnings.warn('ignoring the site cache file {}: {}'.format(
+                      cache_file, e))
+        return False
+
+    return True
+
+
+def _save_cache_file(sas, cache_file):
+    os.makedirs(sas.cache_dir, exist_ok=True)
+    _save_sites(sas, cache_file)
+
+
 class ClusterAdsorptionSites(object):
     """Base class for identifying adsorption sites on a nanoparticle.
     Support common nanoparticle shapes including: Mackay icosahedron, 
@@ -112,6 +862,43 @@ class ClusterAdsorptionSites(object):
         than 300 atoms), Cu is normally the better choice, while 
         Au should be good for larger nanoparticles.
 
+    reuse_geometry : bool, default False
+        Whether to cache the geometric skeleton of the sites under a
+        fingerprint of the positions, the cell and the settings. The
+        sites of a later structure with the same geometry, e.g. a 
+        different chemical ordering of the same nanoparticle, are then 
+        obtained by only updating the compositions, the subsurface 
+        elements and the labels. Useful for screening many chemical 
+        orderings. Sites with a local composition that has not been 
+        seen before fall back to a site search on the cached geometry.
+
+    cache_dir : str, default None
+        The directory of a persistent on-disk cache of the sites. The 
+        sites are saved to a compressed npz file named by a hash of the 
+        positions, the cell, the periodic boundary conditions, the 
+        atomic numbers and the settings, and are loaded from that file
+        when the same structure is identified again with the same 
+        settings, e.g. in another job. Useful for pipelines that 
+        re-run the site identification for identical structures.
+
+    use_symmetry : bool, default False
+        Whether to use the point group of the nanoparticle to reduce 
+        the site search. The symmetry operations are detected with the
+        elements included if composition_effect=True (see 
+        get_symmetry_operations). Only the sites of one surface atom 
+        of each set of symmetry-equivalent surface atoms are searched, 
+        and the other sites are generated by the symmetry operations.
+        Useful for large monometallic or symmetric alloy nanoparticles
+        with high symmetry, e.g. the icosahedra, octahedra and 
+        decahedra built by ase.cluster.
+
+    neighbor_list : acat.utilities.VerletNeighborList object, default None
+        A neighbor list with a skin distance that is kept across the 
+        site identifications of a series of structures, e.g. the frames 
+        of a relaxation trajectory. The neighbor search of the surrogate
+        nanoparticle is then only repeated when an atom moved by more 
+        than half the skin. A new neighbor list is used if not specified.
+
     Example
     -------
     The following example illustrates the most important use of a
@@ -143,13 +930,18 @@ class ClusterAdsorptionSites(object):
 
     """
 
+    @profiled
     def __init__(self, atoms, 
                  allow_6fold=False, 
                  composition_effect=False,
                  ignore_bridge_sites=False,
                  label_sites=False,
                  surrogate_metal=None,
-                 tol=.5):
+                 tol=.5,
+                 reuse_geometry=False,
+                 cache_dir=None,
+                 use_symmetry=False,
+                 neighbor_list=None):
 
         assert True not in atoms.pbc, 'the cell must be non-periodic'
         warnings.filterwarnings('ignore', category=RuntimeWarning)
@@ -173,29 +965,50 @@ class ClusterAdsorptionSites(object):
         self.ignore_bridge_sites = ignore_bridge_sites
         self.surrogate_metal = surrogate_metal
         self.tol = tol
-        
-        self.ref_atoms = self.mapping(atoms)
-        self.cell = atoms.cell
-        self.pbc = atoms.pbc
-        self.metals = sorted(list(set(atoms.symbols)))
         self.label_sites = label_sites
-
-        if self.composition_effect:
-            if len(self.metals) <= 2:
-                if len(self.metals) == 1:
-                    self.metals *= 2                
-                self.label_dict = get_bimetallic_cluster_labels(self.metals)
-            else:
-                self.label_dict = get_multimetallic_cluster_labels(self.metals)
-        else: 
-            self.label_dict = get_monometallic_cluster_labels()
-
-        self.fullCNA = {}
-        self.make_fullCNA()
-        self.set_first_neighbor_distance_from_rdf()
-        self.site_dict = self.get_site_dict()
-        self.make_neighbor_list()
-        self.surf_ids, self.surf_sites = self.get_surface_sites()
+        self.reuse_geometry = reuse_geometry
+        self.cache_dir = cache_dir
+        self.use_symmetry = use_symmetry
+        self.neighbor_list = neighbor_list
+        self.metals = sorted(list(set(atoms.symbols)))
+        if self.composition_effect and len(self.metals) == 1:
+            self.metals *= 2                
+        self.label_registry = get_label_registry(None, self.metals,
+                                                 self.composition_effect)
+        self.label_dict = self.label_registry.label_dict
+
+        if self.cache_dir is not None:
+            cache_file = _get_cache_file(self, atoms)
+            if _load_cache_file(self, cache_file):
+                return
+
+        skeleton = None
+        if self.reuse_geometry:
+            key = _get_geometry_key(atoms, ('cluster', allow_6fold, 
+                                    composition_effect, ignore_bridge_sites, 
+                                    label_sites, tol), surrogate_metal)
+            skeleton = _skeletons.get(key)
+        if skeleton is not None:
+            _skeletons.move_to_end(key)
+            site_list = _relabel_from_skeleton(self, skeleton)
+            if site_list is not None:
+                self.__dict__.update(_copy_state(skeleton.final))
+                self.site_list = site_list
+                if self.cache_dir is not None:
+                    _save_cache_file(self, cache_file)
+                return
+            self.__dict__.update(_copy_state(skeleton.geometry))
+        else:
+            self.ref_atoms = self.mapping(atoms)
+            self.cell = atoms.cell
+            self.pbc = atoms.pbc
+            self.fullCNA = {}
+            self.make_fullCNA()
+            self.set_first_neighbor_distance_from_rdf()
+            self.site_dict = self.get_site_dict()
+            self.make_neighbor_list()
+            self.surf_ids, self.surf_sites = self.get_surface_sites()
+            geometry = _get_state(self)
 
         self.site_list = []
         self.populate_site_list()
@@ -204,28 +1017,61 @@ class ClusterAdsorptionSites(object):
         if self.ignore_bridge_sites:
             self.site_list = [s for s in self.site_list if 'bridge' not in s['site']]
         self.site_list.sort(key=lambda x: x['indices'])
+        self.site_list = SiteList.from_sites(self.site_list)
+
+        if self.reuse_geometry:
+            if skeleton is None or not _record_compositions(self, skeleton):
+                if skeleton is not None:
+                    geometry = skeleton.geometry
+                skeleton = _SiteSkeleton(geometry, _get_state(self),
+                                         SiteList.from_sites(self.site_list))
+                _record_compositions(self, skeleton)
+                _store_skeleton(key, skeleton)
+        if self.cache_dir is not None:
+            _save_cache_file(self, cache_file)
  
+    @profiled
     def populate_site_list(self):
         """Find all ontop, bridge and hollow sites (3-fold and 4-fold) 
         given an input nanoparticle based on CNA analysis of the suface
         atoms and collect in a site list."""
 
+        from scipy.spatial import cKDTree
         ss = self.surf_sites
         ssall = set(ss['all'])
-        fcna = self.get_fullCNA()
+        is_surf = np.zeros(len(self.atoms), dtype=bool)
+        is_surf[ss['all']] = True
         sl = self.site_list
         usi = set()  # used_site_indices
         normals_for_site = dict(list(zip(ssall, [[] for _ in ssall])))
+        positions = self.positions
+        ref_positions = self.ref_atoms.positions
+        # Only search the sites of the surface atoms that are the first
+        # of their orbits under the point group
+        is_rep = np.ones(len(self.atoms), dtype=bool)
+        if self.use_symmetry:
+            with stage('ClusterAdsorptionSites.get_point_group'):
+                labels = self.numbers if self.composition_effect else \
+                         np.zeros(len(self.atoms), dtype=int)
+                rotations, permutations = _get_point_group(positions, 
+                    labels, ref_positions=ref_positions)
+            is_rep = permutations.min(axis=0) == np.arange(len(self.atoms))
+        # Look up the atoms close to a point in KD-trees instead of 
+        # looping over all atoms
+        ref_tree = cKDTree(ref_positions)
+        tree = cKDTree(positions)
         for surface, sites in ss.items():
             if surface == 'all':
                 continue
             for s in sites:
+                if not is_rep[s]:
+                    continue
                 neighbors, _, dist2 = self.nblist.get_neighbors(s, self.r + 0.2)
-                for n in neighbors:
+                for n in neighbors[is_surf[neighbors]]:
                     si = tuple(sorted([s, n]))  # site_indices
-                    if n in ssall and si not in usi:
+                    if si not in usi:
                         # bridge sites
-                        pos = np.average(self.positions[[n, s]], 0)
+                        pos = np.average(positions[[n, s]], 0)
                         site_surf = self.get_surface_designation([s, n])
                         site = self.new_site()
                         site.update({'site': 'bridge',
@@ -237,148 +1083,180 @@ class ClusterAdsorptionSites(object):
                             site.update({'composition': composition})
                         sl.append(site)
                         usi.add(si)
-                # Find normal
-                for n, m in combinations(neighbors, 2):
+
+                # Get the angles and normals of all pairs of surface 
+                # neighbors at once, in the order of combinations
+                ii, jj = np.triu_indices(len(neighbors), 1)
+                surf_pairs = is_surf[neighbors[ii]] & is_surf[neighbors[jj]]
+                ii, jj = ii[surf_pairs], jj[surf_pairs]
+                vec1 = positions[neighbors[ii]] - positions[s]
+                vec2 = positions[neighbors[jj]] - positions[s]
+                # Same as get_angle
+                p = np.einsum('ij,ij->i', vec1, vec2) / (np.linalg.norm(vec1, 
+                    axis=1) * np.linalg.norm(vec1, axis=1))
+                angles = np.arccos(np.clip(p, -1, 1))
+                is3fold = np.abs(angles - np.pi/3.) < 0.1
+                is4fold = np.abs(angles - np.pi/2.) < 0.1
+                hollows = np.flatnonzero(is3fold | is4fold)
+                # Same as get_surface_normal
+                normals = np.cross(vec1[hollows], vec2[hollows])
+                normals /= np.sqrt(np.einsum('ij,ij->i', normals, normals))[:,None]
+                dists, _ = ref_tree.query(positions[s] + self.r * normals)
+                normals *= np.where(dists > (5./6)*self.r, 1., -1.)[:,None]
+                nebs2 = None
+                for normal, h in zip(normals, hollows):
+                    n, m = neighbors[ii[h]], neighbors[jj[h]]
                     si = tuple(sorted([s, n, m]))
-                    if n in ssall and m in ssall and si not in usi:
-                        angle = self.get_angle([s, n, m])
-                        if self.is_eq(angle, np.pi/3.):
-                            # 3-fold (fcc or hcp) site
-                            normal = self.get_surface_normal([s, n, m])
-                            for i in [s, n, m]:
-                                normals_for_site[i].append(normal)
-                            pos = np.average(self.positions[[n, m, s]], 0)
-                            new_pos = pos - normal * self.r * (2./3)**(.5)
+                    if si in usi:
+                        continue
+                    if is3fold[h]:
+                        # 3-fold (fcc or hcp) site
+                        for i in [s, n, m]:
+                            normals_for_site[i].append(normal)
+                        pos = np.average(positions[[n, m, s]], 0)
+                        new_pos = pos - normal * self.r * (2./3)**(.5)
+
+                        isubs = [k for k in sorted(ref_tree.query_ball_point(new_pos, 0.5))
+                                 if np.linalg.norm(ref_positions[k] - new_pos) < 0.5]
+                        if not isubs:
+                            this_site = 'fcc'
+                        else:
+                            isub = isubs[0]
+                            this_site = 'hcp'
+                        site_surf = 'fcc111'
 
-                            isubs = [a.index for a in self.ref_atoms if 
-                                     np.linalg.norm(a.position - new_pos) < 0.5]
-                            if not isubs:
-                                this_site = 'fcc'
+                        site = self.new_site()
+                        site.update({'site': this_site,
+                                     'surface': site_surf,
+                                     'position': np.round(pos, 8),
+                                     'normal': np.round(normal, 8),
+                                     'indices': si})
+                        if self.composition_effect:                       
+                            metals = self.metals
+                            if len(metals) == 1:
+                                composition = 3*metals[0]
+                            elif len(metals) == 2:
+                                ma, mb = metals[0], metals[1]
+                                symbols = self.symbols[list(si)]
+                                nma = np.count_nonzero(symbols==ma)
+                                if nma == 0:
+                                    composition = 3*mb
+                                elif nma == 1:
+                                    composition = ma + 2*mb
+                                elif nma == 2:
+                                    composition = 2*ma + mb
+                                elif nma == 3:
+                                    composition = 3*ma
                             else:
-                                isub = isubs[0]
-                                this_site = 'hcp'
-                            site_surf = 'fcc111'
+                                nodes = self.symbols[list(si)]
+                                composition = ''.join(hash_composition(nodes))
+                            site.update({'composition': composition})   
 
+                        if this_site == 'hcp':
+                            site.update({'subsurf_index': isub})
+                            if self.composition_effect:
+                                site.update({'subsurf_element': 
+                                             self.symbols[isub]})
+                        sl.append(site)
+                        usi.add(si)
+
+                    else:
+                        # 4-fold hollow site
+                        site_surf = 'fcc100'
+                        if nebs2 is None:
+                            l2 = self.r * math.sqrt(2) + 0.2
+                            nebs2, _, _ = self.nblist.get_neighbors(s, l2)
+                            nebs2 = nebs2[is_surf[nebs2] & ~np.isin(nebs2, neighbors)]
+                        d1s = np.linalg.norm(ref_positions[nebs2] - ref_positions[n], axis=1)
+                        d2s = np.linalg.norm(ref_positions[nebs2] - ref_positions[m], axis=1)
+                        for k in nebs2[(np.abs(d1s - self.r) < 0.2) & 
+                                       (np.abs(d2s - self.r) < 0.2)]:
+                            si = tuple(sorted([s, n, m, k]))
+                            if si in usi:
+                                continue
+                            # 4-fold hollow site found
+                            # Save the normals now and add them to the site later
+                            for i in [s, n, m, k]:
+                                normals_for_site[i].append(normal)
+                            ps = positions[[n, m, s, k]]
+                            pos = np.average(ps, 0)
+ 
                             site = self.new_site()
-                            site.update({'site': this_site,
+                            site.update({'site': '4fold',
                                          'surface': site_surf,
                                          'position': np.round(pos, 8),
                                          'normal': np.round(normal, 8),
                                          'indices': si})
-                            if self.composition_effect:                       
-                                metals = self.metals
+                            if self.composition_effect:
+                                metals = self.metals 
                                 if len(metals) == 1:
-                                    composition = 3*metals[0]
+                                    composition = 4*metals[0]
                                 elif len(metals) == 2:
                                     ma, mb = metals[0], metals[1]
                                     symbols = self.symbols[list(si)]
                                     nma = np.count_nonzero(symbols==ma)
                                     if nma == 0:
-                                        composition = 3*mb
+                                        composition = 4*mb
                                     elif nma == 1:
-                                        composition = ma + 2*mb
+                                        composition = ma + 3*mb
                                     elif nma == 2:
-                                        composition = 2*ma + mb
+                                        opp = max(list(si[1:]), key=lambda x: 
+                                              np.linalg.norm(positions[x]
+                                              - positions[si[0]])) 
+                                        if self.symbols[opp] == self.symbols[si[0]]:
+                                            composition = ma + mb + ma + mb 
+                                        else:
+                                            composition = 2*ma + 2*mb 
                                     elif nma == 3:
-                                        composition = 3*ma
+                                        composition = 3*ma + mb
+                                    elif nma == 4:
+                                        composition = 4*ma
                                 else:
-                                    nodes = self.symbols[list(si)]
+                                    opp = max(list(si[1:]), key=lambda x:
+                                              np.linalg.norm(positions[x]
+                                              - positions[si[0]]))
+                                    nni = [i for i in si[1:] if i != opp]
+                                    nodes = self.symbols[[si[0], nni[0], opp, nni[1]]]
                                     composition = ''.join(hash_composition(nodes))
-                                site.update({'composition': composition})   
+                                site.update({'composition': composition})    
 
-                            if this_site == 'hcp':
-                                site.update({'subsurf_index': isub})
-                                if self.composition_effect:
-                                    site.update({'subsurf_element': 
-                                                 self.symbols[isub]})
+                            new_pos = pos - normal * self.r * (2./3)**(.5)
+                            _, isub = tree.query(new_pos)
+                            isub = int(isub)
+                            site.update({'subsurf_index': isub})
+                            if self.composition_effect:
+                                site.update({'subsurf_element': 
+                                             self.symbols[isub]})
                             sl.append(site)
                             usi.add(si)
 
-                        elif self.is_eq(angle, np.pi/2.):
-                            # 4-fold hollow site
-                            site_surf = 'fcc100'
-                            l2 = self.r * math.sqrt(2) + 0.2
-                            nebs2, _, _ = self.nblist.get_neighbors(s, l2)
-                            nebs2 = [k for k in nebs2 if k not in neighbors]
-                            for k in nebs2:
-                                si = tuple(sorted([s, n, m, k]))
-                                if k in ssall and si not in usi:
-                                    d1 = self.ref_atoms.get_distance(n, k)
-                                    if self.is_eq(d1, self.r, 0.2):
-                                        d2 = self.ref_atoms.get_distance(m, k)
-                                        if self.is_eq(d2, self.r, 0.2):
-                                            # 4-fold hollow site found
-                                            normal = self.get_surface_normal([s, n, m])
-                                            # Save the normals now and add them to the site later
-                                            for i in [s, n, m, k]:
-                                                normals_for_site[i].append(normal)
-                                            ps = self.positions[[n, m, s, k]]
-                                            pos = np.average(ps, 0)
- 
-                                            site = self.new_site()
-                                            site.update({'site': '4fold',
-                                                         'surface': site_surf,
-                                                         'position': np.round(pos, 8),
-                                                         'normal': np.round(normal, 8),
-                                                         'indices': si})
-                                            if self.composition_effect:
-                                                metals = self.metals 
-                                                if len(metals) == 1:
-                                                    composition = 4*metals[0]
-                                                elif len(metals) == 2:
-                                                    ma, mb = metals[0], metals[1]
-                                                    symbols = self.symbols[list(si)]
-                                                    nma = np.count_nonzero(symbols==ma)
-                                                    if nma == 0:
-                                                        composition = 4*mb
-                                                    elif nma == 1:
-                                                        composition = ma + 3*mb
-                                                    elif nma == 2:
-                                                        opp = max(list(si[1:]), key=lambda x: 
-                                                              np.linalg.norm(self.positions[x]
-                                                              - self.positions[si[0]])) 
-                                                        if self.symbols[opp] == self.symbols[si[0]]:
-                                                            composition = ma + mb + ma + mb 
-                                                        else:
-                                                            composition = 2*ma + 2*mb 
-                                                    elif nma == 3:
-                                                        composition = 3*ma + mb
-                                                    elif nma == 4:
-                                                        composition = 4*ma
-                                                else:
-                                                    opp = max(list(si[1:]), key=lambda x:
-                                                              np.linalg.norm(self.positions[x]
-                                                              - self.positions[si[0]]))
-                                                    nni = [i for i in si[1:] if i != opp]
-                                                    nodes = self.symbols[[si[0], nni[0], opp, nni[1]]]
-                                                    composition = ''.join(hash_composition(nodes))
-                                                site.update({'composition': composition})    
-
-                                            new_pos = pos - normal * self.r * (2./3)**(.5)
-                                            isub = min(range(len(self.atoms)), key=lambda x:                                            
-                                                   np.linalg.norm(self.positions[x] - new_pos))  
-                                            site.update({'subsurf_index': isub})
-                                            if self.composition_effect:
-                                                site.update({'subsurf_element': 
-                                                             self.symbols[isub]})
-                                            sl.append(site)
-                                            usi.add(si)
-
                 # ontop sites
                 site = self.new_site()
                 site.update({'site': 'ontop', 
                              'surface': surface,
-                             'position': np.round(self.positions[s], 8),
+                             'position': np.round(positions[s], 8),
                              'indices': (s,)})
                 if self.composition_effect:
                     site.update({'composition': self.symbols[s]})
                 sl.append(site)
                 usi.add((s))
 
+        if len(is_rep) > np.count_nonzero(is_rep):
+            sl.extend(_get_symmetric_sites(sl, positions, rotations, 
+                                           permutations))
+            # The normals of the ontop and bridge sites are averaged 
+            # over all hollow sites of their atoms
+            normals_for_site = {i: [] for i in ssall}
+            for t in sl:
+                if t['site'] in ['fcc', 'hcp', '4fold']:
+                    for i in t['indices']:
+                        normals_for_site[i].append(t['normal'])
+
         # Add 6-fold sites if allowed
         if self.allow_6fold:
             dh = 2. * self.r / 5.
             subsurf_ids = self.get_subsurface()
+            subsurf_tree = cKDTree(positions[subsurf_ids].reshape(-1, 3))
         for t in sl:
             # Add normals to ontop sites
             if t['site'] == 'ontop':
@@ -398,7 +1276,10 @@ class ClusterAdsorptionSites(object):
                     subpos = t['position'] - t['normal'] * dh                                   
                     def get_squared_distance(x):
                         return np.sum((self.positions[x] - subpos)**2)
-                    subsi = sorted(sorted(subsurf_ids, key=get_squared_distance)[:3])     
+                    subsi = []
+                    if subsurf_ids:
+                        _, nearest = subsurf_tree.query(subpos, k=min(3, len(subsurf_ids)))
+                        subsi = sorted(np.asarray(subsurf_ids)[np.ravel(nearest)].tolist())
                     si = site['indices']
                     site.update({'site': '6fold',      
                                  'position': np.round(subpos, 8),
@@ -456,8 +1337,11 @@ class ClusterAdsorptionSites(object):
         else:
             indices = indices if is_list_or_tuple(indices) else [indices]
             indices = tuple(sorted(indices))
-            st = next((s for s in self.site_list if 
-                       s['indices'] == indices), None)
+            if isinstance(self.site_list, SiteList):
+                st = self.site_list.find(indices)
+            else:
+                st = next((s for s in self.site_list if 
+                           s['indices'] == indices), None)
         return st 
 
     def get_sites(self, site=None,
@@ -564,20 +1448,58 @@ class ClusterAdsorptionSites(object):
             sklist = sorted([[s[k] for k in key_list] for s in sl])
             return sorted(list(sklist for sklist, _ in groupby(sklist)))
         else:
-            seen_tuple = []
+            seen_tuple = set()
             uni_sites = []
             if about is not None:
                 sl = sorted(sl, key=lambda x: np.linalg.norm(x['position'] - about))
             for i, s in enumerate(sl):
                 sig = tuple(s[k] for k in key_list)
                 if sig not in seen_tuple:
-                    seen_tuple.append(sig)
+                    seen_tuple.add(sig)
                     if return_site_indices:
                         s = i 
                     uni_sites.append(s)
 
             return uni_sites                        
 
+    def get_symmetry_operations(self, include_symbols=True, tol=.05):
+        """Get the point group of the nanoparticle as the proper and 
+        improper rotations about the geometric center of the atoms that 
+        map the nanoparticle onto itself, together with the resulting 
+        permutations of the atoms. Useful for removing the duplicates 
+        of symmetry-equivalent sites or adsorbate configurations, e.g. 
+        the image of a site under an operation g is given by the 
+        indices permutations[g][list(site['indices'])].
+
+        Parameters
+        ----------
+        include_symbols : bool, default True
+            Whether the operations must map each atom onto an atom of 
+            the same element. Set to False to get the operations of the
+            geometry only.
+
+        tol : float, default 0.05
+            The maximum distance (in Angstrom) between the image of an 
+            atom and the atom it is mapped onto.
+
+        Returns
+        -------
+        rotations : numpy.ndarray
+            The 3x3 rotation matrices of the operations, with the 
+            identity first.
+
+        permutations : numpy.ndarray
+            The permutations of the atoms, where atom i is mapped onto 
+            atom permutations[g][i] by operation g.
+
+        """
+
+        labels = self.numbers if include_symbols else \
+                 np.zeros(len(self.atoms), dtype=int)
+
+        return _get_point_group(self.positions, labels, tol)
+
+    @profiled
     def get_labels(self):
         # Assign labels
         for st in self.site_list:
@@ -593,11 +1515,13 @@ class ClusterAdsorptionSites(object):
                 'normal': None, 'indices': None, 'composition': None,
                 'subsurf_index': None, 'subsurf_element': None, 'label': None}
 
+    @profiled
     def mapping(self, atoms):
         """Map the nanoparticle into a surrogate nanoparticle for code
         versatility."""
 
         from asap3 import EMT as asapEMT
+        from ase.optimize import FIRE
         ref_atoms = atoms.copy()
         pm = self.surrogate_metal
         if pm is None:
@@ -670,10 +1594,10 @@ class ClusterAdsorptionSites(object):
             as too close.
 
         """
-        dists = [np.linalg.norm(atom.position - pos) > mindist
-                 for atom in self.ref_atoms]
-        return all(dists)                                                       
+        dists = np.linalg.norm(self.ref_atoms.positions - pos, axis=1)
+        return bool(np.all(dists > mindist))
 
+    @profiled
     def get_surface_sites(self): 
         """Returns the indices of the surface atoms and a dictionary 
         with all the surface designations."""
@@ -709,12 +1633,15 @@ class ClusterAdsorptionSites(object):
     def get_subsurface(self):
         """Returns the indices of the subsurface atoms."""
 
-        notsurf = [a.index for a in self.atoms if a.index not in self.surf_ids]
+        from asap3.analysis import FullCNA
+        surf_ids = set(self.surf_ids)
+        notsurf = [i for i in range(len(self.atoms)) if i not in surf_ids]
         subfcna = FullCNA(self.ref_atoms[notsurf]).get_normal_cna() 
         
         return [idx for i, idx in enumerate(notsurf) if 
                 sum(subfcna[i].values()) < 12]
 
+    @profiled
     def make_fullCNA(self, rCut=None):                  
         if rCut not in self.fullCNA:
             from asap3.analysis import FullCNA 
@@ -737,24 +1664,49 @@ class ClusterAdsorptionSites(object):
             self.make_fullCNA(rCut=rCut)
         return self.fullCNA[rCut]
 
-    def make_neighbor_list(self, rMax=10.):
-        """Get an asap3 neighborlist.
+    @profiled
+    def make_neighbor_list(self, rMax=None):
+        """Get a neighbor list of the surrogate nanoparticle, which is 
+        updated from the neighbor list of the previous structure if 
+        a neighbor_list is given. The list is stored as the nblist
+        attribute, which is an acat.utilities.VerletNeighborList 
+        (formerly an asap3.FullNeighborList) with the same 
+        get_neighbors method. Its cutoff grows when the neighbors are
+        requested within a larger radius.
 
         Parameters
         ----------
-        rMax : float, default 10.
-            The maximum cutoff radius in Angstrom. 
+        rMax : float, default None
+            The cutoff radius in Angstrom. Use the second nearest 
+            neighbor distance required by the site search if not 
+            specified.
 
         """
 
-        from asap3 import FullNeighborList
-        self.nblist = FullNeighborList(rCut=rMax, atoms=self.ref_atoms)
+        if rMax is None:
+            rMax = self.r * math.sqrt(2) + 0.2
+        nblist = self.neighbor_list
+        if nblist is None:
+            nblist = VerletNeighborList()
+        nblist.update(self.ref_atoms, rMax)
+        # Keep the state of this structure, the given neighbor list 
+        # moves on with the next structure
+        self.nblist = copy(nblist)
 
-    def get_connectivity(self):                                      
-        """Get the adjacency matrix."""
+    def get_connectivity(self, sparse=True):                                      
+        """Get the adjacency matrix.
 
-        nbslist = neighbor_shell_list(self.ref_atoms, 0.3, neighbor_number=1)
-        return get_adj_matrix(nbslist)                  
+        Parameters
+        ----------
+        sparse : bool, default True
+            Whether to return a scipy.sparse.csr_matrix. Set to False to
+            get a dense numpy.ndarray.
+
+        """
+
+        nbslist = neighbor_shell_list(self.ref_atoms, 0.3, neighbor_number=1,
+                                      neighbor_list=self.nblist)
+        return get_adj_matrix(nbslist, sparse=sparse)                  
 
     def get_site_dict(self):
         icosa_dict = {                                                                                     
@@ -856,6 +1808,7 @@ class ClusterAdsorptionSites(object):
         else:
             return mdeca_dict
 
+    @profiled
     def set_first_neighbor_distance_from_rdf(self, rMax=10, nBins=200):
  
         from asap3.analysis import rdf
@@ -904,7 +1857,7 @@ class ClusterAdsorptionSites(object):
         elif len(indices) == 3:
             return 'fcc111'
 
-    def get_graph(self, return_adj_matrix=False):                             
+    def get_graph(self, return_adj_matrix=False, sparse=True):                             
         """Get the graph representation of the slab.
 
         Parameters
@@ -913,17 +1866,22 @@ class ClusterAdsorptionSites(object):
             Whether to return adjacency matrix instead of the networkx.Graph 
             object.
 
+        sparse : bool, default True
+            Whether to return the adjacency matrix as a scipy.sparse.csr_matrix.
+            Only relevant when return_adj_matrix=True.
+
         """
 
-        cm = self.get_connectivity()
+        cm = self.get_connectivity(sparse=sparse)
         if return_adj_matrix:
             return cm
         
+        import networkx as nx
         G = nx.Graph()                               
         symbols = self.symbols                               
         G.add_nodes_from([(i, {'symbol': symbols[i]}) 
                           for i in range(len(symbols))])
-        rows, cols = np.where(cm == 1)
+        rows, cols = cm.nonzero()
         edges = zip(rows.tolist(), cols.tolist())
         G.add_edges_from(edges)
 
@@ -957,45 +1915,54 @@ class ClusterAdsorptionSites(object):
 
         """
 
+        return _get_neighbor_site_list(self, False, dx, neighbor_number, radius,
+                                       span, unique, unique_composition, 
+                                       unique_subsurf)
+
+    def get_facet_ids(self):
+        """Returns the index of the geometrical facet of each site in
+        the site list, or -1 for the sites that only involve vertex and
+        edge atoms. The facets are the connected sets of surface atoms
+        that are not vertex or edge atoms. The indices are computed 
+        once and cached until the site list changes.
+
+        """
+
         sl = self.site_list
-        poss = np.asarray([s['position'] for s in sl])
-        statoms = Atoms('X{}'.format(len(sl)), positions=poss,
-                        cell=self.cell, pbc=self.pbc)
-        if radius is not None:                                                           
-            nbslist = neighbor_shell_list(statoms, dx, neighbor_number=1,
-                                          mic=False, radius=radius, span=span)
-            if unique:
-                for i in range(len(nbslist)):
-                    nbsids = nbslist[i]
-                    tmpids = self.get_unique_sites(unique_composition, unique_subsurf,
-                                                   return_site_indices=True,
-                                                   site_list=[sl[ni] for ni in nbsids])
-                    nbsids = [nbsids[j] for j in tmpids]
-                    nbslist[i] = nbsids
-        else:
-            D = statoms.get_all_distances(mic=False)
-            nbslist = {}
-            for i, row in enumerate(D):
-                argsort = np.argsort(row)
-                row = row[argsort]
-                res = np.split(argsort, np.where(np.abs(np.diff(row)) > dx)[0] + 1)
-                if span:
-                    nbsids = sorted([n for nn in range(1, neighbor_number + 1) 
-                                     for n in list(res[nn])])
-                else:
-                    nbsids = sorted(res[neighbor_number])
-                if unique:
-                    tmpids = self.get_unique_sites(unique_composition, unique_subsurf,
-                                                   return_site_indices=True, 
-                                                   site_list=[sl[ni] for ni in nbsids])
-                    nbsids = [nbsids[j] for j in tmpids]
-                nbslist[i] = nbsids
-
-        return nbslist
-
-    def update(self, atoms, full_update=False):                 
-        """Update the position of each adsorption site given an updated 
-        atoms object. Please only use this when the indexing of the atoms 
+        table = sl.table if isinstance(sl, SiteList) else None
+        # Plain lists of sites are not tracked and never reuse the cache
+        versions = None if table is None else (table, sl._version, 
+                                               table._version)
+        cache = self.__dict__.get('_facet_ids')
+        if cache is not None and versions is not None and (
+        cache[0] is sl) and cache[3] == versions:
+            return cache[1].copy()
+
+        ve_mask = np.zeros(len(self.atoms), dtype=bool)
+        for s in sl:
+            if s['site'] == 'ontop' and s['surface'] in ['vertex', 'edge']:
+                ve_mask[s['indices'][0]] = True
+        # 6-fold sites involve subsurface atoms that would join facets
+        _, pairs = _get_facet_paths([s for s in sl if s['site'] != '6fold'], 
+                                    ve_mask)
+        roots = _union_find(len(self.atoms), pairs)
+        reduced, _ = _get_facet_paths(sl, ve_mask)
+        site_roots = np.asarray([roots[r[0]] if r else -1 for r in reduced], 
+                                dtype=int)
+        facet_ids = np.full(len(sl), -1, dtype=int)
+        valid = site_roots >= 0
+        facet_ids[valid] = np.unique(site_roots[valid], 
+                                     return_inverse=True)[1].ravel()
+        self._facet_ids = (sl, facet_ids, {s['indices']: fid for s, fid 
+                                           in zip(sl, facet_ids.tolist())},
+                           versions)
+
+        return facet_ids.copy()
+
+    def update(self, atoms, full_update=False, update_composition=False,
+               normal_tol=.05):
+        """Update the adsorption sites in place given an updated atoms 
+        object. Please only use this when the indexing of the atoms 
         object is preserved. Useful for updating adsorption sites e.g. 
         after geometry optimization.
         
@@ -1005,37 +1972,111 @@ class ClusterAdsorptionSites(object):
             The updated atoms object. 
 
         full_update : bool, default False
-            Whether to update the normal vectors and composition as well.
-            Useful when the composition of the nanoalloy is not fixed.
+            Whether to identify the adsorption sites from scratch.
+                        Useful when the nanoparticle has restructured.
+
+        update_composition : bool, default False
+            Whether to update the compositions, the subsurface elements 
+            and the labels of the sites that involve atoms with changed 
+            elements. Useful when the composition of the nanoalloy is 
+            not fixed.
+
+        normal_tol : float, default 0.05
+            The normal vector of a site is only updated if an atom of
+            the site moved by more than this distance (in Angstrom).
+            The normal vectors are not recomputed as in the site search 
+            but only approximated, by rotating them with the rotation 
+            of the bonds around the atoms of the site. They can hence 
+            differ from those of a new site object by about the tilt 
+            of the bonds (e.g. by ~0.03 after moving the atoms by 
+            ~0.03 Angstrom). Use full_update=True to recompute them.
 
         """ 
 
-        sl = self.site_list
-        new_cluster = atoms[[a.index for a in atoms if 
+        new_cluster = atoms[[a.index for a in atoms if 'a' in 
+                             reference_states[a.number] and 
                              a.symbol not in adsorbate_elements]]
-        if full_update:                                                                      
-            ncas = ClusterAdsorptionSites(new_cluster, allow_6fold=self.allow_6fold,
-                                          composition_effect=self.composition_effect, 
-                                          ignore_bridge_sites=self.ignore_bridge_sites,
-                                          label_sites=self.label_sites,
-                                          surrogate_metal=self.surrogate_metal,
-                                          tol=self.tol)
-            sl = ncas.site_list
-                                                                                             
-        else:
-            nsl = deepcopy(sl)
-            for st in nsl:
-                si = list(st['indices'])
-                newpos = np.average(new_cluster.positions[si], 0) 
-                st['position'] = np.round(newpos, 8)
-            sl = nsl
+        if full_update:
+            ncas = self._rebuild(new_cluster, self.reuse_geometry, 
+                                 self.cache_dir)
+            self.__dict__ = ncas.__dict__
+            return
+
+        new_cluster.cell = self.cell
+        dvecs = new_cluster.positions - self.positions
+        _update_sites(self, new_cluster, dvecs, lambda i: 
+                      self.nblist.get_neighbors(i, self.r + 0.2)[0],
+                      update_composition, normal_tol)
+
+    def _rebuild(self, atoms, reuse_geometry=False, cache_dir=None):
+        # Identify the sites of an atoms object with the same settings
+        return ClusterAdsorptionSites(atoms, allow_6fold=self.allow_6fold,
+                                      composition_effect=self.composition_effect, 
+                                      ignore_bridge_sites=self.ignore_bridge_sites,
+                                      label_sites=self.label_sites,
+                                      surrogate_metal=self.surrogate_metal,
+                                      tol=self.tol, reuse_geometry=reuse_geometry,
+                                      cache_dir=cache_dir, 
+                                      use_symmetry=self.use_symmetry,
+                                      neighbor_list=self.neighbor_list)
+
+    def save(self, filename):
+        """Save the adsorption sites to a compressed npz file, which 
+        can be loaded by ClusterAdsorptionSites.load without repeating the 
+        site identification. The neighbor list is not saved.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the npz file.
+
+        """
+
+        _save_sites(self, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """Load the adsorption sites saved by ClusterAdsorptionSites.save. 
+        The neighbor list is rebuilt on first use.
 
+        Parameters
+        ----------
+        filename : str
+            The name of the npz file.
+
+        """
+
+        sas = cls.__new__(cls)
+        sas.reuse_geometry = False
+        sas.cache_dir = None
+        sas.use_symmetry = False
+        sas.neighbor_list = None
+        _load_sites(sas, filename)
+
+        return sas
+
+    def __getattr__(self, name):
+        # The neighbor list is not saved or pickled, rebuild it on 
+        # first use
+        if name == 'nblist' and 'ref_atoms' in self.__dict__:
+            self.make_neighbor_list()
+            return self.nblist
+        raise AttributeError('{!r} object has no attribute {!r}'.format(
+                             type(self).__name__, name))
+
+    def __getstate__(self):
+        # The neighbor list is not pickled and is rebuilt on first use
+        state = self.__dict__.copy()
+        state.pop('nblist', None)
+
+        return state
 
 def group_sites_by_facet(atoms, sites, all_sites=None):            
-    """A function that uses networkx to group one set of sites by
+    """A function that uses union-find to group one set of sites by
     geometrical facets of the nanoparticle. Different geometrical
     facets can have the same surface type. The function returns a
-    list of lists, each contains sites on a same geometrical facet.
+    dictionary of lists, each contains sites on a same geometrical 
+    facet.
 
     Parameters
     ----------
@@ -1046,9 +2087,13 @@ def group_sites_by_facet(atoms, sites, all_sites=None):
     sites : list of dicts
         The adsorption sites to be grouped by geometrical facet.
 
-    all_sites : list of dicts, default None
-        The list of all sites. Provide this to make the grouping
-        much faster. Useful when the function is called many times.
+    all_sites : list of dicts or acat.adsorption_sites.ClusterAdsorptionSites \
+        object, default None
+        The list of all sites, or the site object that the sites belong 
+        to. Provide this to make the grouping much faster. Providing 
+        the site object reuses the facet indices cached by 
+        ClusterAdsorptionSites.get_facet_ids, which is useful when the 
+        function is called many times.
 
     Example
     -------
@@ -1074,37 +2119,406 @@ def group_sites_by_facet(atoms, sites, all_sites=None):
 
     """
                                                                      
+    if not isinstance(all_sites, ClusterAdsorptionSites) and not all_sites:
+        all_sites = ClusterAdsorptionSites(atoms)
+    if isinstance(all_sites, ClusterAdsorptionSites):
+        all_sites.get_facet_ids()
+        facet_dict = all_sites._facet_ids[2]
+        facet_ids = [facet_dict[s['indices']] for s in sites]
+
+        return _group_by_facet_ids(sites, facet_ids)
+
     # Find all indices of vertex and edge sites
-    if not all_sites:
-        cas = ClusterAdsorptionSites(atoms)
-        all_sites = cas.site_list
-    ve_indices = [s['indices'] for s in all_sites if 
-                  s['site'] == 'ontop' and 
-                  s['surface'] in ['vertex', 'edge']]
-    unique_ve_indices = set(list(sum(ve_indices, ())))
-     
-    G = nx.Graph()
-    for site in sites:
-        indices = site['indices']
-        reduced_indices = tuple(i for i in indices if i 
-                                not in unique_ve_indices)
-        site['reduced_indices'] = reduced_indices
-        nx.add_path(G, reduced_indices)
-    components = list(nx.connected_components(G))
-    groups = []
-    for component in components:
-        group = []
-        for path in [s['reduced_indices'] for s in sites]:
-            if component.issuperset(path):
-                group.append(path)
-        groups.append(group)
-    grouped_sites = defaultdict(list)
-    for site in sites:
-        for group in groups:
-            if site['reduced_indices'] in group:
-                grouped_sites[groups.index(group)] += [site]
-                                                                     
-    return grouped_sites
+    ve_mask = np.zeros(len(atoms), dtype=bool)
+    for s in all_sites:
+        if s['site'] == 'ontop' and s['surface'] in ['vertex', 'edge']:
+            ve_mask[s['indices'][0]] = True
+    reduced, pairs = _get_facet_paths(sites, ve_mask)
+    roots = _union_find(len(atoms), pairs)
+    facet_ids = [roots[r[0]] if r else -1 for r in reduced]
+
+    return _group_by_facet_ids(sites, facet_ids)
+
+
+def _get_delaunay_sites(coords, simplices, neighbors):
+    # Get the bridge, 4-fold and 3-fold site positions from the Delaunay 
+    # triangulation of the surface atoms. All simplices are processed 
+    # at once and the edges are deduplicated by hashing
+    if len(simplices) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3))
+
+    # edges[i,j] is the edge opposite to corner j of simplex i
+    edges = np.stack([simplices[:,[2,0,1]], simplices[:,[1,2,0]]], axis=2)
+
+    # Inner angle of each triangle corner
+    vec = coords[edges] - coords[simplices][:,:,None,:]
+    uvec = vec / np.linalg.norm(vec, axis=3)[...,None]
+    angles = np.sum(uvec[:,:,0] * uvec[:,:,1], axis=2)
+
+    # Angle types
+    right = np.isclose(angles, 0).ravel()
+    obtuse = (angles < -1e-5)
+    bridges = (np.sum(coords[edges], axis=2) / 2.0).reshape(-1, 3)
+
+    # Each (simplex, corner) pair is visited in order. The first pair 
+    # with a non-right corner makes the edge a bridge site
+    lo, hi = edges.min(axis=2).ravel(), edges.max(axis=2).ravel()
+    keys = lo.astype(np.int64) * len(coords) + hi
+    bpairs = np.nonzero(~right)[0]
+    bkeys, first = np.unique(keys[bpairs], return_index=True)
+    bpairs = bpairs[first]
+    bridge_positions = bridges[np.sort(bpairs)]
+
+    # Right angles potentially indicate 4-fold hollow, unless the edge 
+    # is already taken as a bridge site by an earlier pair
+    rpairs = np.nonzero(right)[0]
+    if len(bkeys) > 0:
+        loc = np.minimum(np.searchsorted(bkeys, keys[rpairs]), len(bkeys) - 1)
+        taken = (bkeys[loc] == keys[rpairs]) & (bpairs[loc] < rpairs)
+        rpairs = rpairs[~taken]
+    fold4_positions = np.zeros((0, 3))
+    if len(rpairs) > 0:
+        si, sj = rpairs // 3, rpairs % 3
+        corners, elo, ehi = simplices[si, sj], lo[rpairs], hi[rpairs]
+        # The corner of the neighbor simplex opposite to the edge
+        nbs = neighbors[si, sj]
+        ocs = simplices[nbs].sum(axis=1) - elo - ehi
+        for k in np.nonzero(nbs < 0)[0]:
+            ocs[k] = list(set(simplices[-1]) - {elo[k], ehi[k]})[0]
+
+        # Assumption: If not 4-fold, this suggests
+        # no hollow OR bridge site is present.
+        ovec = coords[np.stack([elo, ehi], axis=1)] - coords[ocs][:,None,:]
+        ouvec = ovec / np.linalg.norm(ovec.reshape(-1, 6), axis=1)[:,None,None]
+        oangles = np.sum(ouvec[:,0] * ouvec[:,1], axis=1)
+        oright = np.nonzero(np.isclose(oangles, 0))[0]
+        if len(oright) > 0:
+            hollows = np.stack([elo, ehi, np.minimum(corners, ocs), 
+                                np.maximum(corners, ocs)], axis=1)[oright]
+            _, first = np.unique(hollows, axis=0, return_index=True)
+            fold4_positions = bridges[rpairs[oright[np.sort(first)]]]
+
+    fold3 = ~right.reshape(-1, 3).any(axis=1) & ~obtuse.any(axis=1)
+    fold3_positions = np.mean(coords[simplices[fold3]], axis=1)
+
+    return bridge_positions, fold4_positions, fold3_positions
+
+
+def _get_inplane_distance(atoms):
+    # The shortest distance from atom 0 to another atom of the same 
+    # layer or to a periodic image of itself
+    cell = atoms.cell.array
+    layer = np.abs(atoms.positions[:,2] - atoms.positions[0,2]) < .3
+    _, d = find_mic(atoms.positions[layer] - atoms.positions[0], 
+                    atoms.cell, atoms.pbc)
+    lattice = np.linalg.norm([cell[0], cell[1], cell[0] + cell[1], 
+                              cell[0] - cell[1]], axis=1)
+
+    return min(np.min(d[d > 1e-3], initial=np.inf), lattice.min())
+
+
+def _match_ideal_slab(atoms, surface, tol=.05):
+    """Match a slab to the ideal slab of the surface built by ase.build, 
+    allowing each atom to deviate from its ideal position by up to tol 
+    (in Angstrom). Returns None if the slab is not a lateral repetition 
+    of the surface unit cell of an ideal slab. Otherwise returns the 
+    ideal slab of one surface unit cell with the elements of the slab, 
+    the index of the atom of the slab at each atom of the unit cell and
+    each lateral lattice translation, the lattice translation of each 
+    atom of the slab, the translation of the slab from the ideal slab 
+    and the displacement of each atom from its ideal position."""
+
+    from ase import build
+    if surface not in _template_surfaces:
+        return None
+    name, lattice, size, orthogonalizable = _template_surfaces[surface]
+    cell, positions = atoms.cell.array, atoms.positions
+    if not all(atoms.pbc[:2]) or np.abs(cell[:2,2]).max() > 1e-8 or \
+    np.abs(cell[2,:2]).max() > 1e-8:
+        return None
+    kwargs = {}
+    if orthogonalizable:
+        kwargs['orthogonal'] = bool(abs(cell[0] @ cell[1]) < 1e-8)
+        if kwargs['orthogonal']:
+            size = (size[0], 2 * size[1])
+    if lattice == 'hcp':
+        kwargs['c'] = np.sqrt(8 / 3)
+    builder = getattr(build, name)
+    symbol = atoms.get_chemical_symbols()[0]
+    unit = builder(symbol, size + (1,), a=1., **kwargs)
+
+    # The lattice constant from the nearest in-plane neighbor distance,
+    # refined by the length of the first cell vector
+    a = _get_inplane_distance(atoms) / _get_inplane_distance(unit * (3, 3, 1))
+    lengths = np.linalg.norm(unit.cell[:2], axis=1)
+    n, m = np.rint(np.linalg.norm(cell[:2], axis=1) / (a * lengths)).astype(int)
+    if n < 1 or m < 1:
+        return None
+    a = np.linalg.norm(cell[0]) / (n * lengths[0])
+    if np.abs(cell[:2] - np.array([[n], [m]]) * a * unit.cell[:2]).max() > tol:
+        return None
+    nlayers, rest = divmod(len(atoms), n * m * len(unit))
+    if rest or not nlayers:
+        return None
+    if lattice == 'hcp':
+        kwargs['c'] = 2 * np.ptp(positions[:,2]) / (nlayers - 1) if \
+                      nlayers > 1 else a * np.sqrt(8 / 3)
+    unit = builder(symbol, size + (nlayers,), a=a, vacuum=5., **kwargs)
+
+    # Anchor the lowest atom of the slab to each of the lowest atoms of 
+    # the unit cell
+    upositions = unit.positions
+    p0 = np.argmin(positions[:,2])
+    for q0 in np.nonzero(upositions[:,2] < upositions[:,2].min() + tol)[0]:
+        images = _get_lattice_images(positions, unit, n, m, 
+                                     positions[p0] - upositions[q0], tol)
+        if images is not None:
+            unit.numbers = atoms.numbers[images[0][:,0,0]]
+            return (unit,) + images
+
+    return None
+
+
+def _match_periodic_slab(atoms, composition_effect=False, tol=.05):
+    """Find the smallest cell that a slab is a lateral repetition of,
+    with the cell vectors being integer fractions of the cell vectors 
+    of the slab. The periodic images of each atom must be within tol 
+    (in Angstrom) of an atom, of the same element if composition_effect
+    is True. Returns None if the slab does not repeat within its cell.
+    Otherwise returns the same as _match_ideal_slab, with the smallest
+    cell as the unit cell."""
+
+    cell, positions = atoms.cell.array, atoms.positions
+    if not all(atoms.pbc[:2]) or np.abs(cell[:2,2]).max() > 1e-8 or \
+    np.abs(cell[2,:2]).max() > 1e-8:
+        return None
+    natoms = len(atoms)
+    labels = atoms.numbers if composition_effect else np.zeros(natoms)
+    ii = np.arange(natoms)
+
+    def is_period(translation):
+        i, j, _ = get_query_neighbor_pairs(positions + translation, atoms, 
+                                           tol, mic=True)
+        return len(i) == natoms and np.all(i == ii) and \
+               np.all(labels[j] == labels)
+
+    # The largest number of repetitions along each cell vector, where 
+    # the repeated cell is at least 1 Angstrom long
+    n, m = (next((p for p in range(natoms, 1, -1) if natoms % p == 0 and 
+                  np.linalg.norm(v) / p >= 1. and is_period(v / p)), 1) 
+            for v in cell[:2])
+    if n * m == 1:
+        return None
+    ucell = cell[:2] / np.array([[n], [m]])
+    g = positions[:,:2] @ np.linalg.inv(ucell[:,:2])
+    unit = atoms[np.all(np.floor(g + 1e-3).astype(int) % [n, m] == 0, axis=1)]
+    if len(unit) * n * m != natoms:
+        return None
+    unit.cell = [ucell[0], ucell[1], cell[2]]
+    images = _get_lattice_images(positions, unit, n, m, np.zeros(3), tol)
+    if images is None:
+        return None
+
+    return (unit,) + images
+
+
+def _get_lattice_images(positions, unit, n, m, translation, tol):
+    """Assign each atom of a slab of n x m unit cells to the closest 
+    periodic image of an atom of the unit cell, after refining the 
+    translation of the slab from the unit cell by the mean displacement.
+    Returns None if an atom deviates by more than tol (in Angstrom) or
+    if the assignment is not one-to-one. Otherwise returns the index of 
+    the atom of the slab at each atom of the unit cell and each lateral 
+    lattice translation, the lattice translation of each atom of the 
+    slab, the refined translation and the displacement of each atom 
+    from its periodic image."""
+
+    ucell = unit.cell.array[:2,:2]
+    inv = np.linalg.inv(ucell)
+    ii = np.arange(len(positions))
+    for refine in [True, False]:
+        diff = (positions - translation)[:,None] - unit.positions[None]
+        shifts = np.rint(diff[...,:2] @ inv)
+        diff[...,:2] -= shifts @ ucell
+        err = np.linalg.norm(diff, axis=2)
+        q = np.argmin(err, axis=1)
+        if refine:
+            translation = translation + np.mean(diff[ii,q], axis=0)
+    if err[ii,q].max() > tol:
+        return None
+    shifts = shifts[ii,q].astype(int)
+    index = np.full(len(unit) * n * m, -1)
+    index[(q * n + shifts[:,0] % n) * m + shifts[:,1] % m] = ii
+    if np.any(index < 0):
+        return None
+
+    return index.reshape(len(unit), n, m), shifts, translation, diff[ii,q]
+
+
+def _get_slab_template(sas, unit, ref_symbol):
+    """Get the site template of the unit cell of an ideal or periodic 
+    slab from the sites of a repetition of the unit cell. Each atom of 
+    a site is given by its index in the unit cell and its lattice 
+    translation from the unit cell of the site. The templates are 
+    cached under the unit cell and the settings. Returns None if the 
+    sites of the repetition are not periodic."""
+
+    settings = (sas.surface, sas.allow_6fold, sas.composition_effect, 
+                sas.both_sides, sas.ignore_bridge_sites, sas.label_sites, 
+                ref_symbol, sas.optimize_surrogate_cell, sas.tol)
+    h = hashlib.sha1()
+    for a in [unit.cell.array, unit.positions]:
+        h.update((np.round(a, 8) + 0.).tobytes())
+    h.update(np.asarray(unit.numbers, dtype=np.int64).tobytes())
+    h.update(repr(settings).encode())
+    key = h.hexdigest()
+    if key in _slab_templates:
+        _slab_templates.move_to_end(key)
+        return _slab_templates[key]
+
+    def cache(template):
+        # Unit cells without a template are cached as well, so that 
+        # the repetition is not searched again
+        _slab_templates[key] = template
+        while len(_slab_templates) > _max_slab_templates:
+            _slab_templates.popitem(last=False)
+
+        return template
+
+    w = _template_repeats
+    nunit = len(unit)
+    tsas = SlabAdsorptionSites(unit * (w, w, 1), surface=sas.surface,
+                               allow_6fold=sas.allow_6fold,
+                               composition_effect=sas.composition_effect, 
+                               both_sides=sas.both_sides,
+                               ignore_bridge_sites=sas.ignore_bridge_sites,
+                               label_sites=sas.label_sites,
+                               surrogate_metal=ref_symbol,
+                               optimize_surrogate_cell=sas.optimize_surrogate_cell,
+                               tol=sas.tol, use_template=False)
+    ucell = unit.cell.array[:2,:2]
+    inv = np.linalg.inv(ucell)
+
+    def get_images(indices, position):
+        # The atoms of the unit cell and the lattice translations of 
+        # the periodic images of the atoms of the repetition that are 
+        # closest to the given positions
+        indices = np.atleast_1d(indices)
+        q, (m0, m1) = indices % nunit, divmod(indices // nunit, w)
+        shifts = np.stack([m0, m1], axis=-1)
+        g = (position[...,:2] - unit.positions[q,:2]) @ inv
+
+        return q, shifts + w * np.rint((g - shifts) / w).astype(int)
+
+    # Take the sites within the first unit cell of the repetition
+    sl = tsas.site_list
+    positions = np.asarray([st['position'] for st in sl]).reshape(-1, 3)
+    cells = np.floor(positions[:,:2] @ inv + 1e-6).astype(int)
+    inner = np.nonzero(np.all(cells % w == 0, axis=1))[0]
+    if len(inner) * w * w != len(sl):
+        return cache(None)
+    sites = []
+    for k in inner:
+        st = {key: sl[k][key] for key in tsas.new_site()}
+        st['position'] = positions[k] - np.append(cells[k] @ ucell, 0.)
+        st['indices'] = get_images(st['indices'], st['position'])
+        if st['subsurf_index'] is not None:
+            st['subsurf_index'] = get_images(st['subsurf_index'], 
+                                             st['position'])
+        sites.append(st)
+
+    # The surface and subsurface atoms of the top side come before 
+    # those of the bottom side
+    def get_terminations(ids):
+        ids = np.asarray(ids, dtype=int)
+        splits = np.nonzero(np.diff(ids) < 0)[0] + 1
+
+        return [np.unique(s % nunit) for s in np.split(ids, splits)]
+
+    A = tsas.adj_matrix.tocoo()
+    first = A.row < nunit
+    ref_cell = tsas.ref_atoms.cell.array.copy()
+    ref_cell[:2] /= w
+    template = {'cell': unit.cell.array,
+                'sites': sites,
+                'neighbors': (A.row[first],) + get_images(
+                             A.col[first], unit.positions[A.row[first]]),
+                'ref_numbers': tsas.ref_atoms.numbers[:nunit],
+                'ref_positions': tsas.ref_atoms.positions[:nunit],
+                'ref_cell': ref_cell,
+                'surf_ids': get_terminations(tsas.surf_ids),
+                'subsurf_ids': get_terminations(tsas.subsurf_ids)}
+
+    return cache(template)
+
+
+def _tile_slab_template(sas, atoms, template, index, shifts, 
+                        translation, displacements):
+    """Set the surrogate reference slab, the connectivity and the 
+    terminations of a slab from the site template of its surface unit 
+    cell, and return the sites tiled across the slab. The sites are 
+    shifted by the average displacement of their atoms from the ideal
+    positions and wrapped into the cell, except for the ontop sites 
+    that are placed at their atoms as in the site search."""
+
+    from scipy.sparse import csr_matrix
+    nunit, n, m = index.shape
+    ucell = template['cell'][:2]
+    cells = np.stack(np.meshgrid(np.arange(n), np.arange(m), 
+                                 indexing='ij'), axis=-1).reshape(-1, 2)
+
+    def get_indices(q, r):
+        # The indices of the atoms at the lattice translations from 
+        # each unit cell of the slab
+        c = cells[:,None] + r[None]
+        return index[q[None], c[...,0] % n, c[...,1] % m]
+
+    sl = []
+    for st in template['sites']:
+        indices = get_indices(*st['indices'])
+        if st['site'] == 'ontop':
+            positions = atoms.positions[indices[:,0]]
+        else:
+            positions = wrap_positions(st['position'] + cells @ ucell + 
+                                       translation, atoms.cell, atoms.pbc)
+            positions += np.mean(displacements[indices], axis=1)
+        if st['subsurf_index'] is not None:
+            subsurf_indices = get_indices(*st['subsurf_index'])[:,0]
+        for k in range(len(cells)):
+            site = st.copy()
+            site['position'] = np.round(positions[k], 8)
+            site['indices'] = tuple(sorted(indices[k].tolist()))
+            if st['subsurf_index'] is not None:
+                site['subsurf_index'] = int(subsurf_indices[k])
+            sl.append(site)
+
+    # The surrogate reference slab is repeated along with the slab
+    unit_ids = np.empty(len(atoms), dtype=int)
+    unit_ids[index] = np.arange(nunit)[:,None,None]
+    ref_cell = template['ref_cell']
+    ref_positions = template['ref_positions'][unit_ids]
+    ref_positions[:,:2] += (shifts + translation[:2] @ np.linalg.inv(
+                            ucell[:,:2])) @ ref_cell[:2,:2]
+    ref_atoms = Atoms(template['ref_numbers'][unit_ids], 
+                      positions=ref_positions, pbc=atoms.pbc,
+                      cell=[n * ref_cell[0], m * ref_cell[1], ref_cell[2]])
+    sas.ref_atoms, sas.delta_positions = sas.mapping(atoms, ref_atoms)
+    sas.cell = atoms.cell
+    sas.pbc = atoms.pbc
+
+    qa, qb, r = template['neighbors']
+    rows = index[qa][:,cells[:,0],cells[:,1]].T
+    cols = get_indices(qb, r)
+    sas.adj_matrix = csr_matrix((np.ones(rows.size, dtype=int), 
+                                (rows.ravel(), cols.ravel())), 
+                                shape=(len(atoms), len(atoms)))
+    sas.adj_matrix.data[:] = 1
+    sas.surf_ids, sas.subsurf_ids = [sum((sorted(index[q].ravel().tolist()) 
+                                     for q in ids), []) for ids in 
+                                     (template['surf_ids'], 
+                                      template['subsurf_ids'])]
+
+    return sl
 
 
 class SlabAdsorptionSites(object):
@@ -1202,11 +2616,67 @@ class SlabAdsorptionSites(object):
         Recommand to set to True if the surrogate metal is very 
         different from the composition of the input slab.
 
+    ref_atoms : ase.Atoms object, default None
+        The surrogate reference slab, i.e. the slab with all atoms 
+        replaced by the surrogate metal and relaxed by EMT. Provide 
+        this to skip the relaxation, e.g. the ref_atoms attribute of 
+        the SlabAdsorptionSites object of the slab template when 
+        identifying the sites of many structures generated from the 
+        same template. The relaxed reference slabs are also cached 
+        under the surface, the surrogate metal, the cell and the 
+        scaled positions, so that the relaxation is only done once 
+        for each geometry.
+
     tol : float, default 0.5
         The tolerence of neighbor distance (in Angstrom).
         Might be helpful to adjust this if the site identification 
         is not satisfying. The default 0.5 is usually good enough.
 
+    reuse_geometry : bool, default False
+        Whether to cache the geometric skeleton of the sites under a
+        fingerprint of the positions, the cell and the settings. The
+        sites of a later structure with the same geometry, e.g. a 
+        different chemical ordering of the same slab, are then 
+        obtained by only updating the compositions, the subsurface 
+        elements and the labels. Useful for screening many chemical 
+        orderings. Sites with a local composition that has not been 
+        seen before fall back to a site search on the cached geometry.
+
+    cache_dir : str, default None
+        The directory of a persistent on-disk cache of the sites. The 
+        sites are saved to a compressed npz file named by a hash of the 
+        positions, the cell, the periodic boundary conditions, the 
+        atomic numbers and the settings, and are loaded from that file
+        when the same structure is identified again with the same 
+        settings, e.g. in another job. Useful for pipelines that 
+        re-run the site identification for identical structures.
+
+    use_template : bool, default True
+        Whether to tile the sites of an ideal slab from a template of
+        its surface unit cell. Applies to the fcc100, fcc111, fcc211, 
+        bcc100, bcc110 and hcp0001 slabs of at least 3x3 surface unit 
+        cells that match the slabs built by ase.build, with each atom 
+        within 0.05 Angstrom of its ideal position. The template is 
+        obtained from a 3x3 slab and cached, so that the surrogate 
+        relaxation and the site search are skipped for the slab. The 
+        sites are shifted by the average displacement of their atoms 
+        from the ideal positions, and the ontop sites are placed at 
+        their atoms as in the site search. The elements must be 
+        repeated with the surface unit cell as well if 
+        composition_effect=True. Otherwise, a slab that is a lateral 
+        repetition of a smaller cell (e.g. an ordered alloy or a 
+        relaxed slab that was repeated) is tiled from a template of 
+        the smallest repeating cell, if the slab contains at least 3x3
+        of these cells. Other slabs fall back to the general site search.
+
+    neighbor_list : acat.utilities.VerletNeighborList object, default None
+        A neighbor list with a skin distance that is kept across the 
+        site identifications of a series of structures, e.g. the frames 
+        of a relaxation trajectory. The neighbor search of the surrogate
+        slab is then only repeated when an atom moved by more than half
+        the skin. Must be created with mic=True. A full neighbor search
+        is done if not specified.
+
     Example
     -------
     The following example illustrates the most important use of a
@@ -1239,6 +2709,7 @@ class SlabAdsorptionSites(object):
 
     """
 
+    @profiled
     def __init__(self, atoms, surface, 
                  allow_6fold=False, 
                  composition_effect=False, 
@@ -1247,7 +2718,13 @@ class SlabAdsorptionSites(object):
                  label_sites=False,
                  surrogate_metal=None,
                  optimize_surrogate_cell=False,
-                 tol=.5, _allow_expand=True):
+                 ref_atoms=None,
+                 tol=.5, 
+                 reuse_geometry=False,
+                 cache_dir=None,
+                 use_template=True,
+                 neighbor_list=None,
+                 _allow_expand=True):
 
         assert True in atoms.pbc, 'the cell must be periodic in at least one direction'   
         warnings.filterwarnings('ignore', category=RuntimeWarning)
@@ -1269,10 +2746,6 @@ class SlabAdsorptionSites(object):
         self.surface = surface
         self.surrogate_metal = surrogate_metal
         self.optimize_surrogate_cell = optimize_surrogate_cell
-
-        self.ref_atoms, self.delta_positions = self.mapping(atoms) 
-        self.cell = atoms.cell
-        self.pbc = atoms.pbc
         self.metals = sorted(list(set(atoms.symbols)))
         self.allow_6fold = allow_6fold
         self.composition_effect = composition_effect
@@ -1280,27 +2753,103 @@ class SlabAdsorptionSites(object):
         self.ignore_bridge_sites = ignore_bridge_sites
         self.label_sites = label_sites
 
-        if self.composition_effect:
-            if len(self.metals) <= 2:
-                if len(self.metals) == 1:
-                    self.metals *= 2
-                self.label_dict = get_bimetallic_slab_labels(self.surface, self.metals)
-            else:
-                self.label_dict = get_multimetallic_slab_labels(self.surface, self.metals)
-        else:
-            self.label_dict = get_monometallic_slab_labels(self.surface)    
+        if self.composition_effect and len(self.metals) == 1:
+            self.metals *= 2
+        self.label_registry = get_label_registry(self.surface, self.metals,
+                                                 self.composition_effect)
+        self.label_dict = self.label_registry.label_dict
         self.tol = tol 
+        self.reuse_geometry = reuse_geometry
+        self.cache_dir = cache_dir
+        self.use_template = use_template
+        self.neighbor_list = neighbor_list
         self._allow_expand = _allow_expand
+        # Sites identified with a given reference slab are cached 
+        # separately
+        self._ref_atoms_key = None if ref_atoms is None else \
+            _get_geometry_key(ref_atoms, ref_atoms.get_chemical_symbols(), 
+                              None)
+
+        if self.cache_dir is not None:
+            cache_file = _get_cache_file(self, atoms)
+            if _load_cache_file(self, cache_file):
+                return
+
+        skeleton, site_list = None, None
+        if self.reuse_geometry:
+            key = _get_geometry_key(atoms, ('slab', surface, allow_6fold,
+                                    composition_effect, both_sides, 
+                                    ignore_bridge_sites, label_sites, 
+                                    optimize_surrogate_cell, tol, 
+                                    _allow_expand, self._ref_atoms_key), 
+                                    surrogate_metal)
+            skeleton = _skeletons.get(key)
+        if skeleton is not None:
+            _skeletons.move_to_end(key)
+            site_list = _relabel_from_skeleton(self, skeleton)
+            if site_list is not None:
+                self.__dict__.update(_copy_state(skeleton.final))
+                self.site_list = site_list
+                if self.cache_dir is not None:
+                    _save_cache_file(self, cache_file)
+                return
+            self.__dict__.update(_copy_state(skeleton.geometry))
+        else:
+            if self.use_template and ref_atoms is None and self._allow_expand:
+                site_list = self._tile_site_template(atoms)
+            if site_list is None:
+                self.ref_atoms, self.delta_positions = self.mapping(atoms, 
+                                                                    ref_atoms) 
+                self.cell = atoms.cell
+                self.pbc = atoms.pbc
+                self.make_neighbor_list(neighbor_number=1) 
+                self.adj_matrix = self.get_connectivity()         
+                self.surf_ids, self.subsurf_ids = self.get_termination() 
+            geometry = _get_state(self)
 
-        self.make_neighbor_list(neighbor_number=1) 
-        self.adj_matrix = self.get_connectivity()         
-        self.surf_ids, self.subsurf_ids = self.get_termination() 
-
-        self.site_list = []
-        self.populate_site_list()
-        self.postprocessing()        
+        if site_list is None:
+            self.site_list = []
+            self.populate_site_list()
+            self.postprocessing()        
+        else:
+            self.site_list = site_list
         self.site_list.sort(key=lambda x: x['indices'])
+        self.site_list = SiteList.from_sites(self.site_list)
+
+        if self.reuse_geometry:
+            if skeleton is None or not _record_compositions(self, skeleton):
+                if skeleton is not None:
+                    geometry = skeleton.geometry
+                skeleton = _SiteSkeleton(geometry, _get_state(self),
+                                         SiteList.from_sites(self.site_list))
+                _record_compositions(self, skeleton)
+                _store_skeleton(key, skeleton)
+        if self.cache_dir is not None:
+            _save_cache_file(self, cache_file)
         
+    def _get_site_neighbors(self, positions, indices, dx, 
+                            neighbor_number=1):
+        # The neighbor shell of each site position among the given 
+        # reference atoms, the same as the one from neighbor_shell_list 
+        # with the sites added as dummy atoms (different_species=True)
+        atoms = self.ref_atoms[indices]
+        numbers = atoms.numbers
+        cutoff = neighbor_number * (covalent_radii[0] + 
+                 covalent_radii[numbers].max()) + dx
+        i, j, d = get_query_neighbor_pairs(positions, atoms, cutoff, mic=True)
+        crij = covalent_radii[0] + covalent_radii[numbers[j]]
+        if neighbor_number == 1:
+            d_max1 = 0.
+        else:
+            d_max1 = (neighbor_number - 1) * crij + dx
+        d_max2 = neighbor_number * crij + dx
+        mask = (d > d_max1) & (d < d_max2)
+        i, j = i[mask], j[mask]
+        splits = np.searchsorted(i, np.arange(1, len(positions)))
+
+        return [nbrs.tolist() for nbrs in np.split(j, splits)]
+
+    @profiled
     def populate_site_list(self, cutoff=5.):        
         """Find all ontop, bridge and hollow sites (3-fold and 4-fold) 
         given an input slab based on Delaunay triangulation of the 
@@ -1351,7 +2900,7 @@ class SlabAdsorptionSites(object):
                          'position': np.round(self.positions[s], 8),
                          'indices': si})            
             if self.surface in ['fcc110','bcc211','hcp10m10h'] and morphology == 'terrace':
-                site.update({'extra': np.where(cm[s]==1)[0]})
+                site.update({'extra': cm[s].indices.astype(int)})
             if self.composition_effect:
                 site.update({'composition': self.symbols[s]})
             sl.append(site)
@@ -1379,9 +2928,10 @@ class SlabAdsorptionSites(object):
                     #if len(extraids) < 4:    
                     #    warnings.warn('Cannot identify other 4 atoms of 5-fold site {}'.format(si))
                     if len(extraids) > 4:
-                        extraids = sorted(extraids, key=lambda x: get_mic(                
-                                   self.ref_atoms.positions[x], refpos, ref_cell,
-                                   return_squared_distance=True))[:4] 
+                        sqds = get_mic_batch(self.ref_atoms.positions[extraids], 
+                                             self.ref_atoms.positions[si[0]], 
+                                             ref_cell, return_squared_distance=True)
+                        extraids = [extraids[j] for j in np.argsort(sqds, kind='stable')[:4]]
                     if self.composition_effect:
                         metals = self.metals
                         if len(metals) == 1:
@@ -1395,9 +2945,10 @@ class SlabAdsorptionSites(object):
                             elif nma == 1:
                                 composition = ma + 3*mb
                             elif nma == 2:
-                                idd = sorted(extraids[1:], key=lambda x:    
-                                      get_mic(self.positions[x], self.positions[extraids[0]],
-                                              self.cell, return_squared_distance=True))
+                                sqds = get_mic_batch(self.positions[extraids[1:]], 
+                                                     self.positions[extraids[0]],
+                                                     self.cell, return_squared_distance=True)
+                                idd = [extraids[1:][j] for j in np.argsort(sqds, kind='stable')]
                                 opp, close = idd[-1], idd[0]
                                 if self.symbols[opp] == self.symbols[extraids[0]]:
                                     composition = ma + mb + ma + mb 
@@ -1411,9 +2962,10 @@ class SlabAdsorptionSites(object):
                             elif nma == 4:
                                 composition = 4*ma
                         else:
-                            opp = max(list(extraids[1:]), key=lambda x:
-                                      get_mic(self.positions[x], self.positions[extraids[0]],
-                                              self.cell, return_squared_distance=True))
+                            sqds = get_mic_batch(self.positions[extraids[1:]], 
+                                                 self.positions[extraids[0]],
+                                                 self.cell, return_squared_distance=True)
+                            opp = extraids[1:][np.argmax(sqds)]
                             nni = [i for i in extraids[1:] if i != opp]
                             nodes = self.symbols[[extraids[0], nni[0], opp, nni[1]]]
                             composition = ''.join(hash_composition(nodes))
@@ -1432,68 +2984,17 @@ class SlabAdsorptionSites(object):
         neighbors = dt.neighbors
         simplices = dt.simplices
 
-        bridge_positions, fold3_positions, fold4_positions = [], [], []
-        bridge_points, fold3_points, fold4_points = [], [], []
-         
-        # Delaunay triangulation (borrow from Catkit)
-        for i, corners in enumerate(simplices):
-            cir = scipy.linalg.circulant(corners)
-            edges = cir[:,1:]
-
-            # Inner angle of each triangle corner
-            vec = ext_surf_coords[edges.T] - ext_surf_coords[corners]
-            uvec = vec.T / np.linalg.norm(vec, axis=2).T
-            angles = np.sum(uvec.T[0] * uvec.T[1], axis=1)
-
-            # Angle types
-            right = np.isclose(angles, 0)
-            obtuse = (angles < -1e-5)
-            rh_corner = corners[right]
-            edge_neighbors = neighbors[i]
-            bridge = np.sum(ext_surf_coords[edges], axis=1) / 2.0
-
-            # Looping through corners allows for elimination of
-            # redundant points, identification of 4-fold hollows,
-            # and collection of bridge neighbors.            
-            for j, c in enumerate(corners):
-                edge = sorted(edges[j])
-                if edge in bridge_points:
-                    continue
-
-                # Get the bridge neighbors (for adsorption vector)
-                neighbor_simplex = simplices[edge_neighbors[j]]
-                oc = list(set(neighbor_simplex) - set(edge))[0]
-
-                # Right angles potentially indicate 4-fold hollow
-                potential_hollow = edge + sorted([c, oc])
-                if c in rh_corner:
-                    if potential_hollow in fold4_points:
-                        continue
-
-                    # Assumption: If not 4-fold, this suggests
-                    # no hollow OR bridge site is present.
-                    ovec = ext_surf_coords[edge] - ext_surf_coords[oc]
-                    ouvec = ovec / np.linalg.norm(ovec)
-                    oangle = np.dot(*ouvec)
-                    oright = np.isclose(oangle, 0)
-                    if oright:
-                        fold4_points.append(potential_hollow)
-                        fold4_positions.append(bridge[j])
-                else:
-                    bridge_points.append(edge)
-                    bridge_positions.append(bridge[j])
-
-            if not right.any() and not obtuse.any():
-                fold3_position = np.average(ext_surf_coords[corners], axis=0)
-                fold3_points += corners.tolist()
-                fold3_positions.append(fold3_position)
+        with stage('SlabAdsorptionSites.delaunay'):
+            # Delaunay triangulation (borrow from Catkit)
+            bridge_positions, fold4_positions, fold3_positions = \
+                _get_delaunay_sites(ext_surf_coords, simplices, neighbors)
 
         fold4_surfaces = ['fcc100','fcc211','fcc311','fcc322','fcc331','bcc100',
                           'bcc210','bcc310','hcp10m10t','hcp10m11','hcp10m12']
 
         # Complete information of each site
         for n, poss in enumerate([bridge_positions,fold4_positions,fold3_positions]):
-            if not poss:
+            if len(poss) == 0:
                 continue
             fracs = np.stack(poss, axis=0) @ np.linalg.pinv(ref_cell)       
             xfracs, yfracs = fracs[:,0], fracs[:,1]
@@ -1506,21 +3007,17 @@ class SlabAdsorptionSites(object):
             # Sort the index list of surface and subsurface atoms 
             # so that we can retrive original indices later
             top2_indices = self.surf_ids + self.subsurf_ids
-            top2atoms = self.ref_atoms[top2_indices]
-
-            # Make a new neighborlist including sites as dummy atoms
-            dummies = Atoms('X{}'.format(reduced_poss.shape[0]), 
-                            positions=reduced_poss, 
-                            cell=ref_cell, pbc=self.pbc)
-            ntop1, ntop2 = len(self.surf_ids), len(top2atoms)
-            testatoms = top2atoms + dummies
-            nblist = neighbor_shell_list(testatoms, dx=self.tol, neighbor_number=1, 
-                                         different_species=True, mic=True) 
+
+            # Assign each site to its neighboring surface and subsurface 
+            # atoms, as if the sites were added as dummy atoms
+            ntop1 = len(self.surf_ids)
+            nblist = self._get_site_neighbors(reduced_poss, top2_indices, 
+                                              dx=self.tol)
             # Make bridge sites  
             if n == 0:
                 fold4_poss = []
                 for i, refpos in enumerate(reduced_poss):
-                    bridge_indices = nblist[ntop2+i]
+                    bridge_indices = nblist[i]
                     if not bridge_indices:
                         continue
                     bridgeids = [top2_indices[j] for j in bridge_indices if j < ntop1]
@@ -1530,9 +3027,10 @@ class SlabAdsorptionSites(object):
                             fold4_poss.append(refpos)
                             continue
                         else:
-                            bridgeids = sorted(bridgeids, key=lambda x: get_mic(        
-                                               self.ref_atoms.positions[x], refpos, 
-                                               ref_cell, return_squared_distance=True))[:2]
+                            sqds = get_mic_batch(self.ref_atoms.positions[bridgeids], 
+                                                 refpos, ref_cell, 
+                                                 return_squared_distance=True)
+                            bridgeids = [bridgeids[j] for j in np.argsort(sqds, kind='stable')[:2]]
                     si = tuple(sorted(bridgeids))
                     if self.optimize_surrogate_cell:
                         reffrac = refpos @ np.linalg.pinv(ref_cell)
@@ -1540,7 +3038,7 @@ class SlabAdsorptionSites(object):
                                0)) @ self.cell
                     else:
                         pos = refpos + np.average(self.delta_positions[bridgeids], 0) 
-                    occurence = np.sum(cm[bridgeids], axis=0)
+                    occurence = cm[bridgeids].sum(axis=0).A1
                     siset = set(si)
                     nstep = len(stepids.intersection(siset))
                     nterrace = len(terraceids.intersection(siset))
@@ -1741,9 +3239,10 @@ class SlabAdsorptionSites(object):
                         #if len(extraids) < 2:
                         #    warnings.warn('Cannot identify other 2 atoms of 4-fold site {}'.format(si))
                         if len(extraids) > 2:
-                            extraids = sorted(extraids, key=lambda x: get_mic(        
-                                       self.ref_atoms.positions[x], refpos, ref_cell,
-                                       return_squared_distance=True))[:2]              
+                            sqds = get_mic_batch(self.ref_atoms.positions[extraids], 
+                                                 refpos, ref_cell, 
+                                                 return_squared_distance=True)
+                            extraids = [extraids[j] for j in np.argsort(sqds, kind='stable')[:2]]
                         site.update({'site': this_site,
                                      'surface': self.surface,
                                      'morphology': morphology,
@@ -1776,29 +3275,23 @@ class SlabAdsorptionSites(object):
                     usi.add(si)
 
                 if self.surface in fold4_surfaces and fold4_poss:
-                    fold4atoms = Atoms('X{}'.format(len(fold4_poss)), 
-                                       positions=np.asarray(fold4_poss),
-                                       cell=ref_cell, pbc=self.pbc)
                     sorted_top = self.surf_ids
-                    ntop = len(sorted_top)
-                    topatoms = self.ref_atoms[sorted_top] 
-                    newatoms = topatoms + fold4atoms
-                    newnblist = neighbor_shell_list(newatoms, dx=.1, 
-                                                    neighbor_number=2,
-                                                    different_species=True, 
-                                                    mic=True) 
+                    newnblist = self._get_site_neighbors(np.asarray(fold4_poss),
+                                                         sorted_top, dx=.1, 
+                                                         neighbor_number=2)
                      
                     # Make 4-fold hollow sites
                     for i, refpos in enumerate(fold4_poss):
-                        fold4_indices = newnblist[ntop+i]                     
+                        fold4_indices = newnblist[i]                     
                         fold4ids = [sorted_top[j] for j in fold4_indices]
                         if len(fold4ids) < 4:
                             continue
                         elif len(fold4ids) > 4:
-                            fold4ids = sorted(fold4ids, key=lambda x: get_mic(        
-                                       self.ref_atoms.positions[x], refpos, ref_cell,
-                                       return_squared_distance=True))[:4]
-                        occurence = np.sum(cm[fold4ids], axis=0)
+                            sqds = get_mic_batch(self.ref_atoms.positions[fold4ids], 
+                                                 refpos, ref_cell, 
+                                                 return_squared_distance=True)
+                            fold4ids = [fold4ids[j] for j in np.argsort(sqds, kind='stable')[:4]]
+                        occurence = cm[fold4ids].sum(axis=0).A1
                         isub = np.where(occurence >= 4)[0]                        
                         isub = [i for i in isub if i in self.subsurf_ids]
                         if len(isub) == 0:
@@ -1855,9 +3348,10 @@ class SlabAdsorptionSites(object):
                                     composition = ma + 3*mb
                                 elif nma == 2:
                                     if this_site == '5fold':
-                                        idd = sorted(fold4ids[1:], key=lambda x:        
-                                              get_mic(self.positions[x], self.positions[fold4ids[0]],
-                                                      self.cell, return_squared_distance=True))
+                                        sqds = get_mic_batch(self.positions[fold4ids[1:]], 
+                                                             self.positions[fold4ids[0]],
+                                                             self.cell, return_squared_distance=True)
+                                        idd = [fold4ids[1:][j] for j in np.argsort(sqds, kind='stable')]
                                         opp, close = idd[-1], idd[0]
                                         if self.symbols[opp] == self.symbols[fold4ids[0]]:
                                             composition = ma + mb + ma + mb 
@@ -1867,7 +3361,7 @@ class SlabAdsorptionSites(object):
                                             else:
                                                 composition = ma + 2*mb + ma           
                                     else:
-                                        opposite = np.where(cm[si[1:],si[0]]==0)[0]
+                                        opposite = np.where(cm[list(si[1:]),si[0]].toarray().ravel()==0)[0]
                                         opp = si[1+opposite[0]]         
                                         if self.symbols[opp] == self.symbols[fold4ids[0]]:
                                             composition = ma + mb + ma + mb 
@@ -1879,13 +3373,14 @@ class SlabAdsorptionSites(object):
                                     composition = 4*ma
                             else:
                                 if this_site == '5fold':
-                                    opp = max(list(fold4ids[1:]), key=lambda x:
-                                              get_mic(self.positions[x], self.positions[fold4ids[0]],
-                                                      self.cell, return_squared_distance=True))
+                                    sqds = get_mic_batch(self.positions[fold4ids[1:]], 
+                                                         self.positions[fold4ids[0]],
+                                                         self.cell, return_squared_distance=True)
+                                    opp = fold4ids[1:][np.argmax(sqds)]
                                     nni = [i for i in fold4ids[1:] if i != opp]
                                     nodes = self.symbols[[fold4ids[0], nni[0], opp, nni[1]]]
                                 else:
-                                    opposite = np.where(cm[si[1:],si[0]]==0)[0]
+                                    opposite = np.where(cm[list(si[1:]),si[0]].toarray().ravel()==0)[0]
                                     opp = si[1+opposite[0]] 
                                     nni = [i for i in si[1:] if i != opp]
                                     nodes = self.symbols[[si[0], nni[0], opp, nni[1]]]
@@ -1910,7 +3405,7 @@ class SlabAdsorptionSites(object):
                     fold4_sites = [s for s in sl if s['site'] == '4fold']
 
                 for i, refpos in enumerate(reduced_poss):
-                    fold3_indices = nblist[ntop2+i]
+                    fold3_indices = nblist[i]
                     fold3ids = [top2_indices[j] for j in fold3_indices if j < ntop1]
                     if len(fold3ids) != 3:
                         #if self.surface != 'hcp10m11':
@@ -1938,7 +3433,7 @@ class SlabAdsorptionSites(object):
                     for idx in si:
                         normals_for_site[idx].append(normal)
 
-                    occurence = np.sum(cm[fold3ids], axis=0)
+                    occurence = cm[fold3ids].sum(axis=0).A1
                     if self.surface in ['fcc211','fcc221','fcc322','fcc332',
                     'hcp10m11','hcp10m12']:
                         if np.max(occurence[self.subsurf_ids]) == 3:
@@ -2033,28 +3528,21 @@ class SlabAdsorptionSites(object):
                     usi.add(si)
  
             if n == 1 and self.surface in fold4_surfaces and list(reduced_poss):
-                fold4atoms = Atoms('X{}'.format(len(reduced_poss)), 
-                                   positions=np.asarray(reduced_poss),
-                                   cell=ref_cell, pbc=self.pbc)
                 sorted_top = self.surf_ids
-                ntop = len(sorted_top)
-                topatoms = self.ref_atoms[sorted_top]
-                newatoms = topatoms + fold4atoms
-                newnblist = neighbor_shell_list(newatoms, dx=.1, 
-                                                neighbor_number=2,
-                                                different_species=True, 
-                                                mic=True) 
+                newnblist = self._get_site_neighbors(reduced_poss, sorted_top, 
+                                                     dx=.1, neighbor_number=2)
 
                 for i, refpos in enumerate(reduced_poss): 
-                    fold4_indices = newnblist[ntop+i]            
+                    fold4_indices = newnblist[i]            
                     fold4ids = [sorted_top[j] for j in fold4_indices]
                     if len(fold4ids) < 4:
                         continue
                     elif len(fold4ids) > 4:
-                        fold4ids = sorted(fold4ids, key=lambda x: get_mic(        
-                                   self.ref_atoms.positions[x], refpos, ref_cell, 
-                                   return_squared_distance=True))[:4]             
-                    occurence = np.sum(cm[fold4ids], axis=0)
+                        sqds = get_mic_batch(self.ref_atoms.positions[fold4ids], 
+                                             refpos, ref_cell, 
+                                             return_squared_distance=True)
+                        fold4ids = [fold4ids[j] for j in np.argsort(sqds, kind='stable')[:4]]
+                    occurence = cm[fold4ids].sum(axis=0).A1
                     isub = np.where(occurence == 4)[0]                    
                     isub = [i for i in isub if i in self.subsurf_ids]
                     if len(isub) == 0:
@@ -2110,9 +3598,10 @@ class SlabAdsorptionSites(object):
                                 composition = ma + 3*mb
                             elif nma == 2:
                                 if this_site == '5fold':
-                                    idd = sorted(fold4ids[1:], key=lambda x:       
-                                          get_mic(self.positions[x], self.positions[fold4ids[0]],
-                                                  self.cell, return_squared_distance=True))
+                                    sqds = get_mic_batch(self.positions[fold4ids[1:]], 
+                                                         self.positions[fold4ids[0]],
+                                                         self.cell, return_squared_distance=True)
+                                    idd = [fold4ids[1:][j] for j in np.argsort(sqds, kind='stable')]
                                     opp, close = idd[-1], idd[0]
                                     if self.symbols[opp] == self.symbols[fold4ids[0]]:
                                         composition = ma + mb + ma + mb 
@@ -2122,7 +3611,7 @@ class SlabAdsorptionSites(object):
                                         else:
                                             composition = ma + 2*mb + ma  
                                 else:
-                                    opposite = np.where(cm[si[1:],si[0]]==0)[0]
+                                    opposite = np.where(cm[list(si[1:]),si[0]].toarray().ravel()==0)[0]
                                     opp = si[1+opposite[0]]         
                                     if self.symbols[opp] == self.symbols[fold4ids[0]]:
                                         composition = ma + mb + ma + mb 
@@ -2134,13 +3623,14 @@ class SlabAdsorptionSites(object):
                                 composition = 4*ma
                         else:
                             if this_site == '5fold':
-                                opp = max(list(fold4ids[1:]), key=lambda x:
-                                          get_mic(self.positions[x], self.positions[fold4ids[0]],
-                                                  self.cell, return_squared_distance=True))
+                                sqds = get_mic_batch(self.positions[fold4ids[1:]], 
+                                                     self.positions[fold4ids[0]],
+                                                     self.cell, return_squared_distance=True)
+                                opp = fold4ids[1:][np.argmax(sqds)]
                                 nni = [i for i in fold4ids[1:] if i != opp]
                                 nodes = self.symbols[[fold4ids[0], nni[0], opp, nni[1]]]
                             else:
-                                opposite = np.where(cm[si[1:],si[0]]==0)[0]
+                                opposite = np.where(cm[list(si[1:]),si[0]].toarray().ravel()==0)[0]
                                 opp = si[1+opposite[0]] 
                                 nni = [i for i in si[1:] if i != opp]
                                 nodes = self.symbols[[si[0], nni[0], opp, nni[1]]]
@@ -2222,18 +3712,18 @@ class SlabAdsorptionSites(object):
                     site = st.copy()                     
                     subpos = st['position'] - st['normal'] * dh / 2
                     sid = list(st['indices'])
-                    occurence = cm[sid]
+                    occurence = cm[sid].toarray()
                     surfsi = sid + list(np.where(np.sum(occurence, axis=0) == 2)[0])
                     if len(surfsi) > 4:
-                        surfsi = sorted(surfsi, key=lambda x: get_mic(        
-                                        self.positions[x], subpos, self.cell,
-                                        return_squared_distance=True))[:4]    
+                        sqds = get_mic_batch(self.positions[surfsi], subpos, 
+                                             self.cell, return_squared_distance=True)
+                        surfsi = [surfsi[j] for j in np.argsort(sqds, kind='stable')[:4]]
                     subsi = [self.subsurf_ids[i] for i in np.where(np.sum(
                              occurence[:,self.subsurf_ids], axis=0) == 1)[0]]
                     if len(subsi) > 2:
-                        subsi = sorted(subsi, key=lambda x: get_mic(       
-                                       self.positions[x], subpos, self.cell,
-                                       return_squared_distance=True))[:2]   
+                        sqds = get_mic_batch(self.positions[subsi], subpos, 
+                                             self.cell, return_squared_distance=True)
+                        subsi = [subsi[j] for j in np.argsort(sqds, kind='stable')[:2]]
                     si = tuple(sorted(surfsi + subsi))
                     normal = np.asarray([0.,0.,1.])
                     site.update({'site': '6fold',
@@ -2244,11 +3734,10 @@ class SlabAdsorptionSites(object):
                 elif st['site'] == 'fcc':
                     site = st.copy()
                     subpos = st['position'] - st['normal'] * dh / 2                               
-                    def get_squared_distance(x):
-                        return get_mic(self.positions[x], subpos, 
-                                       self.cell, return_squared_distance=True)
-                    subsi = sorted(sorted(self.subsurf_ids, 
-                                          key=get_squared_distance)[:3])     
+                    sqds = get_mic_batch(self.positions[self.subsurf_ids], subpos,
+                                         self.cell, return_squared_distance=True)
+                    subsi = sorted(self.subsurf_ids[j] for j in 
+                                   np.argsort(sqds, kind='stable')[:3])
                     si = site['indices']
                     site.update({'site': '6fold',      
                                  'position': np.round(subpos, 8),
@@ -2320,6 +3809,7 @@ class SlabAdsorptionSites(object):
                 sl.append(site)
                 usi.add(si)
 
+    @profiled
     def postprocessing(self):
         """Postprocessing the site list, and potentially adding 
         more sites."""
@@ -2352,20 +3842,27 @@ class SlabAdsorptionSites(object):
             if self.label_sites:
                 self.get_labels()
 
+    @profiled
     def populate_opposite_site_list(self):
-        """Collect the sites on the opposite side of the slab."""
+        """Collect the sites on the opposite side of the slab. The 
+        neighbor list, connectivity and surrogate reference slab are 
+        shared with the top side and mirrored in z."""
 
         atoms = self.atoms.copy()
         atoms.positions *= [1,1,-1]
-        nsas = SlabAdsorptionSites(atoms, surface=self.surface,                                 
-                                   allow_6fold=self.allow_6fold,
-                                   composition_effect=self.composition_effect, 
-                                   both_sides=False,
-                                   ignore_bridge_sites=self.ignore_bridge_sites,
-                                   label_sites=self.label_sites,
-                                   surrogate_metal=self.surrogate_metal,
-                                   optimize_surrogate_cell=self.optimize_surrogate_cell,
-                                   tol=self.tol, _allow_expand=False)
+        ref_atoms = self.ref_atoms.copy()
+        ref_atoms.positions *= [1,1,-1]
+        nsas = object.__new__(SlabAdsorptionSites)
+        nsas.__dict__.update(self.__dict__)
+        nsas.atoms = atoms
+        nsas.positions = atoms.positions
+        nsas.ref_atoms, nsas.delta_positions = self.mapping(atoms, ref_atoms)
+        nsas.surf_ids, nsas.subsurf_ids = self.get_termination(side='bottom')
+        nsas.both_sides = False
+        nsas._allow_expand = False
+        nsas.site_list = []
+        nsas.populate_site_list()
+        nsas.postprocessing()
         # Take only the site positions within the periodic boundary
         bot_site_list = nsas.site_list
         for st in bot_site_list:
@@ -2376,14 +3873,23 @@ class SlabAdsorptionSites(object):
         self.surf_ids += nsas.surf_ids
         self.subsurf_ids += nsas.subsurf_ids
 
+    @profiled
     def populate_expanded_site_list(self):
-        """Collect the sites on the 2x2 expanded surface and cell for 
-        small unit cells and then return the sites within the original
-        unit cell."""
+        """Collect the sites on the expanded surface and cell for small 
+        unit cells and then return the sites within the original unit 
+        cell. The relaxed reference slab is repeated along with the slab 
+        so that the expanded slab is neither relaxed nor expanded again."""
 
+        # A 1x1 cell is still small after a 2x2 expansion
+        repeats = [4,4,1] if len(self.surf_ids) == 1 else [2,2,1]
         atoms = self.atoms.copy()
+        scaled = atoms.get_scaled_positions(wrap=False)
         atoms.wrap()
-        atoms *= [2,2,1]
+        shifts = np.round(atoms.get_scaled_positions(wrap=False) - scaled)
+        ref_atoms = self.ref_atoms.copy()
+        ref_atoms.positions += shifts @ ref_atoms.cell
+        atoms *= repeats
+        ref_atoms *= repeats
         nsas = SlabAdsorptionSites(atoms, surface=self.surface,                          
                                    allow_6fold=self.allow_6fold,
                                    composition_effect=self.composition_effect, 
@@ -2392,24 +3898,26 @@ class SlabAdsorptionSites(object):
                                    label_sites=self.label_sites,
                                    surrogate_metal=self.surrogate_metal,
                                    optimize_surrogate_cell=self.optimize_surrogate_cell,
-                                   tol=self.tol, _allow_expand=(len(self.surf_ids)==1))
-        # Take only the site positions within the periodic boundary
+                                   ref_atoms=ref_atoms, tol=self.tol, 
+                                   reuse_geometry=self.reuse_geometry,
+                                   _allow_expand=False)
+        # Take only the site positions within the periodic boundary, 
+        # i.e. drop the sites that coincide with an earlier site 
         sl = nsas.site_list
         poss = np.stack([s['position'] for s in sl], axis=0)
         poss = wrap_positions(poss, self.cell, self.pbc)
-        D = squareform(pdist(poss))
-        screen, wrapped_poss = [], []                             
-        seen = set()
-        for row, col in zip(*np.where(D < 0.15)):
-            if row not in seen:
-                screen.append(row)
-                wrapped_poss.append(poss[row])
-            seen.update([row, col])
+        i, j, _ = get_neighbor_pairs(Atoms(positions=poss, cell=self.cell, 
+                                           pbc=self.pbc), 0.15, mic=True)
+        dups = set(i[j < i].tolist())
+        natoms = len(self.atoms)
         self.site_list = []
-        for i, j in enumerate(screen):
-            s = sl[j]
-            s['position'] = wrapped_poss[i]
-            s['indices'] = tuple(sorted(np.mod(s['indices'], len(self.atoms))))
+        for k, s in enumerate(sl):
+            if k in dups:
+                continue
+            s['position'] = poss[k]
+            s['indices'] = tuple(sorted(np.mod(s['indices'], natoms)))
+            if s['subsurf_index'] is not None:
+                s['subsurf_index'] %= natoms
             self.site_list.append(s)
 
     def get_site(self, indices=None):
@@ -2428,8 +3936,11 @@ class SlabAdsorptionSites(object):
         else:
             indices = indices if is_list_or_tuple(indices) else [indices]
             indices = tuple(sorted(indices))
-            st = next((s for s in self.site_list if 
-                       s['indices'] == indices), None)
+            if isinstance(self.site_list, SiteList):
+                st = self.site_list.find(indices)
+            else:
+                st = next((s for s in self.site_list if 
+                           s['indices'] == indices), None)
         return st
 
     def get_sites(self, site=None,                                                                 
@@ -2534,21 +4045,24 @@ class SlabAdsorptionSites(object):
             sklist = sorted([[s[k] for k in key_list] for s in sl])
             return sorted(list(sklist for sklist, _ in groupby(sklist)))
         else:
-            seen_tuple = []
+            seen_tuple = set()
             uni_sites = []
             if about is not None:
-                sl = sorted(sl, key=lambda x: get_mic(x['position'], 
-                            about, self.cell, return_squared_distance=True))
+                poss = np.asarray([s['position'] for s in sl]).reshape(-1, 3)
+                sqds = get_mic_batch(poss, about, self.cell, 
+                                     return_squared_distance=True)
+                sl = [sl[j] for j in np.argsort(sqds, kind='stable')]
             for i, s in enumerate(sl):
                 sig = tuple(s[k] for k in key_list)
                 if sig not in seen_tuple:
-                    seen_tuple.append(sig)
+                    seen_tuple.add(sig)
                     if return_site_indices:
                         s = i
                     uni_sites.append(s)
 
             return uni_sites                        
 
+    @profiled
     def get_labels(self):
         # Assign labels
         for st in self.site_list:
@@ -2565,10 +4079,31 @@ class SlabAdsorptionSites(object):
                 'composition': None, 'subsurf_index': None,
                 'subsurf_element': None, 'label': None}
 
-    def mapping(self, atoms):
-        """Map the slab into a surrogate reference slab for code versatility."""
-
-        ref_atoms = atoms.copy()
+    @profiled
+    def _tile_site_template(self, atoms):
+        # Tile the sites of an ideal or periodic slab from the site 
+        # template of its surface unit cell or its smallest repeating 
+        # cell. Returns None if the slab does not repeat
+        match = _match_ideal_slab(atoms, self.surface)
+        if match is not None and self.composition_effect and np.any(
+        atoms.numbers[match[1]] != match[0].numbers[:,None,None]):
+            match = None
+        if match is None:
+            match = _match_periodic_slab(atoms, self.composition_effect)
+        # Slabs smaller than the repetition of the template are not 
+        # worth tiling
+        if match is None or min(match[1].shape[1:]) < _template_repeats:
+            return None
+        unit, index, shifts, translation, displacements = match
+        template = _get_slab_template(self, unit, self._get_ref_symbol(atoms))
+        if template is None:
+            return None
+
+        return _tile_slab_template(self, atoms, template, index, shifts,
+                                   translation, displacements)
+
+    def _get_ref_symbol(self, atoms):
+        # The element of the surrogate reference slab
         pm = self.surrogate_metal
         if pm is None:
             common_metal = Counter(self.atoms.symbols).most_common(1)[0][0]
@@ -2591,9 +4126,50 @@ class SlabAdsorptionSites(object):
                 ref_symbol = 'Au' if pm is None else pm
         else:
             raise ValueError('surface {} is not supported'.format(self.surface))
+
+        return ref_symbol
+
+    @profiled
+    def mapping(self, atoms, ref_atoms=None):
+        """Map the slab into a surrogate reference slab for code versatility.
+        The relaxed reference slab is cached under the surface, the
+        surrogate metal, the cell and the scaled positions of the slab.
+
+        Parameters
+        ----------
+        atoms : ase.Atoms object
+            The slab.
+
+        ref_atoms : ase.Atoms object, default None
+            The relaxed reference slab. Skip the relaxation if provided.
+
+        """
+
+        if ref_atoms is not None:
+            assert len(ref_atoms) == len(atoms), \
+            'the reference slab must have the same atoms as the slab'
+            ref_atoms = ref_atoms.copy()
+            ref_atoms.calc = None
+            if self.optimize_surrogate_cell:
+                delta_positions = cart_to_frac(atoms) - cart_to_frac(ref_atoms)
+            else:
+                delta_positions = atoms.positions - ref_atoms.positions
+
+            return ref_atoms, delta_positions
+
+        ref_symbol = self._get_ref_symbol(atoms)
+        key = _get_reference_key(atoms, self.surface, ref_symbol,
+                                 self.optimize_surrogate_cell)
+        if key in _reference_slabs:
+            _reference_slabs.move_to_end(key)
+            return self.mapping(atoms, _reference_slabs[key])
+
+        ref_atoms = atoms.copy()
         for a in ref_atoms:
             a.symbol = ref_symbol
 
+        from ase.constraints import ExpCellFilter
+        from ase.optimize import BFGS
         try:
             from asap3 import EMT as asapEMT
 
@@ -2624,22 +4200,36 @@ class SlabAdsorptionSites(object):
         else:
             delta_positions = atoms.positions - ref_atoms.positions
 
+        _reference_slabs[key] = ref_atoms.copy()
+        while len(_reference_slabs) > _max_reference_slabs:
+            _reference_slabs.popitem(last=False)
+
         return ref_atoms, delta_positions
 
+    @profiled
     def make_neighbor_list(self, neighbor_number=1):
         self.nblist = neighbor_shell_list(self.ref_atoms, self.tol, 
-                                          neighbor_number, mic=True)
+                                          neighbor_number, mic=True,
+                                          neighbor_list=self.neighbor_list)
 
-    def get_connectivity(self):                                      
-        """Get the adjacency matrix."""
+    def get_connectivity(self, sparse=True):                                      
+        """Get the adjacency matrix.
 
-        return get_adj_matrix(self.nblist)
+        Parameters
+        ----------
+        sparse : bool, default True
+            Whether to return a scipy.sparse.csr_matrix. Set to False to
+            get a dense numpy.ndarray.
 
+        """
+
+        return get_adj_matrix(self.nblist, sparse=sparse)
+
+    @profiled
     def get_termination(self, side='top'):
         """Return the indices of surface and subsurface atoms. This 
         function relies on coordination number and the connectivity 
-        of the atoms. The top surface termination is singled out by 
-        graph adjacency using networkx.
+        of the atoms. See get_terminations for both sides at once.
 
         Parameters
         ----------
@@ -2649,52 +4239,82 @@ class SlabAdsorptionSites(object):
         """
 
         assert side in ['top', 'bottom']
-        cm = self.adj_matrix.copy()                               
-        np.fill_diagonal(cm, 0)
-        indices = self.indices 
-        coord = np.count_nonzero(cm, axis=1)
-        both_surf = []
-        bulk = []
+        terminations, _ = self.get_terminations()
+
+        return terminations[side]
+
+    def get_terminations(self):
+        """Return the indices of surface and subsurface atoms of both
+        sides of the slab, and the layer index of each atom. The atoms
+        with less than the maximum coordination number are surface 
+        atoms, which are separated into the top and bottom surface
+        terminations by the connected components of the bonds between
+        surface atoms (scipy.sparse.csgraph). The subsurface atoms are
+        the other atoms bonded to the surface atoms of each side.
+
+        Returns
+        -------
+        terminations : dict
+            The sorted indices of the surface atoms and the subsurface 
+            atoms of each side, i.e. {'top': (surf_ids, subsurf_ids), 
+            'bottom': (surf_ids, subsurf_ids)}.
+
+        layers : numpy.ndarray
+            The layer index of each atom, counted by the number of 
+            bonds from the top surface atoms (0 for the top surface 
+            atoms, 1 for the top subsurface atoms, etc.), or -1 for 
+            the atoms that are not connected to the top surface.
+
+        """
+
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components, shortest_path
+        cm = csr_matrix(self.adj_matrix).tocoo()
+        offdiag = (cm.row != cm.col) & (cm.data != 0)
+        rows, cols = cm.row[offdiag], cm.col[offdiag]
+        natoms = len(self.indices)
+        coord = np.bincount(rows, minlength=natoms)
         max_coord = np.max(coord)
         if self.surface == 'bcc210':
             max_coord -= 1
+        isbulk = coord >= max_coord
 
-        for i, c in enumerate(coord):
-            a_s = indices[i]
-            if c >= max_coord:  
-                bulk.append(a_s)
-            else:
-                both_surf.append(a_s)
-        surfcm = cm.copy()
-        surfcm[bulk] = 0
-        surfcm[:,bulk] = 0
-
-        if len(both_surf) == 2:
-            components = [[both_surf[0]], [both_surf[1]]]
+        # Only the surface atoms bonded to another surface atom belong
+        # to a termination, unless there are only two surface atoms
+        if np.count_nonzero(~isbulk) == 2:
+            components = np.where(isbulk, -1, np.cumsum(~isbulk) - 1)
         else:
-            # Use networkx to separate top layer and bottom layer
-            rows, cols = np.where(surfcm == 1)
-            edges = zip(rows.tolist(), cols.tolist())
-            G = nx.Graph()
-            G.add_edges_from(edges)
-            components = nx.connected_components(G)
-
-        if side == 'top':
-            surf = list(max(components, 
-                        key=lambda x: np.mean(
-                        self.ref_atoms.positions[list(x),2])))
-        elif side == 'bottom':
-            surf = list(min(components,
-                        key=lambda x: np.mean(
-                        self.ref_atoms.positions[list(x),2])))
-        subsurf = []
-        for a_b in bulk:
-            for a_t in surf:
-                if cm[a_t, a_b] > 0:
-                    subsurf.append(a_b)
-        subsurf = list(np.unique(subsurf))
-
-        return sorted(surf), sorted(subsurf)
+            surfedges = ~isbulk[rows] & ~isbulk[cols]
+            G = csr_matrix((np.ones(np.count_nonzero(surfedges)), 
+                           (rows[surfedges], cols[surfedges])), 
+                           shape=(natoms, natoms))
+            _, components = connected_components(G, directed=False)
+            components[np.diff(G.indptr) == 0] = -1
+        valid = components >= 0
+        _, components[valid] = np.unique(components[valid], 
+                                         return_inverse=True)
+        heights = [np.mean(self.ref_atoms.positions[components == c, 2]) 
+                   for c in range(components.max() + 1)]
+
+        terminations = {}
+        for side, c in [('top', np.argmax(heights)), 
+                        ('bottom', np.argmin(heights))]:
+            issurf = components == c
+            subsurf = np.unique(cols[issurf[rows] & isbulk[cols]])
+            terminations[side] = (np.flatnonzero(issurf).tolist(), 
+                                  subsurf.tolist())
+
+        # Breadth-first search from a virtual atom bonded to all top 
+        # surface atoms
+        top = terminations['top'][0]
+        A = csr_matrix((np.ones(len(rows) + len(top)), 
+                       (np.append(rows, np.full(len(top), natoms)), 
+                        np.append(cols, top))), shape=(natoms + 1,) * 2)
+        dists = shortest_path(A, directed=False, unweighted=True, 
+                              indices=natoms)[:natoms]
+        layers = np.where(np.isinf(dists), 0, dists).astype(int) - 1
+
+        return terminations, layers
  
     def get_two_vectors(self, indices):
 
@@ -2725,8 +4345,8 @@ class SlabAdsorptionSites(object):
 
         return n
 
-    def get_graph(self, return_adj_matrix=False):                              
-        """Get the graph representation of the nanoparticle.
+    def get_graph(self, return_adj_matrix=False, sparse=True):                              
+        """Get the graph representation of the slab.
 
         Parameters
         ----------
@@ -2734,17 +4354,22 @@ class SlabAdsorptionSites(object):
             Whether to return adjacency matrix instead of the networkx.Graph 
             object.
 
+        sparse : bool, default True
+            Whether to return the adjacency matrix as a scipy.sparse.csr_matrix.
+            Only relevant when return_adj_matrix=True.
+
         """
 
         cm = self.adj_matrix
         if return_adj_matrix:
-            return cm
+            return cm if sparse else cm.toarray()
 
+        import networkx as nx
         G = nx.Graph()                   
         symbols = self.symbols                               
         G.add_nodes_from([(i, {'symbol': symbols[i]}) 
                           for i in range(len(symbols))])
-        rows, cols = np.where(cm == 1)
+        rows, cols = cm.nonzero()
         edges = zip(rows.tolist(), cols.tolist())
         G.add_edges_from(edges)
 
@@ -2778,45 +4403,14 @@ class SlabAdsorptionSites(object):
 
         """
 
-        sl = self.site_list
-        poss = np.asarray([s['position'] for s in sl])
-        statoms = Atoms('X{}'.format(len(sl)), positions=poss,
-                        cell=self.cell, pbc=self.pbc)
-        if radius is not None:                                                          
-            nbslist = neighbor_shell_list(statoms, dx, neighbor_number=1,
-                                          mic=True, radius=radius, span=span)
-            if unique:
-                for i in range(len(nbslist)):
-                    nbsids = nbslist[i]
-                    tmpids = self.get_unique_sites(unique_composition, unique_subsurf,
-                                                   return_site_indices=True,
-                                                   site_list=[sl[ni] for ni in nbsids])
-                    nbsids = [nbsids[j] for j in tmpids]
-                    nbslist[i] = nbsids
-        else:
-            D = statoms.get_all_distances(mic=True)
-            nbslist = {}
-            for i, row in enumerate(D):
-                argsort = np.argsort(row)
-                row = row[argsort]
-                res = np.split(argsort, np.where(np.abs(np.diff(row)) > dx)[0] + 1)
-                if span:
-                    nbsids = sorted([n for nn in range(1, neighbor_number + 1) 
-                                     for n in list(res[nn])])
-                else:
-                    nbsids = sorted(res[neighbor_number])
-                if unique:
-                    tmpids = self.get_unique_sites(unique_composition, unique_subsurf,
-                                                   return_site_indices=True, 
-                                                   site_list=[sl[ni] for ni in nbsids])
-                    nbsids = [nbsids[j] for j in tmpids]
-                nbslist[i] = nbsids
-
-        return nbslist
-
-    def update(self, atoms, full_update=False):
-        """Update the position of each adsorption site given an updated
-        atoms object. Please only use this when the indexing of the atoms 
+        return _get_neighbor_site_list(self, True, dx, neighbor_number, radius,
+                                       span, unique, unique_composition, 
+                                       unique_subsurf)
+
+    def update(self, atoms, full_update=False, update_composition=False,
+               normal_tol=.05):
+        """Update the adsorption sites in place given an updated atoms 
+        object. Please only use this when the indexing of the atoms 
         object is preserved. Useful for updating adsorption sites e.g. 
         after geometry optimization.
         
@@ -2826,35 +4420,103 @@ class SlabAdsorptionSites(object):
             The updated atoms object. 
 
         full_update : bool, default False
-            Whether to update the normal vectors and composition as well.
-            Useful when the composition of the alloy surface is not fixed.
+            Whether to identify the adsorption sites from scratch.
+            Useful when the surface has reconstructed.
+
+        update_composition : bool, default False
+            Whether to update the compositions, the subsurface elements 
+            and the labels of the sites that involve atoms with changed 
+            elements. Useful when the composition of the alloy surface 
+            is not fixed.
+
+        normal_tol : float, default 0.05
+            The normal vector of a site is only updated if an atom of
+            the site moved by more than this distance (in Angstrom).
+            The normal vectors are not recomputed as in the site search 
+            but only approximated, by rotating them with the rotation 
+            of the bonds around the atoms of the site. They can hence 
+            differ from those of a new site object by about the tilt 
+            of the bonds (e.g. by ~0.03 after moving the atoms by 
+            ~0.03 Angstrom). Use full_update=True to recompute them.
 
         """
 
-        sl = self.site_list
-        new_slab = atoms[[a.index for a in atoms if 
+        new_slab = atoms[[a.index for a in atoms if 'a' in 
+                          reference_states[a.number] and 
                           a.symbol not in adsorbate_elements]]
-        if full_update:                                                                       
-            nsas = SlabAdsorptionSites(new_slab, surface=self.surface,                         
-                                       allow_6fold=self.allow_6fold,
-                                       composition_effect=self.composition_effect, 
-                                       both_sides=self.both_sides,
-                                       ignore_bridge_sites=self.ignore_bridge_sites,
-                                       label_sites=self.label_sites,
-                                       surrogate_metal=self.surrogate_metal,
-                                       optimize_surrogate_cell=self.optimize_surrogate_cell,
-                                       tol=self.tol)
-            sl = nsas.site_list
+        if full_update:
+            nsas = self._rebuild(new_slab, self.reuse_geometry, 
+                                 self.cache_dir)
+            self.__dict__ = nsas.__dict__
+            return
+
+        new_slab.cell = self.cell
+        dvecs, _ = find_mic(new_slab.positions - self.positions,
+                            self.cell, self.pbc)
+        A = self.adj_matrix.tocsr()
+        _update_sites(self, new_slab, dvecs, lambda i: 
+                      A.indices[A.indptr[i]:A.indptr[i+1]],
+                      update_composition, normal_tol)
+
+    def _rebuild(self, atoms, reuse_geometry=False, cache_dir=None):
+        # Identify the sites of an atoms object with the same settings
+        return SlabAdsorptionSites(atoms, surface=self.surface,                         
+                                   allow_6fold=self.allow_6fold,
+                                   composition_effect=self.composition_effect, 
+                                   both_sides=self.both_sides,
+                                   ignore_bridge_sites=self.ignore_bridge_sites,
+                                   label_sites=self.label_sites,
+                                   surrogate_metal=self.surrogate_metal,
+                                   optimize_surrogate_cell=self.optimize_surrogate_cell,
+                                   tol=self.tol, reuse_geometry=reuse_geometry,
+                                   cache_dir=cache_dir,
+                                   use_template=self.use_template,
+                                   neighbor_list=self.neighbor_list,
+                                   _allow_expand=self._allow_expand)
 
-        else:
-            dvecs, _ = find_mic(new_slab.positions - self.positions,
-                                self.cell, self.pbc)
-            nsl = deepcopy(sl)
-            for st in nsl:
-                si = list(st['indices'])
-                st['position'] += np.average(dvecs[si], 0) 
-            sl = nsl
+    def save(self, filename):
+        """Save the adsorption sites to a compressed npz file, which 
+        can be loaded by SlabAdsorptionSites.load without repeating the 
+        site identification. The neighbor list is not saved.
 
+        Parameters
+        ----------
+        filename : str
+            The name of the npz file.
+
+        """
+
+        _save_sites(self, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """Load the adsorption sites saved by SlabAdsorptionSites.save. 
+        The neighbor list is rebuilt on first use.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the npz file.
+
+        """
+
+        sas = cls.__new__(cls)
+        sas.reuse_geometry = False
+        sas.cache_dir = None
+        sas.use_template = True
+        sas.neighbor_list = None
+        _load_sites(sas, filename)
+
+        return sas
+
+    def __getattr__(self, name):
+        # The neighbor list is not saved or pickled, rebuild it on 
+        # first use
+        if name == 'nblist' and 'ref_atoms' in self.__dict__:
+            self.make_neighbor_list()
+            return self.nblist
+        raise AttributeError('{!r} object has no attribute {!r}'.format(
+                             type(self).__name__, name))
 
 def get_adsorption_site(atoms, indices, surface=None, 
                         return_index=False, **kwargs):
@@ -2993,3 +4655,143 @@ def enumerate_adsorption_sites(atoms, surface=None,
                          s['morphology'] == morphology]       
 
     return all_sites
+
+
+# The function and the arguments of the batch tasks of a worker process
+_batch_task = None
+
+
+def _init_batch_worker(func, args):
+    global _batch_task
+    _batch_task = (func, args)
+
+
+def _run_batch_task(atoms):
+    func, args = _batch_task
+    return func(atoms, *args)
+
+
+def _imap_images(func, images, args=(), n_jobs=None, chunksize=1):
+    """Apply func(atoms, *args) to each structure in a pool of n_jobs
+    processes and yield the results in the order of the structures as 
+    they complete. The arguments are sent to each worker only once. 
+    The structures can be an iterable of atoms objects or the name of 
+    a trajectory file."""
+
+    if isinstance(images, str):
+        from ase.io import iread
+        images = iread(images, index=':')
+    if n_jobs is None:
+        n_jobs = os.cpu_count()
+    if n_jobs == 1:
+        for atoms in images:
+            yield func(atoms, *args)
+        return
+
+    from multiprocessing import Pool
+    with Pool(n_jobs, initializer=_init_batch_worker, 
+              initargs=(func, args)) as pool:
+        for result in pool.imap(_run_batch_task, images, chunksize):
+            yield result
+
+
+def _get_batch_sites(atoms, surface, morphology, kwargs, skeletons):
+    # Seed the geometry cache of the worker with the shared skeletons
+    for key, skeleton in skeletons.items():
+        if key not in _skeletons:
+            _store_skeleton(key, skeleton)
+    sites = enumerate_adsorption_sites(atoms, surface, morphology, **kwargs)
+
+    return SiteList.from_sites(sites)
+
+
+def enumerate_adsorption_sites_batch(images, surface=None, morphology=None,
+                                     n_jobs=None, chunksize=1, 
+                                     share_geometry=False, **kwargs):
+    """A generator that enumerates all adsorption sites of many 
+    structures in parallel. The structures are distributed over a 
+    process pool, and the sites of each structure are yielded in the 
+    order of the input structures as soon as they are identified. 
+    The sites of each structure are returned as a SiteList of views of
+    one compact SiteTable (available as its table attribute).
+    Accepts the same arguments as enumerate_adsorption_sites.
+
+    Parameters
+    ----------
+    images : list of ase.Atoms objects or str
+        The structures, or the name of a trajectory file.
+
+    surface : str, default None
+        The surface type (crystal structure + Miller indices).
+        If the structures are periodic surface slabs, this is required.
+        If the structures are nanoparticles, the function enumerates
+        only the sites on the specified surface.
+
+    morphology : str, default None
+        The function enumerates only the sites of the specified 
+        local surface morphology. Only available for surface slabs.
+
+    n_jobs : int, default None
+        The number of worker processes. Use all CPUs if not specified.
+        Set n_jobs=1 to enumerate the sites in the current process.
+
+    chunksize : int, default 1
+        The number of structures sent to a worker at a time.
+
+    share_geometry : bool, default False
+        Whether to identify the sites of the first structure in the 
+        current process with reuse_geometry=True and send its cached 
+        geometric skeleton to every worker. The sites of the other 
+        structures with the same geometry, e.g. different chemical 
+        orderings of the same nanoparticle, are then obtained by only
+        updating the compositions. Use the cache_dir argument of the 
+        site classes to share the identified sites of identical 
+        structures across workers and jobs.
+
+    Example
+    -------
+    This is an example of enumerating the sites of 100 random chemical
+    orderings of a truncated octahedral nanoparticle in 4 processes:
+
+        >>> from acat.adsorption_sites import enumerate_adsorption_sites_batch
+        >>> from ase.cluster import Octahedron
+        >>> import numpy as np
+        >>> atoms = Octahedron('Ni', length=7, cutoff=2)
+        >>> atoms.center(vacuum=5.)
+        >>> images = []
+        >>> for i in range(100):
+        ...     image = atoms.copy()
+        ...     image.symbols = np.random.choice(['Ni', 'Pt'], len(atoms))
+        ...     images.append(image)
+        >>> all_sites = list(enumerate_adsorption_sites_batch(images, n_jobs=4,
+        ...                  share_geometry=True, composition_effect=True,
+        ...                  surrogate_metal='Ni'))
+        >>> print(len(all_sites), len(all_sites[0]))
+
+    Output:
+
+    .. code-block:: python
+
+        100 674
+
+    """
+
+    skeletons = {}
+    if share_geometry:
+        from ase.io import iread
+        kwargs = dict(kwargs, reuse_geometry=True)
+        images = iter(iread(images, index=':') if isinstance(images, str)
+                      else images)
+        first = next(images, None)
+        if first is None:
+            return
+        yield _get_batch_sites(first, surface, morphology, kwargs, skeletons)
+        # Only send the skeleton of the first structure, which is the 
+        # most recently used one, rather than the whole cache
+        if _skeletons:
+            key = next(reversed(_skeletons))
+            skeletons = {key: _skeletons[key]}
+
+    for sites in _imap_images(_get_batch_sites, images, (surface, morphology,
+                              kwargs, skeletons), n_jobs, chunksize):
+        yield sites
@@ -1,3 +1,28 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-from .action import *
+__all__ = ['add_adsorbate',
+           'add_adsorbate_to_site',
+           'add_adsorbate_to_label',
+           'remove_adsorbate_from_site',
+           'remove_adsorbates_from_sites',
+           'remove_adsorbates_too_close']
+
+import sys
+
+if sys.version_info < (3, 7):
+    # Module-level __getattr__ (PEP 562) needs Python 3.7, so the 
+    # actions are imported eagerly on Python 3.6
+    from .action import (add_adsorbate, add_adsorbate_to_site, 
+                         add_adsorbate_to_label, remove_adsorbate_from_site,
+                         remove_adsorbates_from_sites, 
+                         remove_adsorbates_too_close)
+
+
+def __getattr__(name):
+    # Import the actions on first use, so that importing a submodule
+    # does not load the adsorption site and coverage modules
+    if name in __all__:
+        from . import action
+        return getattr(action, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(
+                         __name__, name))
@@ -10,17 +10,17 @@ from ..adsorption_sites import (ClusterAdsorptionSites,
 from ..adsorbate_coverage import (ClusterAdsorbateCoverage, 
                                   SlabAdsorbateCoverage)
 from ..utilities import (get_mic, 
+                         get_mic_batch,
                          atoms_too_close_after_addition, 
+                         PeriodicHashGrid,
                          custom_warning, 
                          is_list_or_tuple, 
                          numbers_from_ratios)
 from .action import (add_adsorbate_to_site, 
                      remove_adsorbate_from_site)
 from ..ga.graph_comparators import WLGraphComparator
-from ase.io import read, write, Trajectory
 from ase.formula import Formula
 from ase.geometry import find_mic
-from scipy.spatial.distance import pdist, squareform
 from operator import attrgetter
 from copy import deepcopy
 import numpy as np
@@ -203,6 +203,23 @@ class RandomPatternGenerator(object):
                 self.adsorption_sites.get_neighbor_site_list(neighbor_number=1)
             self.site_nblist = \
             self.adsorption_sites.get_neighbor_site_list(neighbor_number=2)
+        self._hash_grid = None
+
+    def _adsorbate_too_close(self, n_added):
+        # Keep one hash grid of the adsorbate atoms for each structure, 
+        # so that adding another adsorbate only needs to query the grid
+        mic = (True in self.atoms.pbc)
+        if self._hash_grid is None:
+            is_ads = np.isin(self.atoms.symbols[:-n_added], adsorbate_elements)
+            self._hash_grid = PeriodicHashGrid.from_atoms(
+                self.atoms, np.flatnonzero(is_ads), mic=mic, 
+                bin_size=self.min_adsorbate_distance)
+        if atoms_too_close_after_addition(self.atoms, n_added, 
+        self.min_adsorbate_distance, mic=mic, hash_grid=self._hash_grid):
+            return True
+        self._hash_grid.insert(self.atoms.positions[-n_added:])
+
+        return False
 
     def _add_adsorbate(self, adsorption_sites):
         sas = adsorption_sites
@@ -339,10 +356,7 @@ class RandomPatternGenerator(object):
                                    + 'to another adsorbate. Addition failed!\n')
                 self.logfile.flush()
             return
-        ads_atoms = self.atoms[[a.index for a in self.atoms if                   
-                                a.symbol in adsorbate_elements]]
-        if atoms_too_close_after_addition(ads_atoms, len(list(Formula(adsorbate))), 
-        self.min_adsorbate_distance, mic=(True in self.atoms.pbc)):        
+        if self._adsorbate_too_close(len(list(Formula(adsorbate)))):
             if self.logfile is not None:
                 self.logfile.write('The added {} is too close '.format(adsorbate)
                                    + 'to another adsorbate. Addition failed!\n')
@@ -371,6 +385,7 @@ class RandomPatternGenerator(object):
         rmst = random.choice(occupied)
         rm_frag = rmst['fragment'] in self.adsorbate_species 
         remove_adsorbate_from_site(self.atoms, rmst, remove_fragment=rm_frag)
+        self._hash_grid = None
 
         ads_remain = [a for a in self.atoms if a.symbol in adsorbate_elements]
         if not ads_remain:
@@ -416,6 +431,7 @@ class RandomPatternGenerator(object):
         adsorbate = rmst['adsorbate']
         rm_frag = rmst['fragment'] in self.adsorbate_species 
         remove_adsorbate_from_site(self.atoms, rmst, remove_fragment=rm_frag)
+        self._hash_grid = None
 
         nbstids, selfids = [], []
         for j, st in enumerate(hsl):
@@ -520,10 +536,7 @@ class RandomPatternGenerator(object):
                                    + 'close to another adsorbate. Move failed!\n')
                 self.logfile.flush()
             return
-        ads_atoms = self.atoms[[a.index for a in self.atoms if                   
-                                a.symbol in adsorbate_elements]]
-        if atoms_too_close_after_addition(ads_atoms, len(list(Formula(adsorbate))), 
-        self.min_adsorbate_distance, mic=(True in self.atoms.pbc)):
+        if self._adsorbate_too_close(len(list(Formula(adsorbate)))):
             if self.logfile is not None:
                 self.logfile.write('The new position of {} is too '.format(adsorbate)
                                    + 'close to another adsorbate. Move failed!\n')
@@ -554,6 +567,7 @@ class RandomPatternGenerator(object):
         rpst = hsl[rpsti]
         rm_frag = rpst['fragment'] in self.adsorbate_species 
         remove_adsorbate_from_site(self.atoms, rpst, remove_fragment=rm_frag)
+        self._hash_grid = None
 
         # Select a different adsorbate with probability 
         old_adsorbate = rpst['adsorbate']
@@ -660,10 +674,7 @@ class RandomPatternGenerator(object):
                                    + 'to another adsorbate. Replacement failed!\n')
                 self.logfile.flush()
             return
-        ads_atoms = self.atoms[[a.index for a in self.atoms if                   
-                                a.symbol in adsorbate_elements]]
-        if atoms_too_close_after_addition(ads_atoms, len(list(Formula(adsorbate))), 
-        self.min_adsorbate_distance, mic=(True in self.atoms.pbc)):
+        if self._adsorbate_too_close(len(list(Formula(adsorbate)))):
             if self.logfile is not None:
                 self.logfile.write('The added {} is too close '.format(adsorbate)
                                    + 'to another adsorbate. Replacement failed!\n')
@@ -731,6 +742,7 @@ class RandomPatternGenerator(object):
 
         """
  
+        from ase.io import read, Trajectory
         mode = 'a' if self.append_trajectory else 'w'
         self.traj = Trajectory(self.trajectory, mode=mode)
         actions = action if is_list_or_tuple(action) else [action]
@@ -798,6 +810,7 @@ class RandomPatternGenerator(object):
             else: 
                 self.atoms = random.choices(k=1, population=self.images, 
                                             weights=self.image_probabilities)[0].copy()
+            self._hash_grid = None
             self.n_image = n_new 
 
             if self.adsorption_sites is not None:
@@ -1101,6 +1114,11 @@ class SystematicPatternGenerator(object):
                     binbids.append(binbis)
                 newsites.append(s)
 
+        # The adsorbate atoms are the same for all attempts
+        ads_grid = PeriodicHashGrid.from_atoms(atoms, np.isin(atoms.symbols,
+                                               adsorbate_elements), mic=(True in 
+                                               atoms.pbc), bin_size=
+                                               self.min_adsorbate_distance)
         for k, nst in enumerate(newsites):
             for adsorbate in adsorbate_species:
                 if self.species_forbidden_labels is not None:
@@ -1169,10 +1187,9 @@ class SystematicPatternGenerator(object):
                     if any(s for i, s in enumerate(nhsl) if s['occupied'] and (i in 
                     neighbor_site_indices)):
                         continue
-                    ads_atoms = final_atoms[[a.index for a in final_atoms if                   
-                                             a.symbol in adsorbate_elements]]
-                    if atoms_too_close_after_addition(ads_atoms, len(list(Formula(
-                    adsorbate))), self.min_adsorbate_distance, mic=(True in final_atoms.pbc)):
+                    if atoms_too_close_after_addition(final_atoms, len(list(Formula(
+                    adsorbate))), self.min_adsorbate_distance, mic=(True in final_atoms.pbc),
+                    hash_grid=ads_grid):
                         continue
 
                     self.act_count += 1
@@ -1350,6 +1367,10 @@ class SystematicPatternGenerator(object):
             test_atoms = atoms.copy()
             rm_frag = st['fragment'] in self.adsorbate_species
             remove_adsorbate_from_site(test_atoms, st, remove_fragment=rm_frag)
+            ads_grid = PeriodicHashGrid.from_atoms(test_atoms, np.isin(
+                                                   test_atoms.symbols, adsorbate_elements), 
+                                                   mic=(True in test_atoms.pbc), bin_size=
+                                                   self.min_adsorbate_distance)
 
             adsorbate = st['adsorbate']
             if adsorbate in self.multidentate_adsorbates:
@@ -1438,10 +1459,9 @@ class SystematicPatternGenerator(object):
                     if any(s for i, s in enumerate(nhsl) if s['occupied'] and (i in 
                     neighbor_site_indices)):
                         continue
-                    ads_atoms = final_atoms[[a.index for a in final_atoms if                   
-                                             a.symbol in adsorbate_elements]]
-                    if atoms_too_close_after_addition(ads_atoms, len(list(Formula(adsorbate))),
-                    self.min_adsorbate_distance, mic=(True in final_atoms.pbc)):
+                    if atoms_too_close_after_addition(final_atoms, len(list(Formula(adsorbate))),
+                    self.min_adsorbate_distance, mic=(True in final_atoms.pbc), 
+                    hash_grid=ads_grid):
                         continue                                                                                   
 
                     self.act_count += 1
@@ -1520,6 +1540,10 @@ class SystematicPatternGenerator(object):
             test_atoms = atoms.copy()
             rm_frag = rpst['fragment'] in self.adsorbate_species  
             remove_adsorbate_from_site(test_atoms, rpst, remove_fragment=rm_frag)
+            ads_grid = PeriodicHashGrid.from_atoms(test_atoms, np.isin(
+                                                   test_atoms.symbols, adsorbate_elements), 
+                                                   mic=(True in test_atoms.pbc), bin_size=
+                                                   self.min_adsorbate_distance)
                                                                                              
             # Select a different adsorbate with probability 
             old_adsorbate = rpst['adsorbate']
@@ -1621,10 +1645,9 @@ class SystematicPatternGenerator(object):
                     if any(s for i, s in enumerate(nhsl) if s['occupied'] and (i in 
                     neighbor_site_indices)):
                         continue
-                    ads_atoms = final_atoms[[a.index for a in final_atoms if                   
-                                             a.symbol in adsorbate_elements]]
-                    if atoms_too_close_after_addition(ads_atoms, len(list(Formula(adsorbate))),  
-                    self.min_adsorbate_distance, mic=(True in final_atoms.pbc)):
+                    if atoms_too_close_after_addition(final_atoms, len(list(Formula(adsorbate))),
+                    self.min_adsorbate_distance, mic=(True in final_atoms.pbc), 
+                    hash_grid=ads_grid):
                         continue
 
                     self.act_count += 1
@@ -1724,6 +1747,7 @@ class SystematicPatternGenerator(object):
 
         """
 
+        from ase.io import read, Trajectory
         mode = 'a' if self.append_trajectory else 'w'
         self.traj = Trajectory(self.trajectory, mode=mode)          
         self.max_gen_per_image = max_gen_per_image
@@ -2042,15 +2066,12 @@ class OrderedPatternGenerator(object):
         pts = np.asarray([s['position'] for s in sl])
         pt0 = np.mean(pts, axis=0)
 
-        def get_signed_distance(pt):
-            v = get_mic(pt, pt0, cell=atoms.cell, pbc=atoms.pbc)[:2]
-            cross = u[0] * v[1] - u[1] * v[0]
-            dist = abs(cross) / np.linalg.norm(u)
-            sign = (cross >= 0).astype(np.float32) - (cross < 0).astype(np.float32)
-            return sign * dist
-
-        sorted_indices = sorted(range(len(sl)), key=lambda x: 
-                                get_signed_distance(sl[x]['position']))
+        # Signed distances of all sites to the line along u through pt0
+        vs = get_mic_batch(pts, pt0, cell=atoms.cell, pbc=atoms.pbc)[:,:2]
+        crosses = u[0] * vs[:,1] - u[1] * vs[:,0]
+        dists = np.abs(crosses) / np.linalg.norm(u)
+        signed_dists = np.where(crosses >= 0, dists, -dists)
+        sorted_indices = np.argsort(signed_dists, kind='stable').tolist()
         i1 = 0
         for i in sorted_indices:
             st = sl[i]
@@ -2140,6 +2161,7 @@ class OrderedPatternGenerator(object):
 
         """
 
+        from ase.io import read, Trajectory
         traj_mode = 'a' if self.append_trajectory else 'w'
         traj = Trajectory(self.trajectory, mode=traj_mode)
         sas = self.adsorption_sites
@@ -2351,7 +2373,7 @@ def special_coverage_pattern(atoms, adsorbate_species,
             elif coverage == 3/4:
                 fcc_sites = [s for s in site_list if s['site'] == 'fcc']
                 if True not in atoms.pbc:                                
-                    grouped_sites = group_sites_by_facet(atoms, fcc_sites, site_list)
+                    grouped_sites = group_sites_by_facet(atoms, fcc_sites, sas)
                 else:
                     grouped_sites = {'pbc_sites': fcc_sites}
 
@@ -2391,7 +2413,7 @@ def special_coverage_pattern(atoms, adsorbate_species,
                 hcp_sites = [s for s in site_list if s['site'] == 'hcp']
                 all_sites = fcc_sites + hcp_sites
                 if True not in atoms.pbc:    
-                    grouped_sites = group_sites_by_facet(atoms, all_sites, site_list)
+                    grouped_sites = group_sites_by_facet(atoms, all_sites, sas)
                 else:
                     grouped_sites = {'pbc_sites': all_sites}
                 for sites in grouped_sites.values():
@@ -2433,7 +2455,7 @@ def special_coverage_pattern(atoms, adsorbate_species,
             elif coverage == 1/4:
                 fcc_sites = [s for s in site_list if s['site'] == 'fcc']                                                                 
                 if True not in atoms.pbc:                                
-                    grouped_sites = group_sites_by_facet(atoms, fcc_sites, site_list)
+                    grouped_sites = group_sites_by_facet(atoms, fcc_sites, sas)
                 else:
                     grouped_sites = {'pbc_sites': fcc_sites}
  
@@ -2482,7 +2504,7 @@ def special_coverage_pattern(atoms, adsorbate_species,
             elif coverage == 3/4:
                 fold4_sites = [s for s in site_list if s['site'] == '4fold']
                 if True not in atoms.pbc:                                           
-                    grouped_sites = group_sites_by_facet(atoms, fold4_sites, site_list)
+                    grouped_sites = group_sites_by_facet(atoms, fold4_sites, sas)
                 else:
                     grouped_sites = {'pbc_sites': fold4_sites}
                 for sites in grouped_sites.values():
@@ -2521,7 +2543,7 @@ def special_coverage_pattern(atoms, adsorbate_species,
                 fold4_sites = [s for s in site_list if s['site'] == '4fold']
                 original_sites = deepcopy(fold4_sites)
                 if True not in atoms.pbc:
-                    grouped_sites = group_sites_by_facet(atoms, fold4_sites, site_list)
+                    grouped_sites = group_sites_by_facet(atoms, fold4_sites, sas)
                 else:
                     grouped_sites = {'pbc_sites': fold4_sites}
                 for sites in grouped_sites.values():
@@ -2550,7 +2572,7 @@ def special_coverage_pattern(atoms, adsorbate_species,
             elif coverage == 1/4:
                 fold4_sites = [s for s in site_list if s['site'] == '4fold']
                 if True not in atoms.pbc:                                           
-                    grouped_sites = group_sites_by_facet(atoms, fold4_sites, site_list)
+                    grouped_sites = group_sites_by_facet(atoms, fold4_sites, sas)
                 else:
                     grouped_sites = {'pbc_sites': fold4_sites}
 
@@ -2723,8 +2745,11 @@ def special_coverage_pattern(atoms, adsorbate_species,
                     if max(share) == 0 and too_close == 0:
                         final_sites.append(esite)
 
-    natoms = len(atoms)
     nads_dict = {ads: len(list(Formula(ads))) for ads in adsorbate_species}
+    # Hash grid of the newly added adsorbate atoms
+    ads_grid = PeriodicHashGrid(atoms.cell if True in atoms.pbc else None,
+                                pbc=(True in atoms.pbc), 
+                                bin_size=min_adsorbate_distance)
 
     for site in final_sites:
         # Select adsorbate with probability 
@@ -2739,9 +2764,11 @@ def special_coverage_pattern(atoms, adsorbate_species,
             height = site_heights[site['site']]
         add_adsorbate_to_site(atoms, adsorbate, site, height)       
         if min_adsorbate_distance > 0:
-            if atoms_too_close_after_addition(atoms[natoms:], nads,
-            min_adsorbate_distance, mic=(True in atoms.pbc)): 
+            if atoms_too_close_after_addition(atoms, nads,
+            min_adsorbate_distance, mic=(True in atoms.pbc), hash_grid=ads_grid):
                 atoms = atoms[:-nads]
+            else:
+                ads_grid.insert(atoms.positions[-nads:])
 
     return atoms
 
@@ -2844,6 +2871,7 @@ def max_dist_coverage_pattern(atoms, adsorbate_species,
         D = np.asarray([find_mic(points - np.tile(points[i], (len(points),1)), 
                         cell=atoms.cell, pbc=True)[1] for i in range(len(points))])
     else:
+        from scipy.spatial.distance import pdist, squareform
         D = squareform(pdist(points))
 
     # K-medoids clustering (PAM algorithm)
@@ -2957,8 +2985,11 @@ def min_dist_coverage_pattern(atoms, adsorbate_species,
         site_list = [s for s in site_list if s['site'] in site_types]
 
     random.shuffle(site_list)
-    natoms = len(atoms)
     nads_dict = {ads: len(list(Formula(ads))) for ads in adsorbate_species}
+    # Hash grid of the newly added adsorbate atoms
+    ads_grid = PeriodicHashGrid(atoms.cell if True in atoms.pbc else None,
+                                pbc=(True in atoms.pbc), 
+                                bin_size=min_adsorbate_distance)
 
     if site_preference is not None:
         if not is_list_or_tuple(site_preference):
@@ -2980,8 +3011,10 @@ def min_dist_coverage_pattern(atoms, adsorbate_species,
         height = heights[st['site']]
         add_adsorbate_to_site(atoms, adsorbate, st, height)       
         if min_adsorbate_distance > 0:
-            if atoms_too_close_after_addition(atoms[natoms:], nads,
-            min_adsorbate_distance, mic=(True in atoms.pbc)):
-                atoms = atoms[:-nads]                               
+            if atoms_too_close_after_addition(atoms, nads,
+            min_adsorbate_distance, mic=(True in atoms.pbc), hash_grid=ads_grid):
+                atoms = atoms[:-nads]
+            else:
+                ads_grid.insert(atoms.positions[-nads:])
 
     return atoms
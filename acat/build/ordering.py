@@ -6,11 +6,8 @@ from ..utilities import (get_mic,
                          is_list_or_tuple)
 from ..ga.graph_comparators import WLGraphComparator
 from ase.geometry import get_distances, find_mic, get_layers
-from ase.io import read, write, Trajectory
 from collections import defaultdict
 from itertools import product
-from networkx.algorithms.components.connected import connected_components
-import networkx as nx
 import numpy as np
 import random
 import math
@@ -380,6 +377,7 @@ class SymmetricClusterOrderingGenerator(object):
 
         """
 
+        from ase.io import Trajectory
         traj_mode = 'a' if self.append_trajectory else 'w'
         traj = Trajectory(self.trajectory, mode=traj_mode)
         atoms = self.atoms.copy()
@@ -806,11 +804,12 @@ class SymmetricSlabOrderingGenerator(object):
             for current in it:
                 yield last, current
                 last = current    
+        import networkx as nx
         G = nx.Graph()
         for p in pairs:
             G.add_nodes_from(p)
             G.add_edges_from(to_edges(p))
-        groups = [list(cc) for cc in list(connected_components(G))]
+        groups = [list(cc) for cc in list(nx.connected_components(G))]
         uni = {i for group in groups for i in group}
         addition = [[i] for i in set(range(len(atoms))) - uni]
         groups += addition
@@ -864,6 +863,7 @@ class SymmetricSlabOrderingGenerator(object):
 
         """
 
+        from ase.io import Trajectory
         traj_mode = 'a' if self.append_trajectory else 'w'
         traj = Trajectory(self.trajectory, mode=traj_mode)
         atoms = self.atoms.copy()
@@ -1145,6 +1145,7 @@ class RandomOrderingGenerator(object):
 
         """
 
+        from ase.io import Trajectory
         traj_mode = 'a' if self.append_trajectory else 'w'
         traj = Trajectory(self.trajectory, mode=traj_mode)
         atoms = self.atoms
@@ -6,7 +6,8 @@ from ..settings import (adsorbate_elements,
                         site_heights)
 from ..utilities import (custom_warning, 
                          is_list_or_tuple, 
-                         atoms_too_close_after_addition)
+                         atoms_too_close_after_addition,
+                         PeriodicHashGrid)
 from ..adsorption_sites import (ClusterAdsorptionSites, 
                                 SlabAdsorptionSites)
 from ..adsorbate_coverage import (ClusterAdsorbateCoverage, 
@@ -96,6 +97,9 @@ class AdsorbateOperator(OffspringCreator):
             adsorbate_species = self.adsorbate_species
         elif not is_list_or_tuple(adsorbate_species): 
             adsorbate_species = [adsorbate_species]
+        ads_grid = PeriodicHashGrid.from_atoms(atoms, np.isin(atoms.symbols, 
+                                               adsorbate_elements), 
+                                               bin_size=min_adsorbate_distance)
         i = 0
         too_close = True
         while too_close:
@@ -124,10 +128,8 @@ class AdsorbateOperator(OffspringCreator):
                                   tilt_angle=tilt_angle)
 
             nads = len(list(Formula(adsorbate)))
-            ads_atoms = atoms[[a.index for a in atoms if 
-                               a.symbol in adsorbate_elements]]
-            if atoms_too_close_after_addition(ads_atoms, nads, 
-            cutoff=min_adsorbate_distance):
+            if atoms_too_close_after_addition(atoms, nads, 
+            cutoff=min_adsorbate_distance, hash_grid=ads_grid):
                 atoms = atoms[:-nads]
                 i += 1
                 continue    
@@ -1396,6 +1398,8 @@ class CutSpliceCrossoverWithAdsorbates(AdsorbateOperator):
         cas = ClusterAdsorptionSites(indi, **self.kwargs) 
 
         nori = len(indi) 
+        ads_grid = PeriodicHashGrid.from_atoms(indi, bin_size=
+                                               self.min_adsorbate_distance)
         for st in cas.site_list:
             si = st['indices']
             if si in adsi_dict:
@@ -1407,8 +1411,10 @@ class CutSpliceCrossoverWithAdsorbates(AdsorbateOperator):
                 # after each adsorbate addition
                 nads = len(adsi_dict[si]['fragment_indices'])
                 if atoms_too_close_after_addition(indi, nads,
-                self.min_adsorbate_distance, mic=False):
+                self.min_adsorbate_distance, mic=False, hash_grid=ads_grid):
                     indi = indi[:-nads]                               
+                else:
+                    ads_grid.insert(indi.positions[-nads:])
 
         # Add adsorbate if no adsorbate is present
         if len(indi) == nori:
@@ -1659,6 +1665,8 @@ class SimpleCutSpliceCrossoverWithAdsorbates(AdsorbateOperator):
                     adsi_dict[si]['fragment_indices'] = st['fragment_indices']        
 
         nori = len(indi) 
+        ads_grid = PeriodicHashGrid.from_atoms(indi, bin_size=
+                                               self.min_adsorbate_distance)
         for st in cas.site_list:
             si = st['indices']
             if si in adsi_dict:
@@ -1670,8 +1678,10 @@ class SimpleCutSpliceCrossoverWithAdsorbates(AdsorbateOperator):
                 # after each adsorbate addition
                 nads = len(adsi_dict[si]['fragment_indices'])
                 if atoms_too_close_after_addition(indi, nads,
-                self.min_adsorbate_distance, mic=False):
+                self.min_adsorbate_distance, mic=False, hash_grid=ads_grid):
                     indi = indi[:-nads]                               
+                else:
+                    ads_grid.insert(indi.positions[-nads:])
 
         # Add adsorbate if no adsorbate is present
         if len(indi) == nori:
@@ -1,12 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """Comparator objects based on graph theory."""
-from ..adsorbate_coverage import ClusterAdsorbateCoverage
-from ..adsorbate_coverage import SlabAdsorbateCoverage
-from ..utilities import neighbor_shell_list, get_adj_matrix
+from ..utilities import (neighbor_shell_list, get_adj_matrix,
+                         graph_from_adj_matrix)
 from ase.atoms import Atoms
 from copy import deepcopy
-import networkx as nx
 import numpy as np
 
 
@@ -64,6 +62,8 @@ class AdsorptionGraphComparator(object):
         self.comp = WLGraphComparator(hmax=self.hmax)
 
     def looks_like(self, a1, a2):
+        from ..adsorbate_coverage import (ClusterAdsorbateCoverage, 
+                                          SlabAdsorbateCoverage)
         isocheck = False
         if ('data' in a1.info and 'graph' in a1.info['data']) and (
         'data' in a2.info and 'graph' in a2.info['data']):
@@ -72,27 +72,29 @@ class AdsorptionGraphComparator(object):
             G2 = a2.info['data']['graph']
         else:
             sas = deepcopy(self.adsorption_sites)        
+            # An empty dictionary subtracts the default site heights
+            subtract_heights = {} if self.subtract_height else None
  
             if hasattr(sas, 'surface'):
                 sas.update(a1, update_composition=self.composition_effect)
-                sac1 = SlabAdsorbateCoverage(a1, sas, subtract_height=
-                                             self.subtract_height, 
+                sac1 = SlabAdsorbateCoverage(a1, sas, subtract_heights=
+                                             subtract_heights, 
                                              label_occupied_sites=True, 
                                              dmax=self.dmax)
                 sas.update(a2, update_composition=self.composition_effect)
-                sac2 = SlabAdsorbateCoverage(a2, sas, subtract_height=
-                                             self.subtract_height, 
+                sac2 = SlabAdsorbateCoverage(a2, sas, subtract_heights=
+                                             subtract_heights, 
                                              label_occupied_sites=True, 
                                              dmax=self.dmax)
             else:
                 sas.update(a1, update_composition=self.composition_effect)
-                sac1 = ClusterAdsorbateCoverage(a1, sas, subtract_height=
-                                                self.subtract_height, 
+                sac1 = ClusterAdsorbateCoverage(a1, sas, subtract_heights=
+                                                subtract_heights, 
                                                 label_occupied_sites=True,
                                                 dmax=self.dmax)
                 sas.update(a2, update_composition=self.composition_effect)
-                sac2 = ClusterAdsorbateCoverage(a2, sas, subtract_height=
-                                                self.subtract_height, 
+                sac2 = ClusterAdsorbateCoverage(a2, sas, subtract_heights=
+                                                subtract_heights, 
                                                 label_occupied_sites=True,
                                                 dmax=self.dmax)
             labs1 = sac1.get_occupied_labels(fragmentation=self.kwargs.get(
@@ -162,15 +164,16 @@ class WLGraphComparator(object):
 
     @classmethod
     def get_label_dict(cls, G, hmax, dx):                                                        
+        import networkx as nx
         d = {}
         if isinstance(G, Atoms):
             atoms = G.copy()
             symbols = atoms.symbols
             nblist = neighbor_shell_list(atoms, dx=dx, neighbor_number=1, 
                                          mic=(True in atoms.pbc))                     
-            A = get_adj_matrix(nblist)
-            N = len(A)
-            G = nx.from_numpy_matrix(A)
+            A = get_adj_matrix(nblist, sparse=True)
+            N = A.shape[0]
+            G = graph_from_adj_matrix(A)
         else:
             N = G.number_of_nodes()
             symbols = np.asarray([G.nodes[i]['symbol'] for i in range(N)], 
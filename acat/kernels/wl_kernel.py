@@ -1,11 +1,9 @@
-from acat.adsorbate_coverage import SlabAdsorbateCoverage
 from acat.utilities import (neighbor_shell_list, 
                             get_adj_matrix, 
+                            graph_from_adj_matrix,
                             hash_composition)
-from multiprocessing import Pool
 from itertools import chain, combinations
 from functools import partial
-import networkx as nx
 import numpy as np
 import os
 
@@ -69,6 +67,7 @@ class WL(object):
             images = list(train_images)
         else:
             images = list(train_images) + list(test_images)
+        from multiprocessing import Pool
         if dists is None:                                      
             pool = Pool(self.n_jobs)
             dicts = pool.map(self.get_dict, images)
@@ -136,17 +135,19 @@ class WL(object):
         return self.hp 
 
     def get_dict(self, atoms):
+        import networkx as nx
         d = {} 
         numbers = atoms.numbers
         if self.atom_wise:
             nblist = neighbor_shell_list(atoms, dx=self.dx, neighbor_number=1, 
                                          mic=(True in atoms.pbc))                      
-            A = get_adj_matrix(nblist)                                                     
+            A = get_adj_matrix(nblist, sparse=True)                                                     
         else:            
+            from acat.adsorbate_coverage import SlabAdsorbateCoverage
             sac = SlabAdsorbateCoverage(atoms, **self.kwargs)
             A = sac.get_graph(atom_wise=False, return_adj_matrix=True, 
                               full_effect=True, connect_dentates=True)                  
-        G = nx.from_numpy_matrix(A)
+        G = graph_from_adj_matrix(A)
 
         if 't' in self.hp:
             t = self.hp['t']
@@ -155,7 +156,7 @@ class WL(object):
 
         nnlabs, neighbors, lpd = {}, {}, {}
         isolates = []
-        for i in range(len(A)):
+        for i in range(A.shape[0]):
             lab0 = str(numbers[i])
             if lab0 in d:
                 d[lab0] += 1.
@@ -172,7 +173,7 @@ class WL(object):
                 if self.connect_nn:
                     nnhood = np.asarray([i] + nns)
                     An = A[nnhood,:][:,nnhood]
-                    Gn = nx.from_numpy_matrix(An)
+                    Gn = graph_from_adj_matrix(An)
                     # An algorithm to find the lexicographically minimum 
                     # longest path starts from node and ends at a neighbor
                     maxlen = 0
@@ -205,7 +206,7 @@ class WL(object):
         if t > 1: 
             for k in range(1, t):
                 nnnlabs = {}
-                for i in range(len(A)):
+                for i in range(A.shape[0]):
                     if i in isolates:
                         continue
                     nnlab = nnlabs[i]
@@ -245,6 +246,7 @@ class WL(object):
             Can be given the distance matrix to avoid recaulcating it. 
         """
         assert not self.normalize
+        from multiprocessing import Pool
         hp_deriv = {}
         if 'length' in hp:
             if dists is None:                                      
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from itertools import product 
+from functools import lru_cache
 
 # Use this label dictionary when site compostion is 
 # not considered. Useful for monometallic clusters.
@@ -1153,25 +1154,145 @@ def get_multimetallic_slab_labels(surface, metals):
     return d
 
 
-def get_cluster_signature_from_label(label, composition_effect=False, metals=[]):
-    if not composition_effect:
-        label_dict = get_monometallic_cluster_labels()
+class LabelRegistry(object):
+    """Bidirectional map between the site signatures (e.g. 
+    'ontop|terrace|Pt') and the numerical labels of one label 
+    dictionary, with integer-coded signatures. Use get_label_registry
+    to get the registry of a surface, which is built only once and 
+    shared by all adsorption site and adsorbate coverage objects. The 
+    registry should therefore not be modified.
+
+    Parameters
+    ----------
+    label_dict : dict
+        The label dictionary that maps each signature to its label.
+
+    """
+
+    def __init__(self, label_dict, key=None):
+        self.label_dict = label_dict
+        self.signature_dict = {v: k for k, v in label_dict.items()}
+        self.signatures = list(label_dict.keys())
+        self.code_dict = {sig: i for i, sig in enumerate(self.signatures)}
+        self._key = key
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def get_label(self, signature):
+        """Get the numerical label of a signature.
+
+        Parameters
+        ----------
+        signature : str or list of strs
+            The signature, either joined by '|' or as a list of the 
+            site type, the surface (or morphology) and the composition.
+
+        """
+
+        if not isinstance(signature, str):
+            signature = '|'.join(signature)
+
+        return self.label_dict[signature]
+
+    def get_signature(self, label):
+        """Get the signature (joined by '|') of a numerical label.
+
+        Parameters
+        ----------
+        label : int or str
+            The numerical label.
+
+        """
+
+        return self.signature_dict[int(label)]
+
+    def encode(self, signature):
+        """Get the integer code (0, 1, 2, ...) of a signature. The codes
+        are contiguous and can be used to index arrays."""
+
+        if not isinstance(signature, str):
+            signature = '|'.join(signature)
+
+        return self.code_dict[signature]
+
+    def decode(self, code):
+        """Get the signature of an integer code."""
+
+        return self.signatures[code]
+
+    # Copies share the cached registry
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        if self._key is None:
+            return (LabelRegistry, (self.label_dict,))
+
+        return (_get_label_registry, self._key)
+
+
+def get_label_registry(surface=None, metals=None, composition_effect=False):
+    """Get the label registry of the labels used by the adsorption sites 
+    of a nanoparticle (surface=None) or a surface slab. The registry is
+    memoized per (surface, metals, composition_effect).
+
+    Parameters
+    ----------
+    surface : str, default None
+        The surface type, e.g. 'fcc111'. None for nanoparticles.
+
+    metals : list of strs, default None
+        The metal elements in the order of the label dictionary. Only
+        required if composition_effect=True. A single metal is treated
+        as a bimetallic of the same element.
+
+    composition_effect : bool, default False
+        Whether the labels consider the site composition.
+
+    """
+
+    if composition_effect:
+        metals = tuple(metals)
+        if len(metals) == 1:
+            metals *= 2
     else:
-        if len(metals) <= 2:
-            label_dict = get_bimetallic_cluster_labels(metals)
-        else:
-            label_dict = get_multimetallic_cluser_labels(metals)
+        metals = ()
 
-    return list(label_dict.keys())[list(label_dict.values()).index(int(label))]
+    return _get_label_registry(surface, metals, bool(composition_effect))
 
 
-def get_slab_signature_from_label(label, surface, composition_effect=False, metals=[]):
+@lru_cache(maxsize=None)
+def _get_label_registry(surface, metals, composition_effect):
     if not composition_effect:
-        label_dict = get_monometallic_slab_labels(surface)
-    else:
-        if len(metals) <= 2:
+        if surface is None:
+            label_dict = get_monometallic_cluster_labels()
+        else:
+            label_dict = get_monometallic_slab_labels(surface)
+    elif len(metals) <= 2:
+        if surface is None:
+            label_dict = get_bimetallic_cluster_labels(metals)
+        else:
             label_dict = get_bimetallic_slab_labels(surface, metals)
+    else:
+        if surface is None:
+            label_dict = get_multimetallic_cluster_labels(metals)
         else:
             label_dict = get_multimetallic_slab_labels(surface, metals)
 
-    return list(label_dict.keys())[list(label_dict.values()).index(int(label))]
+    return LabelRegistry(label_dict, key=(surface, metals, composition_effect))
+
+
+def get_cluster_signature_from_label(label, composition_effect=False, metals=[]):
+    registry = get_label_registry(None, metals, composition_effect)
+
+    return registry.get_signature(label)
+
+
+def get_slab_signature_from_label(label, surface, composition_effect=False, metals=[]):
+    registry = get_label_registry(surface, metals, composition_effect)
+
+    return registry.get_signature(label)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Opt-in stage-level profiling of ACAT. The profiler records the wall
+time, the number of calls and the peak memory allocation of each named
+stage, e.g. the common neighbor analysis or the Delaunay triangulation
+in the identification of adsorption sites.
+
+Profiling is disabled by default, in which case an instrumented stage
+only costs one global lookup. Enable it with the context manager
+
+    >>> from acat.profiling import Profiler
+    >>> from acat.adsorption_sites import SlabAdsorptionSites
+    >>> with Profiler() as prof:
+    ...     sas = SlabAdsorptionSites(atoms, surface='fcc111')
+    >>> prof.get_stats()
+    >>> prof.write_json('profile.json')
+
+or switch it on and off globally with enable() and disable().
+
+"""
+from functools import wraps
+import tracemalloc
+import json
+import time
+
+
+_active_profiler = None
+
+
+class _NullStage(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_null_stage = _NullStage()
+
+
+class _Stage(object):
+
+    __slots__ = ('profiler', 'name', 't0', 'mem0', 'child_peak')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *args):
+        self.profiler._exit(self)
+        return False
+
+
+class Profiler(object):
+    """Profiler that records the wall time, the number of calls and the
+    peak memory allocation of each stage executed while it is active.
+    Can be used as a context manager or switched on and off by start
+    and stop. Only one profiler can be active at a time.
+
+    The peak memory is the maximum memory traced by tracemalloc during
+    a stage on top of the memory allocated when the stage is entered,
+    including the allocations of the nested stages. Tracing memory slows
+    down the code noticeably, so the wall times are more reliable with
+    trace_memory=False.
+
+    Parameters
+    ----------
+    trace_memory : bool, default True
+        Whether to record the peak memory allocation of each stage.
+
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stats = {}
+        self._stack = []
+        self._started_tracing = False
+
+    def start(self):
+        """Activate the profiler."""
+
+        global _active_profiler
+        if _active_profiler is not None and _active_profiler is not self:
+            raise ValueError('another profiler is already active')
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        _active_profiler = self
+
+        return self
+
+    def stop(self):
+        """Deactivate the profiler. The recorded statistics are kept."""
+
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._stack = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+        return False
+
+    def reset(self):
+        """Clear the recorded statistics."""
+
+        self.stats = {}
+
+    def _enter(self, stage):
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Hand over the peak so far to the enclosing stage before
+            # the peak is reset for this stage
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_peak = max(parent.child_peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'): # Python >= 3.9
+                tracemalloc.reset_peak()
+            stage.mem0 = current
+            stage.child_peak = 0
+        self._stack.append(stage)
+        stage.t0 = time.perf_counter()
+
+    def _exit(self, stage):
+        dt = time.perf_counter() - stage.t0
+        if self._stack and self._stack[-1] is stage:
+            self._stack.pop()
+        record = self.stats.setdefault(stage.name, {'calls': 0,
+                                                    'wall_time': 0.})
+        record['calls'] += 1
+        # Do not count the time of recursive calls twice
+        if not any(s.name == stage.name for s in self._stack):
+            record['wall_time'] += dt
+        if self.trace_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], stage.child_peak)
+            record['peak_memory'] = max(record.get('peak_memory', 0),
+                                        peak - stage.mem0)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_peak = max(parent.child_peak, peak)
+
+    def stage(self, name):
+        """Get a context manager that records a stage with a given name.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+
+        """
+
+        return _Stage(self, name)
+
+    def get_stats(self):
+        """Get the statistics of all recorded stages as a dictionary.
+        The wall time is given in seconds and the peak memory in bytes.
+        The stages are sorted by the total wall time in descending
+        order."""
+
+        stats = {}
+        for name, r in sorted(self.stats.items(), key=lambda x:
+                              x[1]['wall_time'], reverse=True):
+            stats[name] = dict(r, mean_wall_time=r['wall_time'] / r['calls'])
+
+        return stats
+
+    def write_json(self, filename):
+        """Write the statistics of all recorded stages to a JSON file.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the JSON file.
+
+        """
+
+        with open(filename, 'w') as f:
+            json.dump(self.get_stats(), f, indent=2)
+
+    def __repr__(self):
+        lines = ['{:<56} {:>6} {:>12} {:>12}'.format('stage', 'calls',
+                 'time (s)', 'peak (MiB)')]
+        for name, r in self.get_stats().items():
+            peak = r.get('peak_memory')
+            lines.append('{:<56} {:>6} {:>12.4f} {:>12}'.format(name,
+                         r['calls'], r['wall_time'], '-' if peak is None
+                         else '{:.2f}'.format(peak / 2**20)))
+
+        return '\n'.join(lines)
+
+
+def enable(trace_memory=True):
+    """Enable profiling globally and return the active profiler.
+
+    Parameters
+    ----------
+    trace_memory : bool, default True
+        Whether to record the peak memory allocation of each stage.
+
+    """
+
+    return Profiler(trace_memory=trace_memory).start()
+
+
+def disable():
+    """Disable profiling globally and return the profiler that was
+    active, if any."""
+
+    profiler = _active_profiler
+    if profiler is not None:
+        profiler.stop()
+
+    return profiler
+
+
+def get_profiler():
+    """Get the active profiler, or None if profiling is disabled."""
+
+    return _active_profiler
+
+
+def stage(name):
+    """Get a context manager that records a block of code as a named
+    stage of the active profiler. Does nothing if profiling is disabled.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage.
+
+    """
+
+    if _active_profiler is None:
+        return _null_stage
+
+    return _Stage(_active_profiler, name)
+
+
+def profiled(func):
+    """Decorator that records each call of a function or method as a
+    stage named after its qualified name. Calls the function directly
+    if profiling is disabled."""
+
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _active_profiler is None:
+            return func(*args, **kwargs)
+        with _Stage(_active_profiler, name):
+            return func(*args, **kwargs)
+
+    return wrapper
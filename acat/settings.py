@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from ase.formula import Formula
-from ase.build import molecule
 from ase.parallel import parprint
 from ase import Atoms
 import numpy as np
@@ -59,6 +58,7 @@ adsorbate_formulas = {k: ''.join(list(Formula(k))) for k in adsorbate_list}
 def adsorbate_molecule(adsorbate):
     # The ase.build.molecule module has many issues.       
     # Adjust positions, angles and indexing for your needs.
+    from ase.build import molecule
     if adsorbate == 'CO':
         ads = molecule(adsorbate)[::-1]
     elif adsorbate == 'C2':
@@ -3,20 +3,470 @@
 from ase.data import (covalent_radii, 
                       atomic_numbers, 
                       atomic_masses)
-from ase.geometry.geometry import _row_col_from_pdist
-from ase.geometry import find_mic
+from ase.geometry import find_mic, complete_cell
 from ase.formula import Formula
 from itertools import product, combinations
 from collections import abc, Counter
-import networkx as nx
+from copy import deepcopy
 import numpy as np
 import scipy
 import math
 
 
+class _Missing(object):
+    # Marks a deleted key of a site in a SiteTable
+
+    def __reduce__(self):
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+
+
+def cell_list_search(queries, points, cutoff):
+    """Find all pairs of query points and points that are closer 
+    than a cutoff using a binned cell list. The cost scales 
+    linearly with the number of points instead of quadratically.
+
+    Parameters
+    ----------
+    queries : numpy.array
+        The Cartesian coordinates of the query points.
+
+    points : numpy.array
+        The Cartesian coordinates of the points to be searched.
+
+    cutoff : float
+        The cutoff distance. Also used as the bin size.
+
+    Returns
+    -------
+    qi : numpy.array
+        The indices of the query points.
+
+    pj : numpy.array
+        The indices of the neighboring points.
+
+    d : numpy.array
+        The distances between each pair.
+
+    """
+
+    queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if len(queries) == 0 or len(points) == 0 or not cutoff > 0:
+        return (np.zeros(0, dtype=int), np.zeros(0, dtype=int), 
+                np.zeros(0))
+
+    origin = points.min(axis=0)
+    pbins = np.floor((points - origin) / cutoff).astype(np.int64)
+    shape = pbins.max(axis=0) + 1
+    pkeys = (pbins[:,0] * shape[1] + pbins[:,1]) * shape[2] + pbins[:,2]
+    order = np.argsort(pkeys, kind='stable')
+    skeys = pkeys[order]
+    qbins = np.floor((queries - origin) / cutoff).astype(np.int64)
+
+    qis, pjs = [], []
+    for shift in product((-1, 0, 1), repeat=3):
+        nbins = qbins + shift
+        ok = np.all((nbins >= 0) & (nbins < shape), axis=1)
+        qsel = np.nonzero(ok)[0]
+        if len(qsel) == 0:
+            continue
+        nbins = nbins[qsel]
+        keys = (nbins[:,0] * shape[1] + nbins[:,1]) * shape[2] + nbins[:,2]
+        start = np.searchsorted(skeys, keys, side='left')
+        counts = np.searchsorted(skeys, keys, side='right') - start
+        total = counts.sum()
+        if total == 0:
+            continue
+        # Expand the [start, end) range of each bin in one go
+        firsts = np.repeat(start - np.cumsum(counts) + counts, counts)
+        qis.append(np.repeat(qsel, counts))
+        pjs.append(order[firsts + np.arange(total)])
+    if not qis:
+        return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros(0))
+
+    qi, pj = np.concatenate(qis), np.concatenate(pjs)
+    d = np.linalg.norm(points[pj] - queries[qi], axis=1)
+    mask = d < cutoff
+
+    return qi[mask], pj[mask], d[mask]
+
+
+def _get_periodic_images(positions, cell, pbc, cutoff):
+    """Wrap the positions into the cell and generate the periodic 
+    images within a cutoff distance from the cell boundaries."""
+
+    scaled = np.linalg.solve(cell.T, positions.T).T
+    scaled[:,pbc] %= 1.
+    positions = scaled @ cell
+    # Number of periodic images needed along each lattice vector
+    heights = 1. / np.linalg.norm(np.linalg.inv(cell), axis=0)
+    skins = cutoff / heights
+    reps = np.where(pbc, np.ceil(skins), 0).astype(int)
+    offsets = np.array(list(product(*[range(-n, n + 1) for n in reps])))
+    image_scaled = (scaled[None,:,:] + offsets[:,None,:]).reshape(-1, 3)
+    image_index = np.tile(np.arange(len(positions)), len(offsets))
+    keep = np.all((image_scaled >= -skins) & (image_scaled < 1 + skins) 
+                  | ~pbc, axis=1)
+
+    return positions, image_scaled[keep] @ cell, image_index[keep]
+
+
+def get_neighbor_pairs(atoms, cutoff, mic=False, pbc=None):
+    """Get all pairs of different atoms that are closer than a cutoff 
+    for both periodic and non-periodic systems. Periodic images are 
+    generated explicitly and searched with a binned cell list, so the 
+    cost is near-linear in the number of atoms.
+
+    Parameters
+    ----------
+    atoms : ase.Atoms object
+        Accept any ase.Atoms object. No need to be built-in.
+
+    cutoff : float
+        The cutoff distance.
+
+    mic : bool, default False
+        Whether to apply minimum image convention. If True, each pair 
+        is reported once with the minimum image distance, consistent 
+        with atoms.get_all_distances(mic=True).
+
+    pbc : bool or list of bools, default None
+        The periodic directions used when mic=True. Use atoms.pbc if 
+        not specified.
+
+    Returns
+    -------
+    i : numpy.array
+        The indices of the first atoms, sorted in ascending order.
+
+    j : numpy.array
+        The indices of the second atoms, sorted in ascending order
+        for each i. Both (i, j) and (j, i) are included.
+
+    d : numpy.array
+        The distances between each pair.
+
+    """
+
+    natoms = len(atoms)
+    positions = atoms.positions
+    if not mic:
+        pbc = np.zeros(3, dtype=bool)
+    else:
+        pbc = np.broadcast_to(np.asarray(atoms.pbc if pbc is None 
+                              else pbc, dtype=bool), 3)
+    if natoms == 0 or not cutoff > 0:
+        return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros(0))
+
+    if pbc.any():
+        cell = atoms.cell.complete()
+        positions, image_positions, image_index = _get_periodic_images(
+                                                  positions, cell, pbc, cutoff)
+    else:
+        image_positions, image_index = positions, np.arange(natoms)
+
+    i, pj, d = cell_list_search(positions, image_positions, cutoff)
+    j = image_index[pj]
+    mask = i != j
+    i, j, d = i[mask], j[mask], d[mask]
+    # Keep the minimum image of each pair, sorted by (i, j)
+    order = np.lexsort((d, j, i))
+    i, j, d = i[order], j[order], d[order]
+    if pbc.any() and len(i) > 0:
+        first = np.ones(len(i), dtype=bool)
+        first[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1])
+        i, j, d = i[first], j[first], d[first]
+
+    return i, j, d
+
+
+
+def get_query_neighbor_pairs(queries, atoms, cutoff, mic=False, pbc=None):
+    """Get all pairs of query points and atoms that are closer than a 
+    cutoff for both periodic and non-periodic systems. Useful for 
+    assigning points (e.g. adsorption sites) to their neighboring 
+    atoms without building the neighbor list of the combined system.
+
+    Parameters
+    ----------
+    queries : numpy.array
+        The Cartesian coordinates of the query points.
+
+    atoms : ase.Atoms object
+        Accept any ase.Atoms object. No need to be built-in.
+
+    cutoff : float
+        The cutoff distance.
+
+    mic : bool, default False
+        Whether to apply minimum image convention. If True, each pair 
+        is reported once with the minimum image distance.
+
+    pbc : bool or list of bools, default None
+        The periodic directions used when mic=True. Use atoms.pbc if 
+        not specified.
+
+    Returns
+    -------
+    i : numpy.array
+        The indices of the query points, sorted in ascending order.
+
+    j : numpy.array
+        The indices of the atoms, sorted in ascending order for each i.
+
+    d : numpy.array
+        The distances between each pair.
+
+    """
+
+    queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+    natoms = len(atoms)
+    positions = atoms.positions
+    if not mic:
+        pbc = np.zeros(3, dtype=bool)
+    else:
+        pbc = np.broadcast_to(np.asarray(atoms.pbc if pbc is None 
+                              else pbc, dtype=bool), 3)
+    if natoms == 0 or len(queries) == 0 or not cutoff > 0:
+        return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros(0))
+
+    if pbc.any():
+        cell = atoms.cell.complete()
+        qscaled = np.linalg.solve(cell.T, queries.T).T
+        qscaled[:,pbc] %= 1.
+        queries = qscaled @ cell
+        _, image_positions, image_index = _get_periodic_images(
+                                          positions, cell, pbc, cutoff)
+    else:
+        image_positions, image_index = positions, np.arange(natoms)
+
+    i, pj, d = cell_list_search(queries, image_positions, cutoff)
+    j = image_index[pj]
+    # Keep the minimum image of each pair, sorted by (i, j)
+    order = np.lexsort((d, j, i))
+    i, j, d = i[order], j[order], d[order]
+    if pbc.any() and len(i) > 0:
+        first = np.ones(len(i), dtype=bool)
+        first[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1])
+        i, j, d = i[first], j[first], d[first]
+
+    return i, j, d
+
+class VerletNeighborList(object):
+    """A neighbor list with a skin distance (Verlet list) that is reused 
+    for a series of structures of the same atoms, e.g. the frames of a 
+    relaxation trajectory or the steps of a local optimization. All 
+    pairs closer than the cutoff plus the skin are searched once at 
+    the reference positions, and the pairs of a later structure are 
+    then obtained from these candidates only. The full search is 
+    repeated only when an atom moved by more than half the skin from 
+    its reference position, when the number of atoms, the cell or the 
+    periodic boundary conditions changed, or when a larger cutoff is 
+    requested.
+
+    Parameters
+    ----------
+    cutoff : float, default 0.
+        The cutoff distance. Increased automatically when a larger
+        cutoff is passed to update or requested from the list.
+
+    skin : float, default 0.3
+        The skin distance added to the cutoff of the full search.
+
+    mic : bool, default False
+        Whether to apply minimum image convention. Remember to set 
+        mic=True for periodic systems.
+
+    pbc : bool or list of bools, default None
+        The periodic directions used when mic=True. Use atoms.pbc if 
+        not specified.
+
+    Example
+    -------
+    The following example only repeats the full neighbor search of 
+    the surface atoms when they moved too much along a trajectory:
+
+        >>> from acat.adsorption_sites import SlabAdsorptionSites
+        >>> from acat.utilities import VerletNeighborList
+        >>> from ase.io import read
+        >>> nl = VerletNeighborList(mic=True)
+        >>> for atoms in read('relax.traj', index=':'):
+        ...     sas = SlabAdsorptionSites(atoms, surface='fcc111',
+        ...                               neighbor_list=nl)
+        >>> print(nl.nbuilds)
+
+    """
+
+    def __init__(self, cutoff=0., skin=.3, mic=False, pbc=None):
+        self.cutoff = cutoff
+        self.skin = skin
+        self.mic = mic
+        self.pbc = pbc
+        # The number of full neighbor searches
+        self.nbuilds = 0
+        self.reference_positions = None
+
+    def _get_pbc(self, atoms):
+        if not self.mic:
+            return np.zeros(3, dtype=bool)
+        return np.broadcast_to(np.asarray(atoms.pbc if self.pbc is None
+                               else self.pbc, dtype=bool), 3).copy()
+
+    def update(self, atoms, cutoff=None):
+        """Update the neighbor list to the positions of an atoms object.
+        Returns True if a full neighbor search was done.
+
+        Parameters
+        ----------
+        atoms : ase.Atoms object
+            Accept any ase.Atoms object. No need to be built-in.
+
+        cutoff : float, default None
+            The cutoff distance required by the caller. The list is 
+            rebuilt with this cutoff if it is larger than the cutoff 
+            of the list.
+
+        """
+
+        if cutoff is not None and cutoff > self.cutoff:
+            self.cutoff = cutoff
+            self.reference_positions = None
+        positions = atoms.positions
+        # Kept to grow the list when a larger cutoff is requested
+        self._last = (positions.copy(), atoms.cell.copy(), atoms.pbc.copy())
+        pbc = self._get_pbc(atoms)
+        cell = atoms.cell.complete() if pbc.any() else None
+        ref_positions = self.reference_positions
+        # The lattice offsets of the pairs only depend on the cell 
+        # vectors along the periodic directions
+        rebuild = (ref_positions is None or 
+                   len(positions) != len(ref_positions) or
+                   (pbc != self._pbc).any() or (pbc.any() and not 
+                   np.allclose(cell[pbc], self._cell[pbc], atol=1e-8)))
+        if not rebuild:
+            displacements = positions - ref_positions
+            if pbc.any():
+                displacements = find_mic(displacements, cell, pbc)[0]
+            rebuild = len(positions) > 0 and np.linalg.norm(
+                      displacements, axis=1).max() > self.skin / 2
+        if rebuild:
+            self._build(atoms, cell, pbc)
+        elif pbc.any():
+            # Follow the atoms across the cell boundaries, so that the 
+            # lattice offsets of the pairs stay valid
+            positions = ref_positions + displacements
+
+        self.vectors = positions[self.j] - positions[self.i] + self.offsets
+        self.distances = np.linalg.norm(self.vectors, axis=1)
+        # Keep the minimum image of each pair
+        self.minimum_image = np.ones(len(self.i), dtype=bool)
+        if len(self._images) > 0:
+            images = self._images
+            order = np.lexsort((self.distances[images], self.j[images], 
+                                self.i[images]))
+            images = images[order]
+            first = np.ones(len(images), dtype=bool)
+            first[1:] = ((self.i[images[1:]] != self.i[images[:-1]]) | 
+                         (self.j[images[1:]] != self.j[images[:-1]]))
+            self.minimum_image[images[~first]] = False
+
+        return rebuild
+
+    def _build(self, atoms, cell, pbc):
+        positions = atoms.positions
+        cutoff = self.cutoff + self.skin
+        if pbc.any():
+            # Keep all images of each pair, since the minimum image can
+            # change when the atoms move in a small cell
+            wrapped, image_positions, image_index = _get_periodic_images(
+                                                positions, cell, pbc, cutoff)
+            i, pj, _ = cell_list_search(wrapped, image_positions, cutoff)
+            j = image_index[pj]
+            mask = i != j
+            i, j, pj = i[mask], j[mask], pj[mask]
+            offsets = (image_positions[pj] - positions[j]) - (
+                       wrapped[i] - positions[i])
+        else:
+            i, j, _ = cell_list_search(positions, positions, cutoff)
+            mask = i != j
+            i, j = i[mask], j[mask]
+            offsets = np.zeros((len(i), 3))
+        order = np.lexsort((j, i))
+        self.i, self.j, self.offsets = i[order], j[order], offsets[order]
+        self.splits = np.searchsorted(self.i, np.arange(len(atoms) + 1))
+        same = (self.i[1:] == self.i[:-1]) & (self.j[1:] == self.j[:-1])
+        self._images = np.flatnonzero(np.append(same, False) | 
+                                      np.insert(same, 0, False))
+        self.reference_positions = positions.copy()
+        self._cell, self._pbc = cell, pbc
+        self.nbuilds += 1
+
+    def _check_cutoff(self, cutoff):
+        if cutoff is None:
+            return self.cutoff
+        if cutoff > self.cutoff:
+            # Rebuild the list of the last structure with the cutoff
+            from ase import Atoms
+            positions, cell, pbc = self._last
+            self.update(Atoms(positions=positions, cell=cell, pbc=pbc), 
+                        cutoff)
+        return cutoff
+
+    def get_neighbor_pairs(self, cutoff=None):
+        """Get all pairs of different atoms that are closer than a cutoff
+        in the last updated structure. Returns the same (i, j, d) arrays
+        as acat.utilities.get_neighbor_pairs.
+
+        Parameters
+        ----------
+        cutoff : float, default None
+            The cutoff distance. The list of the last updated structure
+            is rebuilt with this cutoff if it exceeds the cutoff of the 
+            list. Use the cutoff of the neighbor list if not specified.
+
+        """
+
+        cutoff = self._check_cutoff(cutoff)
+        mask = (self.distances < cutoff) & self.minimum_image
+
+        return self.i[mask], self.j[mask], self.distances[mask]
+
+    def get_neighbors(self, index, cutoff=None):
+        """Get the neighbors of an atom in the last updated structure.
+        Returns the indices of the neighbors, the vectors from the atom
+        to the neighbors and the squared distances, in the same way as
+        asap3.FullNeighborList.get_neighbors.
+
+        Parameters
+        ----------
+        index : int
+            The index of the atom.
+
+        cutoff : float, default None
+            The cutoff distance. The list of the last updated structure
+            is rebuilt with this cutoff if it exceeds the cutoff of the 
+            list. Use the cutoff of the neighbor list if not specified.
+
+        """
+
+        cutoff = self._check_cutoff(cutoff)
+        start, end = self.splits[index], self.splits[index + 1]
+        d = self.distances[start:end]
+        mask = (d < cutoff) & self.minimum_image[start:end]
+
+        return (self.j[start:end][mask], self.vectors[start:end][mask], 
+                d[mask]**2)
+
+
 def neighbor_shell_list(atoms, dx=0.3, neighbor_number=1, 
                         different_species=False, mic=False,
-                        radius=None, span=False):
+                        radius=None, span=False, neighbor_list=None):
     """Make dict of neighboring shell atoms for both periodic and 
     non-periodic systems. Possible to return neighbors from defined 
     neighbor shell e.g. 1st, 2nd, 3rd by changing the neighbor number.
@@ -50,42 +500,54 @@ def neighbor_shell_list(atoms, dx=0.3, neighbor_number=1,
         Returns a unit disk graph if True, otherwise returns a unit
         ring graph.
 
+    neighbor_list : acat.utilities.VerletNeighborList object, default None
+        A neighbor list with a skin distance that is updated with the 
+        atoms and provides the neighbor pairs. The full neighbor search 
+        is then skipped if the atoms moved less than half the skin 
+        since the last search. Useful for the frames of a trajectory.
+
     """
 
     natoms = len(atoms)
     if natoms == 1:
         return {0: []}
-    cell = atoms.cell
-    positions = atoms.positions
-    nums = set(atoms.numbers)
-    pairs = product(nums, nums)
-    if not radius:
-        cr_dict = {(i, j): (covalent_radii[i] + covalent_radii[j]) for i, j in pairs}
-    
-    ds = atoms.get_all_distances(mic=mic)
-    conn = {k: [] for k in range(natoms)}
-    for atomi in atoms:
-        for atomj in atoms:
-            i, j = atomi.index, atomj.index
-            if i != j:
-                if not (different_species & (atomi.symbol == atomj.symbol)):
-                    d = ds[i,j]
-                    crij = 2 * radius if radius else cr_dict[(atomi.number, atomj.number)] 
+    numbers = atoms.numbers
+    if radius:
+        cutoff = neighbor_number * 2 * radius + dx
+    else:
+        cutoff = neighbor_number * 2 * covalent_radii[numbers].max() + dx
 
-                    if neighbor_number == 1 or span:
-                        d_max1 = 0.
-                    else:
-                        d_max1 = (neighbor_number - 1) * crij + dx
+    if neighbor_list is None:
+        i, j, d = get_neighbor_pairs(atoms, cutoff, mic=mic)
+    else:
+        if neighbor_list.mic != mic:
+            raise ValueError('the neighbor list must have mic={}'.format(mic))
+        neighbor_list.update(atoms, cutoff)
+        i, j, d = neighbor_list.get_neighbor_pairs(cutoff)
+    if radius:
+        crij = 2 * radius
+    else:
+        crij = covalent_radii[numbers[i]] + covalent_radii[numbers[j]]
+    if neighbor_number == 1 or span:
+        d_max1 = 0.
+    else:
+        d_max1 = (neighbor_number - 1) * crij + dx
+    d_max2 = neighbor_number * crij + dx
 
-                    d_max2 = neighbor_number * crij + dx
+    mask = (d > d_max1) & (d < d_max2)
+    if different_species:
+        mask &= (numbers[i] != numbers[j])
+    i, j = i[mask], j[mask]
 
-                    if d > d_max1 and d < d_max2:
-                        conn[atomi.index].append(atomj.index)
+    conn = {k: [] for k in range(natoms)}
+    splits = np.searchsorted(i, np.arange(1, natoms))
+    for k, nbrs in enumerate(np.split(j, splits)):
+        conn[k] = nbrs.tolist()
 
     return conn
 
 
-def get_adj_matrix(neighborlist):
+def get_adj_matrix(neighborlist, sparse=False):
     """Returns an adjacency matrix from a neighborlist object.
 
     Parameters
@@ -94,21 +556,76 @@ def get_adj_matrix(neighborlist):
         A neighborlist (dictionary) that contains keys of each 
         atom index and values of their neighbor atom indices.
 
+    sparse : bool, default False
+        Whether to return a scipy.sparse.csr_matrix instead of a 
+        dense numpy.ndarray. Recommended for large systems since 
+        the memory of the dense matrix scales quadratically.
+
     """ 
 
-    conn_mat = []
-    index = range(len(neighborlist.keys()))
-    # Create binary matrix denoting connections.
-    for index1 in index:
-        conn_x = []
-        for index2 in index:
-            if index2 in neighborlist[index1]:
-                conn_x.append(1)
-            else:
-                conn_x.append(0)
-        conn_mat.append(conn_x)
+    n = len(neighborlist)
+    rows = np.repeat(np.arange(n), [len(neighborlist[i]) for i in range(n)])
+    cols = np.fromiter((j for i in range(n) for j in neighborlist[i]), 
+                       dtype=int, count=len(rows))
+    if sparse:
+        from scipy.sparse import csr_matrix
+        conn_mat = csr_matrix((np.ones(len(rows), dtype=int), (rows, cols)), 
+                              shape=(n, n))
+        # Remove duplicated neighbors
+        conn_mat.data[:] = 1
+        return conn_mat
+
+    conn_mat = np.zeros((n, n), dtype=int)
+    conn_mat[rows, cols] = 1
+
+    return conn_mat
+
+
+def get_adj_list(adj_matrix):
+    """Returns the indices of the connected nodes of each node from 
+    an adjacency matrix, in ascending order.
+
+    Parameters
+    ----------
+    adj_matrix : numpy.ndarray or scipy.sparse matrix
+        The adjacency matrix.
+
+    """
+
+    from scipy.sparse import csr_matrix
+    cm = csr_matrix(adj_matrix)
+    cm.eliminate_zeros()
+    cm.sort_indices()
+
+    return [cm.indices[cm.indptr[i]:cm.indptr[i+1]].tolist() 
+            for i in range(cm.shape[0])]
+
+
+def graph_from_adj_matrix(adj_matrix):
+    """Returns a networkx.Graph from an adjacency matrix. Accepts both
+    dense and sparse matrices. The non-zero entries are stored as the
+    weight attribute of the edges, as in networkx.from_numpy_array.
+
+    Parameters
+    ----------
+    adj_matrix : numpy.ndarray or scipy.sparse matrix
+        The adjacency matrix.
+
+    """
 
-    return np.asarray(conn_mat)
+    import networkx as nx
+    from scipy.sparse import issparse
+    G = nx.Graph()
+    G.add_nodes_from(range(adj_matrix.shape[0]))
+    rows, cols = adj_matrix.nonzero()
+    if issparse(adj_matrix):
+        weights = np.asarray(adj_matrix[rows, cols]).ravel()
+    else:
+        weights = np.asarray(adj_matrix)[rows, cols]
+    G.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), 
+                                  weights.tolist()))
+
+    return G
 
 
 def get_mic(p1, p2, cell, pbc=[1,1,0], 
@@ -194,6 +711,94 @@ def get_mic(p1, p2, cell, pbc=[1,1,0],
         return np.sum(min_dr**2)
 
 
+def get_mic_batch(p1, p2, cell, pbc=[1,1,0], 
+                  max_cell_multiple=1e5,
+                  return_squared_distance=False):
+    """A vectorized version of get_mic that gets the minimum image 
+    convention (mic) vectors from p1 to p2 for many pairs of 
+    positions in one call. p1 and p2 are broadcasted against each 
+    other, so that either of them can be a single position (one point 
+    against many) or both can be arrays of the same length (many 
+    pairs). Unlike get_mic, which always treats the first two lattice
+    vectors as periodic, all three directions follow pbc, so the 
+    results are the same as calling get_mic for each pair only if pbc
+    is periodic along the first two lattice vectors (e.g. the default). 
+    The lattice vectors along the non-periodic directions can be zero 
+    (e.g. a slab without vacuum), but the periodic ones must be 
+    linearly independent.
+
+    Parameters
+    ----------
+    p1 : numpy.array
+        The 3D Cartesian coordinate(s) of the position(s) 1.
+
+    p2 : numpy.array
+        The 3D Cartesian coordinate(s) of the position(s) 2.
+
+    cell : numpy.array
+        The 3D parallel epipedal unit cell.
+
+    pbc : numpy.array or list or bool, default [1, 1, 0]
+        Whether cell is periodic in each direction.
+
+    max_cell_multiple : int, default 1e5
+        A large number to account for the maximum repetitions of each 
+        of the lattice vectors. 
+
+    return_squared_distance : bool, default False
+        Whether to return the squared mic distances instead of the
+        mic vectors.
+
+    """
+
+    cell = np.asarray(cell, dtype=float)
+    pbc = np.broadcast_to(np.asarray(pbc, dtype=bool), 3)
+    dr = np.asarray(p2, dtype=float) - np.asarray(p1, dtype=float)
+    shape = dr.shape
+    dr = dr.reshape(-1, 3)
+    if len(dr) == 0:
+        return np.zeros(shape[:-1]) if return_squared_distance else dr.reshape(shape)
+
+    # Same search range as get_mic, using the longest vector in the batch.
+    # The non-periodic lattice vectors are not searched, so they are 
+    # replaced by an orthonormal complement of the periodic ones for the
+    # range, which keeps the cell volume finite 
+    a, b, c = cell[0], cell[1], cell[2]
+    if not pbc.any():
+        reps = np.zeros(3, dtype=int)
+    else:
+        vecs = cell.copy()
+        vt = np.linalg.svd(cell[pbc])[2]
+        vecs[~pbc] = vt[pbc.sum():]
+        vol = np.abs(vecs[0] @ np.cross(vecs[1], vecs[2]))
+        if vol <= 1e-8 * np.prod(np.linalg.norm(vecs, axis=1)):
+            raise ValueError('the periodic lattice vectors must be '
+                             'linearly independent')
+        cross_lens = np.linalg.norm([np.cross(vecs[1], vecs[2]), 
+                                     np.cross(vecs[0], vecs[2]), 
+                                     np.cross(vecs[0], vecs[1])], axis=1)
+        max_length = np.sqrt(np.max(np.einsum('ij,ij->i', dr, dr)))
+        reps = np.minimum(np.ceil(max_length / vol * cross_lens), 
+                          max_cell_multiple).astype(int)
+        reps[~pbc] = 0
+
+    # The original image goes first so that ties are resolved as in get_mic
+    offsets = [(0, 0, 0)] + [(i, j, k) for i in range(-reps[0], reps[0] + 1)
+                             for j in range(-reps[1], reps[1] + 1) 
+                             for k in range(-reps[2], reps[2] + 1)
+                             if not (i == 0 and j == 0 and k == 0)]
+    offsets = np.asarray(offsets, dtype=float)
+    shifts = (offsets[:,0,None] * a + offsets[:,1,None] * b) + offsets[:,2,None] * c
+    out_vecs = shifts[None,:,:] + dr[:,None,:]
+    len_sqs = np.einsum('ijk,ijk->ij', out_vecs, out_vecs)
+    min_dr = out_vecs[np.arange(len(dr)), np.argmin(len_sqs, axis=1)]
+    if not return_squared_distance:
+        return min_dr.reshape(shape)
+
+    else:
+        return np.sum(min_dr**2, axis=1).reshape(shape[:-1])
+
+
 def cart_to_frac(atoms):
     """Convert Cartesian coordinates to fractional coordinates."""
 
@@ -277,6 +882,814 @@ def partitions_into_totals(shells, totals):
                 yield [first] + rest
 
 
+class PeriodicHashGrid(object):
+    """A persistent spatial hash grid of points for fast radius 
+    queries in both periodic and non-periodic systems. Points can be 
+    inserted and deleted incrementally, so that one grid can be kept 
+    for a structure while atoms are added or removed, e.g. when 
+    checking the distances between adsorbates during random sequential 
+    adsorption. Each query then only costs a constant number of bin 
+    lookups instead of computing all pairwise distances.
+
+    Parameters
+    ----------
+    cell : numpy.array, default None
+        The 3D parallel epipedal unit cell. Only required for periodic
+        systems.
+
+    pbc : bool or list of bools, default False
+        Whether the cell is periodic in each direction. The minimum 
+        image convention is applied along the periodic directions.
+
+    bin_size : float, default 2.
+        The bin size of the grid. Ideally similar to the query radius.
+
+    """
+
+    def __init__(self, cell=None, pbc=False, bin_size=2.):
+        self.pbc = np.broadcast_to(np.asarray(pbc, dtype=bool), 3).copy()
+        if cell is None:
+            assert not self.pbc.any(), 'a cell is required for periodic systems'
+            cell = np.zeros((3, 3))
+        self.cell = np.asarray(complete_cell(cell), dtype=float)
+        # Avoid creating too many bins for very small cutoffs
+        bin_size = max(bin_size, .5)
+        self.heights = 1. / np.linalg.norm(np.linalg.inv(self.cell), axis=0)
+
+        # Periodic directions are divided into an integer number of bins
+        nbins = np.maximum(np.floor(self.heights / bin_size), 1).astype(int)
+        self.nbins = np.where(self.pbc, nbins, 0)
+        self.widths = np.where(self.pbc, 1. / nbins, bin_size / self.heights)
+        self.bins = {}
+        self.points = {}
+        self._next_key = 0
+
+    @classmethod
+    def from_atoms(cls, atoms, indices=None, mic=False, bin_size=2.):
+        """Build a hash grid from the positions of (a subset of) the 
+        atoms.
+
+        Parameters
+        ----------
+        atoms : ase.Atoms object
+            Accept any ase.Atoms object. No need to be built-in.
+
+        indices : list of ints or numpy.array of bools, default None
+            The indices (or a boolean mask) of the atoms to insert. Use 
+            all atoms if not specified.
+
+        mic : bool, default False
+            Whether to apply minimum image convention. Remember to set 
+            mic=True for periodic systems.
+
+        bin_size : float, default 2.
+            The bin size of the grid.
+
+        """
+
+        grid = cls(atoms.cell if mic else None, pbc=mic, bin_size=bin_size)
+        positions = atoms.positions
+        if indices is not None:
+            positions = positions[indices]
+        grid.insert(positions)
+
+        return grid
+
+    def __len__(self):
+        return len(self.points)
+
+    def _get_scaled_positions(self, positions):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        scaled = np.linalg.solve(self.cell.T, positions.T).T
+        scaled[:,self.pbc] %= 1.
+
+        return scaled
+
+    def _get_bins(self, scaled):
+        bins = np.floor(scaled / self.widths).astype(int)
+        bins[:,self.pbc] %= self.nbins[self.pbc]
+
+        return bins
+
+    def insert(self, positions):
+        """Insert points into the grid. Returns the keys of the new 
+        points, which can later be used to delete them.
+
+        Parameters
+        ----------
+        positions : numpy.array
+            The 3D Cartesian coordinates of the points.
+
+        """
+
+        scaled = self._get_scaled_positions(positions)
+        keys = []
+        for spos, b in zip(scaled, map(tuple, self._get_bins(scaled).tolist())):
+            key = self._next_key
+            self._next_key += 1
+            self.points[key] = (spos, b)
+            self.bins.setdefault(b, []).append(key)
+            keys.append(key)
+
+        return keys
+
+    def delete(self, keys):
+        """Delete points from the grid.
+
+        Parameters
+        ----------
+        keys : list of ints
+            The keys of the points returned by insert.
+
+        """
+
+        for key in keys:
+            _, b = self.points.pop(key)
+            lst = self.bins[b]
+            lst.remove(key)
+            if not lst:
+                del self.bins[b]
+
+    def query(self, position, radius):
+        """Get the points that are closer than a radius to a given 
+        position, using the minimum image distances along the periodic 
+        directions. Returns the keys (in ascending order) and the 
+        distances of the points.
+
+        Parameters
+        ----------
+        position : numpy.array
+            The 3D Cartesian coordinate of the query position.
+
+        radius : float
+            The query radius.
+
+        """
+
+        spos = self._get_scaled_positions(position)[0]
+        b = np.floor(spos / self.widths).astype(int)
+        b[self.pbc] %= self.nbins[self.pbc]
+        reach = np.ceil(radius / (self.heights * self.widths)).astype(int)
+        keys, shifts = [], []
+        for delta in product(*[range(-r, r + 1) for r in reach]):
+            nb = b + delta
+            # Bins beyond the cell are periodic images of bins inside
+            shift = np.zeros(3)
+            shift[self.pbc] = nb[self.pbc] // self.nbins[self.pbc]
+            nb[self.pbc] %= self.nbins[self.pbc]
+            lst = self.bins.get(tuple(nb.tolist()))
+            if lst:
+                keys += lst
+                shifts += [shift] * len(lst)
+        if not keys:
+            return np.zeros(0, dtype=int), np.zeros(0)
+
+        keys = np.asarray(keys)
+        dscaled = np.asarray([self.points[k][0] for k in keys]) + shifts - spos
+        dists = np.linalg.norm(dscaled @ self.cell, axis=1)
+        # Keep the minimum image of each point
+        order = np.lexsort((dists, keys))
+        keys, dists = keys[order], dists[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        mask = first & (dists < radius)
+
+        return keys[mask], dists[mask]
+
+    def any_within(self, positions, radius):
+        """Check if any point in the grid is closer than a radius to 
+        any of the given positions.
+
+        Parameters
+        ----------
+        positions : numpy.array
+            The 3D Cartesian coordinates of the query positions.
+
+        radius : float
+            The query radius.
+
+        """
+
+        return any(len(self.query(pos, radius)[0]) > 0 for pos in 
+                   np.asarray(positions, dtype=float).reshape(-1, 3))
+
+
+class SiteTable(object):
+    """A structure-of-arrays table of adsorption sites. The positions,
+    normal vectors and (padded) atom indices of all sites are stored in
+    contiguous arrays, and the site type, surface, morphology, 
+    composition, subsurface element and label are stored as integer 
+    codes into small vocabularies. Any other key (e.g. the occupation
+    added by the adsorbate coverage classes) is stored per key in a
+    dictionary. This takes an order of magnitude less memory than one
+    dictionary with its own arrays per site.
+
+    The sites are accessed through lightweight SiteRow views that 
+    behave like the site dictionaries, see SiteList.
+
+    Parameters
+    ----------
+    keys : list of strs, default None
+        The keys that every site has. Defaults to the keys of the first 
+        site appended to the table.
+
+    """
+
+    _array_keys = ('position', 'normal')
+    _code_keys = ('site', 'surface', 'morphology', 'composition',
+                  'subsurf_element', 'label')
+
+    def __init__(self, keys=None):
+        self.keys = self._keyset = None
+        if keys is not None:
+            self._set_keys(keys)
+        self.n = 0
+        self.positions = np.empty((0, 3))
+        self.normals = np.empty((0, 3))
+        self.indices = np.empty((0, 6), dtype=int)
+        self.n_indices = np.empty(0, dtype=int)
+        self.subsurf_indices = np.empty(0, dtype=int)
+        self.codes = {k: np.empty(0, dtype=np.int32) for k in self._code_keys}
+        self.vocab = {k: [] for k in self._code_keys}
+        self._lookup = {k: {} for k in self._code_keys}
+        # Values that do not fit the arrays, or keys that are not
+        # columns of the table, stored as {key: {row: value}}
+        self.extra = {}
+        # Bumped by every write through the table so that results 
+        # derived from the sites can tell that they are out of date
+        self._version = 0
+        self._indices_version = 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, row):
+        return SiteRow(self, row)
+
+    def _set_keys(self, keys):
+        self.keys = tuple(keys)
+        self._keyset = frozenset(self.keys)
+
+    def _reserve(self, n):
+        capacity = len(self.n_indices)
+        if n <= capacity:
+            return
+        capacity = max(n, 2 * capacity, 16)
+        def grow(a):
+            b = np.empty((capacity,) + a.shape[1:], dtype=a.dtype)
+            b[:len(a)] = a
+            return b
+        self.positions = grow(self.positions)
+        self.normals = grow(self.normals)
+        self.indices = grow(self.indices)
+        self.n_indices = grow(self.n_indices)
+        self.subsurf_indices = grow(self.subsurf_indices)
+        self.codes = {k: grow(v) for k, v in self.codes.items()}
+
+    def _encode(self, key, value):
+        lookup = self._lookup[key]
+        code = lookup.get(value)
+        if code is None:
+            code = len(self.vocab[key])
+            self.vocab[key].append(value)
+            lookup[value] = code
+
+        return code
+
+    def append(self, site):
+        """Append a site (dictionary or SiteRow) and return the row."""
+
+        self.extend([site])
+
+        return self.n - 1
+
+    def extend(self, sites):
+        """Append a list of sites (dictionaries or SiteRows)."""
+
+        sites = [dict(s) if isinstance(s, SiteRow) else s for s in sites]
+        if not sites:
+            return
+        if self.keys is None:
+            self._set_keys(sites[0].keys())
+        self._version += 1
+        start, n = self.n, len(sites)
+        rows = range(start, start + n)
+        self._reserve(start + n)
+        self.n += n
+        self.positions[start:] = self.normals[start:] = np.nan
+        self.n_indices[start:] = 0
+        self.subsurf_indices[start:] = -1
+        for k in self._code_keys:
+            self.codes[k][start:] = self._encode(k, None)
+
+        # Fill whole columns at once and only fall back to setting the
+        # values one by one for the sites that do not fit the columns
+        keys = list(self.keys)
+        remaining = set().union(*sites) - self._keyset
+        for s in sites:
+            if not remaining:
+                break
+            for k in s:
+                if k in remaining:
+                    keys.append(k)
+                    remaining.discard(k)
+        for k in keys:
+            values = [s.get(k, _MISSING) for s in sites]
+            if k in self._keyset:
+                missing = [i for i, v in enumerate(values) if v is _MISSING]
+                for i in missing:
+                    values[i] = None
+                rest = list(self._set_column(k, start, values))
+                for i in missing:
+                    values[i] = _MISSING
+                rest += missing
+            else:
+                extra = self.extra.setdefault(k, {})
+                extra.update((r, v) for r, v in zip(rows, values) 
+                             if v is not _MISSING)
+                rest = []
+            for i in rest:
+                self.set_value(start + i, k, values[i])
+
+    def _set_column(self, key, start, values):
+        # Returns the positions of the values that were not set
+        if key in self._array_keys:
+            try:
+                a = np.asarray(values, dtype=float)
+            except (TypeError, ValueError):
+                a = None
+            if a is None or a.shape != (len(values), 3):
+                return range(len(values))
+            (self.positions if key == 'position' else 
+             self.normals)[start:start+len(values)] = a
+        elif key == 'indices':
+            rest, groups = [], {}
+            for i, v in enumerate(values):
+                if isinstance(v, tuple) and 0 < len(v) <= self.indices.shape[1]:
+                    groups.setdefault(len(v), []).append(i)
+                else:
+                    rest.append(i)
+            # Set the indices of all sites with the same number of atoms
+            for m, group in groups.items():
+                a = np.asarray([values[i] for i in group])
+                if a.dtype.kind not in 'iu' or a.shape != (len(group), m):
+                    rest += group
+                    continue
+                rows = start + np.asarray(group)
+                self.indices[rows,:m] = a
+                self.n_indices[rows] = m
+            return rest
+        elif key == 'subsurf_index':
+            rest = []
+            for i, v in enumerate(values):
+                if v is None:
+                    continue
+                if isinstance(v, (int, np.integer)) and v >= 0:
+                    self.subsurf_indices[start+i] = v
+                else:
+                    rest.append(i)
+            return rest
+        elif key in self._code_keys:
+            rest = []
+            codes = self.codes[key]
+            for i, v in enumerate(values):
+                try:
+                    codes[start+i] = self._encode(key, v)
+                except TypeError: # Unhashable
+                    rest.append(i)
+            return rest
+        else:
+            return range(len(values))
+
+        return []
+
+    def get_value(self, row, key):
+        """Get the value of a key of the site in a row."""
+
+        extra = self.extra.get(key)
+        if extra is not None and row in extra:
+            value = extra[row]
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if key not in self._keyset:
+            raise KeyError(key)
+        if key == 'position':
+            return self.positions[row]
+        if key == 'normal':
+            return self.normals[row]
+        if key == 'indices':
+            return tuple(self.indices[row,:self.n_indices[row]].tolist())
+        if key == 'subsurf_index':
+            i = self.subsurf_indices[row]
+            return None if i < 0 else int(i)
+
+        return self.vocab[key][self.codes[key][row]]
+
+    def set_value(self, row, key, value):
+        """Set the value of a key of the site in a row."""
+
+        self._version += 1
+        if key == 'indices':
+            self._indices_version += 1
+        stored = False
+        if value is _MISSING or key not in self._keyset:
+            pass
+        elif key in self._array_keys:
+            if value is not None and np.shape(value) == (3,):
+                (self.positions if key == 'position' else 
+                 self.normals)[row] = value
+                stored = True
+        elif key == 'indices':
+            if isinstance(value, tuple) and all(isinstance(i, 
+            (int, np.integer)) for i in value):
+                if len(value) > self.indices.shape[1]:
+                    indices = np.empty((len(self.indices), len(value)), 
+                                       dtype=int)
+                    indices[:,:self.indices.shape[1]] = self.indices
+                    self.indices = indices
+                self.indices[row,:len(value)] = value
+                self.n_indices[row] = len(value)
+                stored = True
+        elif key == 'subsurf_index':
+            if value is None or (isinstance(value, (int, np.integer)) 
+            and value >= 0):
+                self.subsurf_indices[row] = -1 if value is None else value
+                stored = True
+        elif key in self._code_keys:
+            try:
+                self.codes[key][row] = self._encode(key, value)
+                stored = True
+            except TypeError: # Unhashable
+                pass
+        if stored:
+            extra = self.extra.get(key)
+            if extra is not None:
+                extra.pop(row, None)
+        else:
+            self.extra.setdefault(key, {})[row] = value
+
+    def del_value(self, row, key):
+        """Delete a key from the site in a row."""
+
+        if key not in self.row_keys(row):
+            raise KeyError(key)
+        if key in self._keyset:
+            self.set_value(row, key, _MISSING)
+        else:
+            del self.extra[key][row]
+            self._version += 1
+
+    def row_keys(self, row):
+        """Get the keys of the site in a row."""
+
+        keys = []
+        for k in self.keys:
+            extra = self.extra.get(k)
+            if extra is None or extra.get(row, None) is not _MISSING:
+                keys.append(k)
+        for k, extra in self.extra.items():
+            if k not in self._keyset and row in extra:
+                keys.append(k)
+
+        return keys
+
+    def take(self, rows):
+        """Get a new table with copies of the given rows."""
+
+        rows = np.asarray(rows, dtype=int)
+        table = SiteTable(self.keys)
+        table.n = len(rows)
+        table.positions = self.positions[rows]
+        table.normals = self.normals[rows]
+        table.indices = self.indices[rows]
+        table.n_indices = self.n_indices[rows]
+        table.subsurf_indices = self.subsurf_indices[rows]
+        table.codes = {k: v[rows] for k, v in self.codes.items()}
+        table.vocab = {k: list(v) for k, v in self.vocab.items()}
+        table._lookup = {k: dict(v) for k, v in self._lookup.items()}
+        new_rows = {r: i for i, r in enumerate(rows.tolist())}
+        for k, extra in self.extra.items():
+            table.extra[k] = {new_rows[r]: deepcopy(v) for r, v in 
+                              extra.items() if r in new_rows}
+
+        return table
+
+    def to_arrays(self):
+        """Get the table as a dictionary of numpy arrays that can be
+        saved with numpy.savez. The keys, the vocabularies and the
+        values that are not stored in the columns are encoded as a
+        JSON string, so these must be JSON serializable (tuples are
+        restored as lists)."""
+
+        import json
+        n = self.n
+        extra = {k: [[r, v] for r, v in e.items() if v is not _MISSING]
+                 for k, e in self.extra.items()}
+        missing = [[k, r] for k, e in self.extra.items() for r, v in
+                   e.items() if v is _MISSING]
+        meta = {'keys': self.keys, 'vocab': self.vocab,
+                'extra': extra, 'missing': missing}
+        try:
+            meta = json.dumps(meta, default=lambda o: o.item() if
+                              isinstance(o, np.generic) else o.tolist())
+        except (TypeError, AttributeError):
+            raise ValueError('the site values must be JSON serializable')
+
+        arrays = {'positions': self.positions[:n],
+                  'normals': self.normals[:n],
+                  'indices': self.indices[:n],
+                  'n_indices': self.n_indices[:n],
+                  'subsurf_indices': self.subsurf_indices[:n],
+                  'meta': np.asarray(meta)}
+        arrays.update(('code_' + k, v[:n]) for k, v in self.codes.items())
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Get a table from the dictionary of arrays returned by
+        to_arrays.
+
+        Parameters
+        ----------
+        arrays : dict or numpy.lib.npyio.NpzFile
+            The arrays of the table.
+
+        """
+
+        import json
+        meta = json.loads(str(arrays['meta']))
+        table = cls(meta['keys'])
+        table.n = len(arrays['n_indices'])
+        table.positions = np.array(arrays['positions'], dtype=float)
+        table.normals = np.array(arrays['normals'], dtype=float)
+        table.indices = np.array(arrays['indices'], dtype=int)
+        table.n_indices = np.array(arrays['n_indices'], dtype=int)
+        table.subsurf_indices = np.array(arrays['subsurf_indices'], dtype=int)
+        table.codes = {k: np.array(arrays['code_' + k], dtype=np.int32)
+                       for k in cls._code_keys}
+        table.vocab = meta['vocab']
+        table._lookup = {k: {v: i for i, v in enumerate(vocab)}
+                         for k, vocab in table.vocab.items()}
+        table.extra = {k: dict((r, v) for r, v in e)
+                       for k, e in meta['extra'].items()}
+        for k, r in meta['missing']:
+            table.extra.setdefault(k, {})[r] = _MISSING
+
+        return table
+
+
+class SiteRow(abc.MutableMapping):
+    """A dictionary-like view of one site (row) of a SiteTable. Reading
+    the position or the normal vector returns a view into the table, 
+    so that in-place operations change the site, as for the site 
+    dictionaries. The arrays of the table are reallocated when sites
+    are appended to it, after which such views no longer change the 
+    site, so they should not be kept across appends. Copying a view 
+    returns a plain dictionary.
+
+    Parameters
+    ----------
+    table : acat.utilities.SiteTable object
+        The table that stores the site.
+
+    row : int
+        The row of the site in the table.
+
+    """
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.table.get_value(self.row, key)
+
+    def __setitem__(self, key, value):
+        self.table.set_value(self.row, key, value)
+
+    def __delitem__(self, key):
+        self.table.del_value(self.row, key)
+
+    def __iter__(self):
+        return iter(self.table.row_keys(self.row))
+
+    def __len__(self):
+        return len(self.table.row_keys(self.row))
+
+    def __contains__(self, key):
+        try:
+            self.table.get_value(self.row, key)
+        except KeyError:
+            return False
+        return True
+
+    def __eq__(self, other):
+        if isinstance(other, SiteRow) and other.table is self.table:
+            return other.row == self.row
+        if not isinstance(other, abc.Mapping):
+            return NotImplemented
+        if set(self.keys()) != set(other.keys()):
+            return False
+        for k, v in self.items():
+            w = other[k]
+            if isinstance(v, np.ndarray) or isinstance(w, np.ndarray):
+                if not np.array_equal(v, w):
+                    return False
+            elif v != w:
+                return False
+        return True
+
+    __hash__ = None
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return (SiteRow, (self.table, self.row))
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        # Rows copied together with their table stay views
+        table = memo.get(id(self.table))
+        if table is not None:
+            return SiteRow(table, self.row)
+
+        return deepcopy(dict(self), memo)
+
+
+class SiteList(list):
+    """A list of adsorption sites with a hash index from the sorted 
+    atom indices of each site to its position in the list, so that 
+    find costs O(1). The sites are usually SiteRow views of one 
+    SiteTable (see from_sites), but plain dictionaries are accepted as 
+    well. Slicing or filtering returns plain lists of the same sites.
+
+    Parameters
+    ----------
+    sites : list of dicts or SiteRows, default ()
+        The sites. The sites are not copied.
+
+    """
+
+    def __init__(self, sites=()):
+        super().__init__(sites)
+        self._index = None
+        self._version = 0
+
+    @classmethod
+    def from_sites(cls, sites):
+        """Copy the sites into a new SiteTable and return a SiteList
+        of views of its rows."""
+
+        sites = list(sites)
+        tables = {id(s.table): s.table for s in sites 
+                  if isinstance(s, SiteRow)}
+        if len(tables) == 1 and all(isinstance(s, SiteRow) for s in sites):
+            table = next(iter(tables.values())).take([s.row for s in sites])
+        else:
+            table = SiteTable()
+            table.extend(sites)
+
+        return cls(SiteRow(table, i) for i in range(len(sites)))
+
+    @property
+    def table(self):
+        """The SiteTable of the sites, or None if the sites are not 
+        all views of one table."""
+
+        table = None
+        for s in self:
+            if not isinstance(s, SiteRow):
+                return None
+            if table is None:
+                table = s.table
+            elif s.table is not table:
+                return None
+
+        return table
+
+    def find(self, indices):
+        """Get the first site with the given sorted atom indices, or
+        None if there is no such site.
+
+        Parameters
+        ----------
+        indices : tuple
+            The sorted indices of the atoms that contribute to the site.
+
+        """
+
+        indices = tuple(indices)
+        if self._index is not None:
+            index, table, version = self._index
+            # The atom indices of a row can be rewritten in place
+            if table is not None and table._indices_version != version:
+                self._index = None
+        if self._index is None:
+            index = {}
+            for i, s in enumerate(self):
+                index.setdefault(s['indices'], i)
+            table = self.table
+            self._index = (index, table, None if table is None else 
+                           table._indices_version)
+        i = index.get(indices)
+        if table is None and (i is None or self[i]['indices'] != indices):
+            # Changes of plain dictionaries are not tracked, so the hit 
+            # is checked and the sites are searched again after a miss
+            stale = i is not None
+            i = next((i for i, s in enumerate(self) 
+                      if s['indices'] == indices), None)
+            if stale or i is not None:
+                self._index = None
+
+        return None if i is None else self[i]
+
+    def get_positions(self):
+        """Get the positions of all sites as an array."""
+
+        table = self.table
+        if table is not None:
+            return table.positions[[s.row for s in self]]
+
+        return np.asarray([s['position'] for s in self]).reshape(-1, 3)
+
+    def _changed(self):
+        self._index = None
+        self._version += 1
+
+    def __reduce__(self):
+        return (SiteList, (list(self),))
+
+    def __copy__(self):
+        return SiteList(self)
+
+    def __deepcopy__(self, memo):
+        if self.table is not None:
+            new = SiteList.from_sites(self)
+        else:
+            new = SiteList.from_sites(deepcopy(dict(s), memo) for s in self)
+        memo[id(self)] = new
+
+        return new
+
+    def __setitem__(self, *args):
+        super().__setitem__(*args)
+        self._changed()
+
+    def __delitem__(self, *args):
+        super().__delitem__(*args)
+        self._changed()
+
+    def __iadd__(self, other):
+        self._changed()
+        return super().__iadd__(other)
+
+    def __imul__(self, other):
+        self._changed()
+        return super().__imul__(other)
+
+    def append(self, site):
+        super().append(site)
+        self._changed()
+
+    def extend(self, sites):
+        super().extend(sites)
+        self._changed()
+
+    def insert(self, i, site):
+        super().insert(i, site)
+        self._changed()
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def remove(self, site):
+        super().remove(site)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
 def get_close_atoms(atoms, cutoff=0.5, mic=False, delete=False):
     """Get a list of close atoms and delete one set of them if requested.
     Identify all atoms that lie within the cutoff radius of each other.
@@ -299,16 +1712,8 @@ def get_close_atoms(atoms, cutoff=0.5, mic=False, delete=False):
 
     """
 
-    res = np.asarray(list(combinations(np.asarray(range(len(atoms))),2)))
-    indices1, indices2 = res[:, 0], res[:, 1]
-    p1, p2 = atoms.positions[indices1], atoms.positions[indices2]                      
-    if mic:
-        _, dists = find_mic(p2 - p1, atoms.cell, pbc=True)
-    else:
-        dists = np.linalg.norm(p2 - p1, axis=1) 
-
-    dup = np.nonzero(dists < cutoff)
-    rem = np.array(_row_col_from_pdist(len(atoms), dup[0]))
+    i, j, _ = get_neighbor_pairs(atoms, cutoff, mic=mic, pbc=True)
+    rem = np.stack((i[i < j], j[i < j]), axis=1)
     if delete:
         if rem.size != 0:
             del atoms[rem[:, 0]]
@@ -334,18 +1739,13 @@ def atoms_too_close(atoms, cutoff=0.5, mic=False):
 
     """
 
-    res = np.asarray(list(combinations(np.asarray(range(len(atoms))), 2)))
-    indices1, indices2 = res[:, 0], res[:, 1]
-    p1, p2 = atoms.positions[indices1], atoms.positions[indices2]
-    if mic:
-        _, dists = find_mic(p2 - p1, atoms.cell, pbc=True)
-    else:
-        dists = np.linalg.norm(p2 - p1, axis=1)
+    i, _, _ = get_neighbor_pairs(atoms, cutoff, mic=mic, pbc=True)
 
-    return any(dists < cutoff)
+    return len(i) > 0
 
 
-def atoms_too_close_after_addition(atoms, n_added, cutoff=1.5, mic=False): 
+def atoms_too_close_after_addition(atoms, n_added, cutoff=1.5, mic=False,
+                                   hash_grid=None): 
     """Check if there are atoms that are too close to each other after 
     adding some new atoms.
 
@@ -365,17 +1765,22 @@ def atoms_too_close_after_addition(atoms, n_added, cutoff=1.5, mic=False):
         Whether to apply minimum image convention. Remember to set 
         mic=True for periodic systems.
 
+    hash_grid : acat.utilities.PeriodicHashGrid object, default None
+        A persistent hash grid of the atoms to compare with. If provided,
+        only the last n_added atoms of the atoms object are used, and 
+        they are compared with the points in the grid instead of the 
+        other atoms. Useful for keeping one grid of the existing 
+        adsorbate atoms for a structure, so that the old atoms need not 
+        be sliced and rebuilt for every addition.
+
     """
 
-    newp, oldp = atoms.positions[-n_added:], atoms.positions[:-n_added]
-    newps = np.repeat(newp, len(oldp), axis=0)
-    oldps = np.tile(oldp, (n_added, 1))
-    if mic:
-        _, dists = find_mic(newps - oldps, atoms.cell, pbc=True)
-    else:
-        dists = np.linalg.norm(newps - oldps, axis=1)
+    newp = atoms.positions[len(atoms)-n_added:]
+    if hash_grid is None:
+        hash_grid = PeriodicHashGrid.from_atoms(atoms, np.arange(len(atoms)
+                                                - n_added), mic, cutoff)
 
-    return any(dists < cutoff)
+    return hash_grid.any_within(newp, cutoff)
 
 
 def get_angle_between(v1, v2):
@@ -582,14 +1987,16 @@ def dag_from_ucg(adj_matrix, sources, return_depths=False):
     """Takes the adjacency matrix of an undirected cyclic graph
     (UCG) and the indices of the starting nodes, returns an 
     adjacency list represeting the corresponding shortest-paths 
-    directed acyclic graph (DAG).
+    directed acyclic graph (DAG). The adjacency matrix is converted
+    to a scipy.sparse CSR matrix to get the neighbors of each node.
 
     Parameters
     ----------
-    adj_matrix : np.ndarray or list of lists
-        The adjacency matrix of the UCG.
+    adj_matrix : np.ndarray or scipy.sparse matrix
+        The adjacency matrix of the UCG. Any input accepted by 
+        scipy.sparse.csr_matrix (e.g. a nested list) works as well.
 
-    sources : list of strs
+    sources : list of ints
         The indices of the starting nodes for the DAG.
 
     return_depths : bool, default False
@@ -599,8 +2006,7 @@ def dag_from_ucg(adj_matrix, sources, return_depths=False):
     """
 
     # Get the indices of the nearest neighbors for each atom
-    adj_list = [[target for target, is_connected in enumerate(row) 
-                 if is_connected] for row in adj_matrix]
+    adj_list = get_adj_list(adj_matrix)
     sources = set(sources)
     frontier = sources.copy()
     depths = []
@@ -662,6 +2068,7 @@ def draw_graph(G, savefig='graph.png', layout='spring', *args, **kwargs):
     """
 
     import matplotlib.pyplot as plt
+    import networkx as nx
     labels = nx.get_node_attributes(G, 'symbol')
     
     # Get unique groups
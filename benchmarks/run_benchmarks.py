@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Micro-benchmark suite for the main stages of ACAT.
+
+Each benchmark is timed (best of several repeats with the caches of
+ACAT cleared, and once more on warm caches) and memory-profiled (peak
+allocation traced by tracemalloc in a separate run) over a range of
+system sizes. The results are written as JSON together with the
+log-log scaling exponent of the wall time with respect to the number
+of atoms for each benchmark group, so that runs can be compared with
+each other to catch scaling regressions.
+
+Usage
+-----
+    python benchmarks/run_benchmarks.py                     # quick sizes
+    python benchmarks/run_benchmarks.py --preset full       # 100-20k atoms
+    python benchmarks/run_benchmarks.py --suites slab neighbor
+    python benchmarks/run_benchmarks.py -o new.json --compare old.json
+    python benchmarks/run_benchmarks.py --suites import   # startup time
+
+The import suite times the import of each ACAT module in a fresh
+interpreter on top of numpy and ASE, and fails (exit status 1) if any
+module exceeds IMPORT_TARGET or loads one of the HEAVY_MODULES.
+
+"""
+from acat.adsorption_sites import (ClusterAdsorptionSites,
+                                   SlabAdsorptionSites)
+from acat.adsorbate_coverage import (ClusterAdsorbateCoverage,
+                                     SlabAdsorbateCoverage)
+from acat.build.adlayer import min_dist_coverage_pattern
+from acat.ga.graph_comparators import WLGraphComparator
+from acat.kernels.wl_kernel import WL
+from acat.utilities import neighbor_shell_list
+from acat import __version__
+import acat
+from ase.build import (fcc100, fcc111, fcc110, fcc211, bcc100, bcc110,
+                       hcp0001, hcp10m10, surface, bulk)
+from ase.cluster import Octahedron, Icosahedron, Decahedron
+from ase.atoms import Atoms
+import numpy as np
+import ase
+import scipy
+import networkx as nx
+import tracemalloc
+import argparse
+import platform
+import subprocess
+import warnings
+import random
+import json
+import time
+import gc
+import os
+import sys
+warnings.filterwarnings('ignore')
+
+
+# Target system sizes of each preset. Clusters are given as the
+# approximate number of atoms, slabs as the n of the n x n supercell
+PRESETS = {'quick': {'cluster': [100, 300, 1000],
+                     'slab': [2, 4, 8],
+                     'repeat': 3},
+           'full': {'cluster': [100, 300, 1000, 3000, 10000, 20000],
+                    'slab': [2, 4, 8, 12, 16],
+                    'repeat': 5}}
+
+CLUSTER_BUILDERS = {'Octahedron': lambda n: Octahedron('Pt', n, 1),
+                    'Icosahedron': lambda n: Icosahedron('Pt', n),
+                    'Decahedron': lambda n: Decahedron('Pt', n, n, 0)}
+
+# Surfaces with an ASE builder use 4 layers, the others are cut from
+# the bulk with 6 layers so that the bulk atoms can be identified
+SLAB_BUILDERS = {'fcc100': ('Cu', fcc100), 'fcc111': ('Cu', fcc111),
+                 'fcc110': ('Cu', fcc110), 'fcc211': ('Cu', fcc211),
+                 'fcc221': ('Cu', 'fcc', (2, 2, 1)),
+                 'fcc311': ('Cu', 'fcc', (3, 1, 1)),
+                 'fcc322': ('Cu', 'fcc', (3, 2, 2)),
+                 'fcc331': ('Cu', 'fcc', (3, 3, 1)),
+                 'fcc332': ('Cu', 'fcc', (3, 3, 2)),
+                 'bcc100': ('Fe', bcc100), 'bcc110': ('Fe', bcc110),
+                 'bcc111': ('Fe', 'bcc', (1, 1, 1)),
+                 'bcc210': ('Fe', 'bcc', (2, 1, 0)),
+                 'bcc211': ('Fe', 'bcc', (2, 1, 1)),
+                 'bcc310': ('Fe', 'bcc', (3, 1, 0)),
+                 'hcp0001': ('Ru', hcp0001), 'hcp10m10t': ('Ru', hcp10m10),
+                 'hcp10m10h': ('Ru', 'hcp', (1, 0, 0)),
+                 'hcp10m11': ('Ru', 'hcp', (1, 0, 1)),
+                 'hcp10m12': ('Ru', 'hcp', (1, 0, 2))}
+
+# Modules timed by the import suite, the maximum import time (in seconds)
+# of each on top of numpy and ASE, and the dependencies that should only
+# be loaded when the feature that needs them is used
+IMPORT_MODULES = ['acat', 'acat.settings', 'acat.utilities', 'acat.build',
+                  'acat.adsorption_sites', 'acat.adsorbate_coverage',
+                  'acat.build.adlayer', 'acat.build.ordering',
+                  'acat.ga.graph_comparators', 'acat.kernels.wl_kernel']
+IMPORT_TARGET = .05
+HEAVY_MODULES = ['networkx', 'scipy.spatial', 'scipy.sparse', 'ase.optimize',
+                 'ase.constraints', 'ase.io', 'multiprocessing.pool']
+
+_IMPORT_SCRIPT = '''import numpy, ase, time, sys, os, json
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+print(json.dumps([dt, [m for m in {heavy!r} if m in sys.modules]]))
+sys.stdout.flush()
+os._exit(0)
+'''
+
+COVERAGES = {'low': 5., 'high': 2.}
+
+
+def get_cluster(shape, target_natoms):
+    """Build the smallest cluster of a given shape with at least
+    target_natoms atoms."""
+
+    n = 3
+    while True:
+        atoms = Atoms(CLUSTER_BUILDERS[shape](n))
+        if len(atoms) >= target_natoms:
+            return atoms
+        n += 1
+
+
+def get_slab(surf, n):
+    """Build an n x n surface slab of a given surface type."""
+
+    spec = SLAB_BUILDERS[surf]
+    if len(spec) == 2:
+        symbol, builder = spec
+        size = (max(3, n - n % 3), n, 4) if surf == 'fcc211' else (n, n, 4)
+        return builder(symbol, size, vacuum=5.)
+
+    symbol, structure, miller = spec
+    if structure == 'hcp':
+        blk = bulk(symbol, 'hcp', a=2.706, c=4.282)
+    else:
+        blk = bulk(symbol, structure, cubic=True)
+
+    return surface(blk, miller, 6, vacuum=5.).repeat((n, n, 1))
+
+
+def clear_caches():
+    """Clear the module-level caches of the site objects (the geometry
+    skeletons, the surrogate reference slabs and the slab templates),
+    which otherwise survive between repeats."""
+
+    from acat import adsorption_sites
+    for cache in [adsorption_sites._skeletons,
+                  adsorption_sites._reference_slabs,
+                  adsorption_sites._slab_templates]:
+        cache.clear()
+
+
+def measure(func, repeat):
+    """Return the best wall time over repeats with the caches cleared
+    before each repeat, the best wall time of the same calls repeated
+    on warm caches, and the peak traced allocation of one extra cold
+    run. func is called with no arguments."""
+
+    times, warm_times = [], []
+    for _ in range(repeat):
+        clear_caches()
+        gc.collect()
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+        gc.collect()
+        t0 = time.perf_counter()
+        func()
+        warm_times.append(time.perf_counter() - t0)
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'wall_time': min(times), 'mean_wall_time': float(np.mean(times)),
+            'warm_wall_time': min(warm_times), 'peak_memory': peak}
+
+
+def run_case(results, group, params, natoms, func, repeat):
+    """Measure one benchmark case and append the record to results."""
+
+    record = {'group': group, 'params': params, 'natoms': natoms}
+    try:
+        record.update(measure(func, repeat))
+    except Exception as e:
+        record['error'] = '{}: {}'.format(type(e).__name__, e)
+    results.append(record)
+    msg = record.get('error', '{:.4f} s ({:.4f} s warm), {:.1f} MiB'.format(
+                     record.get('wall_time', 0.),
+                     record.get('warm_wall_time', 0.),
+                     record.get('peak_memory', 0) / 2**20))
+    print('{:<28} {:<40} {:>6} atoms  {}'.format(group, json.dumps(params),
+          natoms, msg), flush=True)
+
+
+def bench_cluster(results, preset):
+    for shape in CLUSTER_BUILDERS:
+        for target in preset['cluster']:
+            atoms = get_cluster(shape, target)
+            run_case(results, 'ClusterAdsorptionSites', {'shape': shape},
+                     len(atoms), lambda: ClusterAdsorptionSites(atoms),
+                     preset['repeat'])
+
+
+def bench_slab(results, preset):
+    for surf in SLAB_BUILDERS:
+        for n in preset['slab']:
+            atoms = get_slab(surf, n)
+            run_case(results, 'SlabAdsorptionSites', {'surface': surf,
+                     'size': n}, len(atoms), lambda: SlabAdsorptionSites(
+                     atoms, surface=surf), preset['repeat'])
+
+
+def get_covered_structures(preset):
+    """Yield (params, atoms, adsorption_sites) of the structures covered
+    with adsorbates at low and high coverage."""
+
+    for target in preset['cluster']:
+        clean = get_cluster('Octahedron', target)
+        sas = ClusterAdsorptionSites(clean)
+        for cov, dist in COVERAGES.items():
+            random.seed(0)
+            atoms = min_dist_coverage_pattern(clean.copy(), ['CO', 'OH', 'H'],
+                                              adsorption_sites=sas,
+                                              min_adsorbate_distance=dist)
+            yield {'system': 'Octahedron', 'coverage': cov}, atoms, sas
+    for n in preset['slab']:
+        clean = get_slab('fcc111', n)
+        sas = SlabAdsorptionSites(clean, surface='fcc111')
+        for cov, dist in COVERAGES.items():
+            random.seed(0)
+            atoms = min_dist_coverage_pattern(clean.copy(), ['CO', 'OH', 'H'],
+                                              adsorption_sites=sas,
+                                              surface='fcc111',
+                                              min_adsorbate_distance=dist)
+            yield {'system': 'fcc111', 'coverage': cov}, atoms, sas
+
+
+def bench_coverage(results, preset):
+    for params, atoms, sas in get_covered_structures(preset):
+        if True in atoms.pbc:
+            func = lambda: SlabAdsorbateCoverage(atoms, sas)
+            group = 'SlabAdsorbateCoverage'
+        else:
+            func = lambda: ClusterAdsorbateCoverage(atoms, sas)
+            group = 'ClusterAdsorbateCoverage'
+        run_case(results, group, params, len(atoms), func, preset['repeat'])
+
+
+def bench_neighbor(results, preset):
+    systems = [({'system': 'Octahedron'}, get_cluster('Octahedron', t))
+               for t in preset['cluster']]
+    systems += [({'system': 'fcc111'}, get_slab('fcc111', n))
+                for n in preset['slab']]
+    for params, atoms in systems:
+        for nn in [1, 2]:
+            run_case(results, 'neighbor_shell_list', dict(params,
+                     neighbor_number=nn), len(atoms), lambda:
+                     neighbor_shell_list(atoms, dx=0.3, neighbor_number=nn,
+                     mic=(True in atoms.pbc)), preset['repeat'])
+
+
+def bench_graph(results, preset):
+    comp = WLGraphComparator(hmax=2)
+    wl = WL(n_jobs=1)
+    pairs = {}
+    for params, atoms, _ in get_covered_structures(preset):
+        pairs.setdefault((params['system'], len(atoms) // 1000), []).append(
+                         (params, atoms))
+    for group in pairs.values():
+        for params, atoms in group:
+            run_case(results, 'WLGraphComparator.looks_like', params,
+                     len(atoms), lambda: comp.looks_like(atoms, atoms),
+                     preset['repeat'])
+            images = [atoms] * 4
+            run_case(results, 'WL.__call__', dict(params, nimages=4),
+                     len(atoms), lambda: wl(images), preset['repeat'])
+
+
+def time_import(module, repeat):
+    """Return the best import time of a module in fresh interpreters
+    with numpy and ASE already imported, and the heavy modules that
+    the import loaded."""
+
+    # Run from the directory containing the benchmarked acat, which
+    # then comes first on the path of the interpreter
+    root = os.path.dirname(os.path.dirname(os.path.abspath(acat.__file__)))
+    script = _IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', script], cwd=root,
+                             stdout=subprocess.PIPE, check=True).stdout
+        dt, loaded = json.loads(out.decode().strip().splitlines()[-1])
+        times.append(dt)
+
+    return {'wall_time': min(times), 'mean_wall_time': float(np.mean(times)),
+            'loaded': loaded}
+
+
+def bench_import(results, preset):
+    for module in IMPORT_MODULES:
+        record = {'group': 'import', 'params': {'module': module},
+                  'natoms': 0}
+        try:
+            record.update(time_import(module, preset['repeat']))
+        except Exception as e:
+            record['error'] = '{}: {}'.format(type(e).__name__, e)
+        results.append(record)
+        msg = record.get('error', '{:.4f} s{}'.format(record.get(
+                         'wall_time', 0.), ''.join(', loads ' + m for m in
+                         record.get('loaded', []))))
+        print('{:<28} {:<40} {:>6}        {}'.format('import', module, '-',
+              msg), flush=True)
+
+
+def check_import_target(results):
+    """Print the modules that miss the startup-time target. Returns
+    the number of misses."""
+
+    nmiss = 0
+    for r in results:
+        if r['group'] != 'import' or 'error' in r:
+            continue
+        if r['wall_time'] > IMPORT_TARGET or r['loaded']:
+            nmiss += 1
+            print('Missed import target: {} {:.4f} s (target {} s){}'.format(
+                  r['params']['module'], r['wall_time'], IMPORT_TARGET,
+                  ''.join(', loads ' + m for m in r['loaded'])))
+
+    return nmiss
+
+
+SUITES = {'cluster': bench_cluster, 'slab': bench_slab,
+          'coverage': bench_coverage, 'neighbor': bench_neighbor,
+          'graph': bench_graph, 'import': bench_import}
+
+
+def get_scaling(results):
+    """Fit the log-log slope of the wall time against the number of
+    atoms for every benchmark group and parameter set except size."""
+
+    curves = {}
+    for r in results:
+        if 'error' in r or not r['natoms']:
+            continue
+        params = {k: v for k, v in r['params'].items() if k != 'size'}
+        key = '{} {}'.format(r['group'], json.dumps(params, sort_keys=True))
+        curves.setdefault(key, []).append((r['natoms'], r['wall_time']))
+    scaling = {}
+    for key, pts in curves.items():
+        pts = sorted(set(pts))
+        if len({p[0] for p in pts}) < 2:
+            continue
+        x, y = np.log([p[0] for p in pts]), np.log([p[1] for p in pts])
+        scaling[key] = {'exponent': float(np.polyfit(x, y, 1)[0]),
+                        'natoms': [p[0] for p in pts],
+                        'wall_time': [p[1] for p in pts]}
+
+    return scaling
+
+
+def compare(results, reference, threshold):
+    """Print the cases that became slower than threshold times the
+    reference. Returns the number of regressions."""
+
+    def key(r):
+        return (r['group'], json.dumps(r['params'], sort_keys=True),
+                r['natoms'])
+
+    ref = {key(r): r for r in reference['results'] if 'error' not in r}
+    nreg = 0
+    for r in results:
+        k = key(r)
+        if k not in ref or 'error' in r:
+            continue
+        ratio = r['wall_time'] / ref[k]['wall_time']
+        if ratio > threshold:
+            nreg += 1
+            print('Regression: {} {} {} atoms: {:.2f}x slower'.format(*k, ratio))
+
+    return nreg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--preset', choices=list(PRESETS), default='quick')
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES),
+                        default=list(SUITES))
+    parser.add_argument('--repeat', type=int, default=None)
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help='a previous JSON '
+                        'output to compare the wall times with')
+    parser.add_argument('--threshold', type=float, default=1.5, help=
+                        'slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    preset = dict(PRESETS[args.preset])
+    if args.repeat is not None:
+        preset['repeat'] = args.repeat
+    results = []
+    for suite in args.suites:
+        SUITES[suite](results, preset)
+
+    output = {'metadata': {'acat': __version__, 'ase': ase.__version__,
+                           'numpy': np.__version__,
+                           'scipy': scipy.__version__,
+                           'networkx': nx.__version__,
+                           'python': platform.python_version(),
+                           'platform': platform.platform(),
+                           'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                           'preset': args.preset, 'suites': args.suites},
+              'results': results,
+              'scaling': get_scaling(results)}
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=1)
+    for key, s in output['scaling'].items():
+        print('{:<80} exponent {:.2f}'.format(key, s['exponent']))
+
+    status = 0
+    if check_import_target(results):
+        status = 1
+    if args.compare is not None:
+        with open(args.compare) as f:
+            reference = json.load(f)
+        if compare(results, reference, args.threshold):
+            status = 1
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,3 +13,107 @@ cas = ClusterAdsorptionSites(atoms, allow_6fold=False,
 site = cas.get_sites()
 assert len(site) == 674
 
+
+# The sites of a truncated octahedron are grouped by its 8 (111) and 6
+# (100) facets
+from acat.adsorption_sites import group_sites_by_facet
+
+facet_ids = cas.get_facet_ids()
+assert len(set(facet_ids[facet_ids >= 0])) == 14
+for site, nfacets in [('fcc', 8), ('4fold', 6)]:
+    sites = [s for s in cas.site_list if s['site'] == site]
+    groups = group_sites_by_facet(atoms, sites, cas)
+    assert len(groups) == nfacets
+    assert sum(len(g) for g in groups.values()) == len(sites)
+
+
+# The sites saved to a file are loaded back unchanged
+import os
+import tempfile
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    filename = os.path.join(tmpdir, 'sites.npz')
+    cas.save(filename)
+    loaded = ClusterAdsorptionSites.load(filename)
+assert len(loaded.site_list) == len(cas.site_list)
+assert all(s1 == s2 for s1, s2 in zip(loaded.site_list, cas.site_list))
+assert loaded.get_neighbor_site_list() == cas.get_neighbor_site_list()
+
+
+# The sites enumerated in parallel are the same as the serial ones
+from acat.adsorption_sites import enumerate_adsorption_sites
+from acat.adsorption_sites import enumerate_adsorption_sites_batch
+import numpy as np
+
+rng = np.random.RandomState(0)
+images = []
+for _ in range(3):
+    image = atoms.copy()
+    image.symbols = rng.choice(['Ni', 'Pt'], len(atoms))
+    images.append(image)
+kwargs = {'composition_effect': True, 'surrogate_metal': 'Ni'}
+serial = [enumerate_adsorption_sites(image, **kwargs) for image in images]
+for share_geometry in [False, True]:
+    batch = list(enumerate_adsorption_sites_batch(images, n_jobs=2, 
+                 share_geometry=share_geometry, **kwargs))
+    assert len(batch) == len(serial)
+    for sites1, sites2 in zip(batch, serial):
+        assert len(sites1) == len(sites2)
+        assert all(s1 == s2 for s1, s2 in zip(sites1, sites2))
+
+
+# The sites found on the symmetry-distinct part of a nanoparticle and
+# mapped by its point group are the same as those found on all atoms
+from ase.cluster import Icosahedron
+
+def get_sorted_sites(cas):
+    return sorted(cas.site_list, key=lambda s: s['indices'])
+
+icosa = Icosahedron('Pt', 4)
+icosa.center(vacuum=5.)
+core = np.linalg.norm(icosa.positions - icosa.positions.mean(0), axis=1) < 4.
+icosa.symbols[core] = 'Cu'
+for kwargs in [{}, {'composition_effect': True, 'label_sites': True}]:
+    sites1 = get_sorted_sites(ClusterAdsorptionSites(icosa, use_symmetry=True,
+                                                     **kwargs))
+    sites2 = get_sorted_sites(ClusterAdsorptionSites(icosa, **kwargs))
+    assert len(sites1) == len(sites2)
+    for s1, s2 in zip(sites1, sites2):
+        assert set(s1.keys()) == set(s2.keys())
+        for k in s1:
+            if k in ['position', 'normal']:
+                assert np.allclose(s1[k], s2[k], atol=1e-5)
+            else:
+                assert s1[k] == s2[k]
+
+
+# Reusing a neighbor list with a skin distance along a trajectory gives
+# the same sites and occupation as searching the neighbors every time
+from acat.adsorbate_coverage import ClusterAdsorbateCoverage
+from acat.utilities import VerletNeighborList
+from acat.build import add_adsorbate_to_site
+
+octa = Octahedron('Cu', 5, 1)
+octa.center(vacuum=5.)
+for s in ClusterAdsorptionSites(octa).get_sites()[:6:2]:
+    add_adsorbate_to_site(octa, 'OH', s)
+snl, cnl = VerletNeighborList(), VerletNeighborList()
+for _ in range(5):
+    octa.positions += rng.normal(0, .01, octa.positions.shape)
+    cas1 = ClusterAdsorptionSites(octa)
+    cas2 = ClusterAdsorptionSites(octa, neighbor_list=snl)
+    sites1, sites2 = get_sorted_sites(cas1), get_sorted_sites(cas2)
+    assert [s['indices'] for s in sites1] == [s['indices'] for s in sites2]
+    assert np.allclose([s['position'] for s in sites1], 
+                       [s['position'] for s in sites2])
+    cac1 = ClusterAdsorbateCoverage(octa, cas1)
+    cac2 = ClusterAdsorbateCoverage(octa, cas2, neighbor_list=cnl)
+    assert cac1.get_occupied_labels() == cac2.get_occupied_labels()
+    assert cac1.ads_list == cac2.ads_list
+assert snl.nbuilds < 5
+
+# The neighbor list of the site object grows when the neighbors are
+# requested beyond its cutoff
+nbs = cas2.nblist.get_neighbors(0, 6.)[0]
+dists = cas2.ref_atoms.get_distances(0, range(len(cas2.ref_atoms)))
+assert sorted(nbs) == [i for i in np.flatnonzero(dists < 6.) if i != 0]
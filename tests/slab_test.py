@@ -15,3 +15,253 @@ sac = SlabAdsorbateCoverage(atoms, surface='fcc211',
 occupied_sites = sac.get_sites(occupied_only=True)
 assert len(occupied_sites) == 2
 
+
+# The neighbor pairs found with the cell list are those of all the 
+# (minimum image) distances
+from acat.utilities import get_neighbor_pairs
+from ase.build import fcc111
+import numpy as np
+
+rng = np.random.RandomState(42)
+atoms = fcc111('Pt', (3, 3, 4), vacuum=5.)
+atoms.rattle(.1, rng=rng)
+for mic in [False, True]:
+    i, j, d = get_neighbor_pairs(atoms, 4., mic=mic)
+    dists = atoms.get_all_distances(mic=mic)
+    np.fill_diagonal(dists, np.inf)
+    ii, jj = np.nonzero(dists < 4.)
+    assert (i == ii).all() and (j == jj).all()
+    assert np.allclose(d, dists[ii, jj])
+
+
+# The graph of a sparse adjacency matrix keeps the edge weights
+from acat.utilities import graph_from_adj_matrix
+from scipy.sparse import csr_matrix
+
+A = np.array([[0, 2, 0], [2, 0, 1], [0, 1, 0]])
+for adj_matrix in [A, csr_matrix(A)]:
+    G = graph_from_adj_matrix(adj_matrix)
+    assert sorted(G.edges(data='weight')) == [(0, 1, 2), (1, 2, 1)]
+
+
+# The batched minimum image vectors are those of get_mic, also for a 
+# slab without vacuum whose cell has no height
+from acat.utilities import get_mic, get_mic_batch
+
+atoms = fcc111('Pt', (3, 3, 3), vacuum=5.)
+vecs = np.asarray([get_mic(p, atoms.positions[4], atoms.cell) 
+                   for p in atoms.positions])
+assert np.allclose(get_mic_batch(atoms.positions, atoms.positions[4],
+                                 atoms.cell), vecs)
+atoms = fcc111('Pt', (3, 3, 3))
+assert np.allclose(get_mic_batch(atoms.positions, atoms.positions[4],
+                                 atoms.cell), vecs)
+
+
+# The hash grid queries give the minimum image distances to the points
+# that are still in the grid
+from acat.utilities import PeriodicHashGrid
+from ase.geometry import find_mic
+
+atoms = fcc111('Pt', (3, 3, 4), vacuum=5.)
+atoms.rattle(.1, rng=rng)
+grid = PeriodicHashGrid.from_atoms(atoms, mic=True)
+grid.delete(range(0, len(atoms), 3))
+kept = np.asarray([k for k in range(len(atoms)) if k % 3])
+for p in rng.rand(10, 3) @ atoms.cell:
+    keys, d = grid.query(p, 4.)
+    dists = find_mic(atoms.positions[kept] - p, atoms.cell, atoms.pbc)[1]
+    assert (keys == kept[dists < 4.]).all()
+    assert np.allclose(d, dists[dists < 4.])
+    assert grid.any_within([p], 4.) == (dists < 4.).any()
+
+
+# Finding a site by its atom indices follows the indices written 
+# through the rows
+sas = SlabAdsorptionSites(fcc111('Pt', (3, 3, 4), vacuum=5.), 'fcc111')
+old = sas.site_list[0]['indices']
+assert sas.site_list.find(old) == sas.site_list[0]
+sas.site_list[0]['indices'] = (35,)
+assert sas.site_list.find(old) is None
+assert sas.site_list.find((35,)) == sas.site_list[0]
+
+
+# The sites relabeled from the cached geometry of another chemical 
+# ordering are the same as the sites identified from scratch
+def get_keys(sas):
+    return sorted((s['site'], s['indices'], str(s['composition']), 
+                   str(s['subsurf_element']), s['morphology'], 
+                   str(s['label'])) for s in sas.site_list)
+
+kwargs = {'composition_effect': True, 'label_sites': True}
+atoms = fcc111('Pt', (3, 3, 4), vacuum=5.)
+SlabAdsorptionSites(atoms, 'fcc111', reuse_geometry=True, **kwargs)
+atoms.symbols[rng.rand(len(atoms)) < .5] = 'Au'
+sas1 = SlabAdsorptionSites(atoms, 'fcc111', reuse_geometry=True, **kwargs)
+sas2 = SlabAdsorptionSites(atoms, 'fcc111', **kwargs)
+assert get_keys(sas1) == get_keys(sas2)
+
+
+# Updating the sites after the atoms moved shifts the sites in place
+sas = SlabAdsorptionSites(fcc111('Pt', (3, 3, 4), vacuum=5.), 'fcc111')
+site_list = sas.site_list
+positions = np.asarray([s['position'] for s in site_list])
+normals = np.asarray([s['normal'] for s in site_list])
+atoms = sas.atoms.copy()
+atoms.positions += [.1, .2, .3]
+sas.update(atoms)
+assert sas.site_list is site_list
+assert np.allclose([s['position'] for s in site_list], positions + 
+                   [.1, .2, .3])
+assert np.allclose([s['normal'] for s in site_list], normals)
+
+
+# The memoized neighbor site list follows in-place changes of the sites
+sas = SlabAdsorptionSites(fcc111('Pt', (3, 3, 4), vacuum=5.), 'fcc111')
+nbslist = sas.get_neighbor_site_list()
+sas.site_list.sort(key=lambda s: -s['position'][0])
+assert sas.get_neighbor_site_list() != nbslist
+sas.site_list[0]['position'] += [1., 0., 0.]
+nbslist = sas.get_neighbor_site_list()
+sas.__dict__.pop('_neighbor_site_lists')
+assert sas.get_neighbor_site_list() == nbslist
+
+
+# The sites saved to a file are loaded back unchanged
+import os
+import tempfile
+
+atoms = fcc111('Pt', (3, 3, 4), vacuum=5.)
+atoms.symbols[atoms.get_tags() == 1] = 'Au'
+sas = SlabAdsorptionSites(atoms, 'fcc111', composition_effect=True,
+                          label_sites=True)
+with tempfile.TemporaryDirectory() as tmpdir:
+    filename = os.path.join(tmpdir, 'sites.npz')
+    sas.save(filename)
+    loaded = SlabAdsorptionSites.load(filename)
+assert len(loaded.site_list) == len(sas.site_list)
+assert all(s1 == s2 for s1, s2 in zip(loaded.site_list, sas.site_list))
+assert loaded.get_neighbor_site_list() == sas.get_neighbor_site_list()
+
+
+# The sites of 1x1 and 2x2 cells, which are found on an expanded cell,
+# are those of a 3x3 cell per surface unit cell
+from collections import Counter
+
+counts = Counter(s['site'] for s in SlabAdsorptionSites(
+                 fcc111('Pt', (3, 3, 4), vacuum=5.), 'fcc111').site_list)
+for n in [1, 2]:
+    sas = SlabAdsorptionSites(fcc111('Pt', (n, n, 4), vacuum=5.), 'fcc111')
+    assert {k: 9 * v for k, v in Counter(s['site'] for s in 
+            sas.site_list).items()} == {k: n**2 * v for k, v in 
+                                        counts.items()}
+    assert all(max(s['indices']) < len(sas.atoms) for s in sas.site_list)
+
+
+# The bottom sites of a slab are the top sites of the flipped slab
+from ase.build import fcc100
+
+def get_keys(sites):
+    return sorted((s['site'], s['indices'], s['morphology']) 
+                  for s in sites)
+
+atoms = fcc100('Cu', (3, 3, 4), vacuum=5.)
+flipped = atoms.copy()
+flipped.positions[:,2] *= -1
+flipped.center(axis=2)
+sas = SlabAdsorptionSites(atoms, 'fcc100', both_sides=True)
+bottom = [s for s in sas.site_list if s['normal'][2] < 0]
+assert len(bottom) == len(sas.site_list) // 2
+assert get_keys(bottom) == get_keys(SlabAdsorptionSites(
+                                    flipped, 'fcc100').site_list)
+
+
+# The sites tiled from the template of the surface unit cell are the
+# same as the sites from the site search
+from ase.build import bcc110, hcp0001, bulk, surface
+
+def assert_same_sites(sas1, sas2):
+    def get_keys(sas):
+        return sorted((s['site'], s['indices'], str(s['composition']), 
+                       str(s['subsurf_index']), s['morphology'], 
+                       str(s['label'])) 
+                      for s in sas.site_list)
+    def get_positions(sas):
+        return np.asarray([s['position'] for s in sorted(sas.site_list,
+                           key=lambda s: (s['site'], s['indices']))])
+    assert get_keys(sas1) == get_keys(sas2)
+    # Sites on the cell boundary can be given by either periodic image
+    _, d = find_mic(get_positions(sas1) - get_positions(sas2), 
+                    sas1.cell, sas1.pbc)
+    assert d.max() < .01
+
+for atoms, surf, kwargs in [
+    (fcc111('Pt', (3, 3, 4), vacuum=5.), 'fcc111', {}),
+    (bcc110('Fe', (3, 3, 4), vacuum=5.), 'bcc110', {'both_sides': True}),
+    (hcp0001('Ru', (3, 3, 4), vacuum=5.), 'hcp0001', {'both_sides': True}),
+    (surface(bulk('Cu', 'fcc', cubic=True), (3, 1, 1), 6, 
+             vacuum=5.).repeat((3, 3, 1)), 'fcc311', {'both_sides': True}),
+    (fcc100('Cu', (3, 3, 4), vacuum=5.), 'fcc100', {'rattle': True}),
+    (hcp0001('Ru', (3, 3, 4), vacuum=5.), 'hcp0001', {'rattle': True,
+     'both_sides': True}),
+    (fcc111('Pt', (3, 3, 4), vacuum=5.), 'fcc111', {'alloy': True,
+     'composition_effect': True, 'label_sites': True})]:
+    if kwargs.pop('rattle', None):
+        atoms.rattle(.005, rng=rng)
+    if kwargs.pop('alloy', None):
+        atoms.symbols[atoms.get_tags() % 2 == 1] = 'Au'
+    sas1 = SlabAdsorptionSites(atoms, surf, use_template=True, **kwargs)
+    sas2 = SlabAdsorptionSites(atoms, surf, use_template=False, **kwargs)
+    assert_same_sites(sas1, sas2)
+
+
+# The same holds for the sites tiled from the smallest repeating cell
+# of a repeated distorted (e.g. relaxed) cell or ordered alloy
+cell = fcc111('Pt', (2, 2, 4), vacuum=5.)
+cell.rattle(.1, rng=rng)
+alloy = fcc100('Cu', (2, 2, 4), vacuum=5.)
+alloy.symbols[::2] = 'Au'
+for atoms, surf, kwargs in [
+    (cell * (3, 3, 1), 'fcc111', {}),
+    (alloy * (3, 3, 1), 'fcc100', {'composition_effect': True, 
+                                   'label_sites': True}),
+    (alloy * (3, 3, 1), 'fcc100', {'composition_effect': True, 
+                                   'both_sides': True})]:
+    sas1 = SlabAdsorptionSites(atoms, surf, use_template=True, **kwargs)
+    sas2 = SlabAdsorptionSites(atoms, surf, use_template=False, **kwargs)
+    assert_same_sites(sas1, sas2)
+
+
+# The terminations of both sides and the layer of each atom follow 
+# the atomic layers of the slab
+atoms = fcc111('Pt', (3, 3, 4), vacuum=5.)
+sas = SlabAdsorptionSites(atoms, 'fcc111', both_sides=True)
+terminations, layers = sas.get_terminations()
+tags = atoms.get_tags()
+assert terminations['top'] == (np.flatnonzero(tags == 1).tolist(), 
+                               np.flatnonzero(tags == 2).tolist())
+assert terminations['bottom'] == (np.flatnonzero(tags == 4).tolist(), 
+                                  np.flatnonzero(tags == 3).tolist())
+assert (layers == tags - 1).all()
+
+
+# Reusing a neighbor list with a skin distance along a trajectory gives
+# the same sites and occupation as searching the neighbors every time
+from acat.utilities import VerletNeighborList
+from acat.build import add_adsorbate_to_site
+
+atoms = fcc111('Pt', (3, 3, 4), vacuum=5.)
+sas = SlabAdsorptionSites(atoms, 'fcc111')
+for s in sas.get_sites()[:6:2]:
+    add_adsorbate_to_site(atoms, 'CO', s)
+snl, cnl = VerletNeighborList(mic=True), VerletNeighborList(mic=True)
+for _ in range(5):
+    atoms.positions += rng.normal(0, .01, atoms.positions.shape)
+    sas1 = SlabAdsorptionSites(atoms, 'fcc111')
+    sas2 = SlabAdsorptionSites(atoms, 'fcc111', neighbor_list=snl)
+    assert_same_sites(sas1, sas2)
+    sac1 = SlabAdsorbateCoverage(atoms, sas1)
+    sac2 = SlabAdsorbateCoverage(atoms, sas2, neighbor_list=cnl)
+    assert sac1.get_occupied_labels() == sac2.get_occupied_labels()
+    assert sac1.ads_list == sac2.ads_list
+assert snl.nbuilds < 5